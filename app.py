@@ -1,22 +1,93 @@
-from flask import Flask, render_template, request, redirect, session, flash, send_from_directory, make_response
-from modules.ai_engine import detect_category
+from flask import Flask, render_template, request, redirect, session, flash, send_from_directory, send_file, jsonify
+from modules.ai_engine import detect_category, detect_categories
+from modules.text_extraction import (
+    parse_expense_message,
+    parse_expense_messages,
+    extract_receipt_amount,
+    extract_personal_payment_details,
+)
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import calendar
+import click
 import sqlite3
 import os
 import re
 import secrets
-import time
-import csv
+import hmac
+import base64
+import binascii
+import signal
 import io
-from collections import defaultdict, deque
-import pytesseract
-from PIL import Image
+import time
 from expense_predictor import predict_next_month_expense
+from modules.voice_engine import (
+    transcribe_audio,
+    InvalidAudioError,
+    UnrecognizedSpeechError,
+    TranscriptionUnavailableError,
+    warm_voice_pool,
+    shutdown_voice_pool,
+)
 from modules.ai_engine import train_model
+from modules.ocr import open_upload_image, ocr_receipt_text, ocr_payment_text, InvalidImageError
 from emailsender import send_email
+from modules.email_outbox import enqueue_email, ensure_outbox_table, start_outbox_worker, stop_outbox_worker
+from modules.rate_limiter import create_rate_limiter
+from modules.password_hasher import hash_password, verify_password, needs_rehash, shutdown_hasher_pool, PasswordHasherBusyError
+from modules.reminder_scheduler import reminder_meta, ensure_recurring_due_index, start_reminder_scheduler, stop_reminder_scheduler
+from modules.exports import (
+    EXPORTS,
+    ExportUnavailableError,
+    ensure_export_indexes,
+    gzip_chunks,
+    iter_csv,
+    iter_ndjson,
+    iter_parquet,
+    load_pyarrow,
+)
+from modules.csv_import import import_expenses_csv, ImportFormatError
+from modules.data_version import ensure_data_version_triggers
+from modules.pdf_reports import request_monthly_report, shutdown_report_pool, load_reportlab, ReportUnavailableError
+from modules.chart_data import ensure_chart_indexes, get_chart_data, parse_chart_range, ChartRangeError
+from modules.static_assets import init_static_assets, build_static_assets
+from modules.compression import init_compression, compression_metrics
+from modules.metrics import init_metrics, register_collector, timed, TimedConnection
+from modules.request_profiler import init_request_profiler, make_profile_token
+from modules.admission import init_admission, admission_metrics, GATES as ADMISSION_GATES
+from modules.sharding import (
+    connect_user_db,
+    sharding_enabled,
+    shard_path,
+    split_into_shards,
+    ShardSplitError,
+    SHARD_COUNT,
+    SHARD_DIR,
+)
+from modules.server import run_server, ServerUnavailableError, SERVE_BIND, SERVE_WORKERS, SERVE_THREADS
+from modules.profile_photos import (
+    render_profile_photo,
+    write_profile_photo,
+    pick_variant,
+    is_variant_base,
+    InvalidPhotoError,
+)
+from modules.storage import (
+    ensure_storage_tables,
+    save_upload,
+    attach_upload,
+    register_files,
+    registered_bytes,
+    check_quota,
+    storage_usage,
+    sweep_orphaned_files,
+    start_storage_sweeper,
+    stop_storage_sweeper,
+    StorageQuotaError,
+    STORAGE_QUOTA_BYTES,
+)
 
 try:
     from dotenv import load_dotenv
@@ -34,252 +105,79 @@ app.config["MAX_CONTENT_LENGTH"] = 5 * 1024 * 1024  # 5 MB upload cap
 
 DATABASE = "database.db"
 PROFILE_UPLOAD_DIR = os.path.join("uploads", "profile")
+PROFILE_PHOTO_MAX_AGE = int(os.getenv("PROFILE_PHOTO_MAX_AGE", str(30 * 24 * 3600)))
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
 ALLOWED_CATEGORIES = {"Food", "Shopping", "Bills", "Travel", "Others"}
 ALLOWED_STATUS = {"Send", "Received"}
-RATE_LIMIT_STORE = defaultdict(deque)
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+REPORT_WAIT_SECONDS = float(os.getenv("REPORT_WAIT_SECONDS", "5"))
+# Logged-in accounts that may add ?profile=1 to a URL to capture a profile of that request.
+PROFILER_ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("PROFILER_ADMIN_EMAILS", "").split(",") if e.strip()}
+# Shared by rate limits and login lockouts; RATE_LIMIT_BACKEND=sqlite shares state across workers.
+RATE_LIMITER = create_rate_limiter()
 MAX_OTP_ATTEMPTS = 5
-LOGIN_LOCK_STORE = {}
 LOGIN_MAX_FAILED_ATTEMPTS = 3
 LOGIN_LOCK_SECONDS = 300
 
 
+# Fingerprinted, minified and precompressed copies of static/ are served with immutable caching.
+init_static_assets(app)
+# Request/SQL timing and /metrics; registered before every other hook so it times them all.
+init_metrics(app)
+register_collector(compression_metrics)
+
+
+def is_profiler_admin():
+    if not PROFILER_ADMIN_EMAILS or "user_id" not in session:
+        return False
+    conn = get_db()
+    user = conn.execute("SELECT email FROM users WHERE id = ?", (session["user_id"],)).fetchone()
+    conn.close()
+    return bool(user) and user["email"].lower() in PROFILER_ADMIN_EMAILS
+
+
+# Sampling profiler for single requests (X-Profile token or ?profile=1); no hooks unless configured.
+init_request_profiler(app, is_profiler_admin if PROFILER_ADMIN_EMAILS else None)
+# Slow endpoints share a few slots per class and get a 503 + Retry-After when the queue is
+# full, so a burst of uploads cannot take every worker thread away from /login and /dashboard.
+ADMISSION_ENDPOINTS = {
+    "upload_receipt": "ocr",
+    "upload_personal_transaction": "ocr",
+    "upload_voice_command": "voice",
+    "export_expenses_csv": "export",
+    "export_expenses_ndjson": "export",
+    "export_expenses_parquet": "export",
+    "export_personal_csv": "export",
+    "export_personal_ndjson": "export",
+    "export_personal_parquet": "export",
+    "monthly_report": "export",
+    "import_expenses": "export",
+}
+init_admission(app, ADMISSION_ENDPOINTS)
+register_collector(admission_metrics)
+# gzip/brotli for HTML, JSON and CSV; registered first so it runs after the header hooks below.
+init_compression(app)
+
+# Private per-user data the browser may keep but must revalidate (ETag) on every use.
+REVALIDATE_ENDPOINTS = {"chart_data"}
+# Files that set their own Cache-Control; everything else (HTML and data) is no-store.
+CACHE_MANAGED_ENDPOINTS = {"static", "profile_photo"}
+
+
 @app.after_request
 def apply_security_headers(resp):
     resp.headers["X-Content-Type-Options"] = "nosniff"
     resp.headers["X-Frame-Options"] = "DENY"
     resp.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    resp.headers["Cache-Control"] = "no-store"
+    if request.endpoint in CACHE_MANAGED_ENDPOINTS:
+        return resp
+    if request.endpoint in REVALIDATE_ENDPOINTS:
+        resp.headers["Cache-Control"] = "private, no-cache"
+    else:
+        resp.headers["Cache-Control"] = "no-store"
     return resp
 
 
-def parse_expense_message(message):
-    message = message.strip().lower()
-    if not message:
-        return None, None
-
-    def parse_amount_token(token):
-        token = (token or "").replace(",", "").strip()
-        try:
-            return float(token)
-        except Exception:
-            return None
-
-    amount_pattern = r"(\d[\d,]*(?:\.\d+)?)"
-
-    patterns = [
-        rf"^add\s+{amount_pattern}\s+(.+)$",
-        rf"^spent\s+{amount_pattern}\s+on\s+(.+)$",
-        rf"^i\s+spent\s+{amount_pattern}\s+on\s+(.+)$",
-        rf"^pay(?:ed)?\s+{amount_pattern}\s+for\s+(.+)$",
-    ]
-
-    for pattern in patterns:
-        match = re.match(pattern, message)
-        if match:
-            amount = parse_amount_token(match.group(1))
-            description = match.group(2).strip()
-            description = re.sub(r"^(on|for)\s+", "", description).strip()
-            description = re.sub(r"^[,.\s]+|[,.\s]+$", "", description).strip()
-            if amount is not None and description:
-                return amount, description
-
-    # Fallback: first number is amount, remaining words become description.
-    amount_match = re.search(amount_pattern, message)
-    if not amount_match:
-        return None, None
-
-    amount = parse_amount_token(amount_match.group())
-    if amount is None:
-        return None, None
-    before = message[:amount_match.start()].strip()
-    after = message[amount_match.end():].strip()
-    description = f"{before} {after}".strip()
-
-    # Trim filler words common in voice commands.
-    description = re.sub(r"^(add|spent|i spent|pay|paid|on|for)\s+", "", description).strip()
-    description = re.sub(r"^[,.\s]+|[,.\s]+$", "", description).strip()
-    if not description:
-        return None, None
-
-    return amount, description
-
-
-def extract_receipt_amount(text):
-    if not text:
-        return 0.0
-
-    cleaned = text.lower()
-    # Remove common date/time patterns that pollute numeric extraction.
-    cleaned = re.sub(r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b", " ", cleaned)
-    cleaned = re.sub(r"\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b", " ", cleaned)
-    cleaned = re.sub(r"\b\d{1,2}:\d{2}(?::\d{2})?\b", " ", cleaned)
-
-    amount_pattern = re.compile(r"(?<!\d)(\d+(?:,\d{3})*(?:\.\d{1,2})?)(?!\d)")
-    priority_keywords = [
-        "grand total", "total amount", "net amount", "amount due", "payable", "total"
-    ]
-    low_priority_keywords = ["qty", "quantity", "item", "invoice no", "bill no", "gstin", "phone"]
-
-    candidates = []
-
-    for line in cleaned.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-
-        nums = amount_pattern.findall(line)
-        if not nums:
-            continue
-
-        line_score = 0
-        if any(k in line for k in priority_keywords):
-            line_score += 3
-        if any(k in line for k in low_priority_keywords):
-            line_score -= 2
-
-        for raw in nums:
-            try:
-                value = float(raw.replace(",", ""))
-            except ValueError:
-                continue
-
-            if value <= 0 or value > 100000:
-                continue
-
-            score = line_score
-            if "." in raw:
-                score += 1
-            candidates.append((score, value))
-
-    if not candidates:
-        return 0.0
-
-    # Pick best-scored candidate; if tie, choose larger value.
-    candidates.sort(key=lambda x: (x[0], x[1]), reverse=True)
-    return candidates[0][1]
-
-
-def extract_payment_amount(text):
-    if not text:
-        return 0.0
-
-    def parse_amount_token(raw):
-        token = raw.strip().replace(",", "")
-        token = re.sub(r"(?<=\d)[oO](?=\d|\b)", "0", token)
-        if not re.fullmatch(r"\d+(?:\.\d{1,2})?", token):
-            return None
-        try:
-            value = float(token)
-        except ValueError:
-            return None
-        if 0 < value <= 200000:
-            return value
-        return None
-
-    lines = [line.strip() for line in text.splitlines() if line.strip()]
-    compact = " ".join(lines)
-    candidates = []
-
-    marker_pattern = re.compile(
-        r"(?:\u20B9|rs\.?|inr)\s*([0-9O]{1,7}(?:,[0-9O]{2,3})*(?:\.[0-9O]{1,2})?)",
-        flags=re.IGNORECASE,
-    )
-    for raw in marker_pattern.findall(compact):
-        parsed = parse_amount_token(raw)
-        if parsed is not None:
-            candidates.append((12, parsed))
-
-    # Generic number extraction with scoring to avoid transaction IDs.
-    amount_pattern = re.compile(r"(?<!\d)(\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d{1,6}(?:\.\d{1,2})?)(?!\d)")
-    low_priority = ("upi", "transaction id", "google transaction id", "utr", "ref", "account", "bank", "@")
-
-    for line in lines:
-        line_l = line.lower()
-        line_score = 0
-        if "\u20B9" in line or " rs" in f" {line_l}" or "inr" in line_l:
-            line_score += 5
-        if any(word in line_l for word in ("paid", "sent", "received", "from", "to", "completed")):
-            line_score += 1
-        if any(k in line_l for k in low_priority):
-            line_score -= 5
-        if len(line) <= 18:
-            line_score += 2
-
-        for raw in amount_pattern.findall(line):
-            parsed = parse_amount_token(raw)
-            if parsed is None:
-                continue
-            score = line_score
-            if "," in raw:
-                score += 4
-            if "." in raw:
-                score += 1
-            if raw.isdigit() and len(raw) >= 7:
-                score -= 6
-            candidates.append((score, parsed))
-
-    if candidates:
-        # Highest score first; for ties choose larger amount.
-        candidates.sort(key=lambda x: (x[0], x[1]), reverse=True)
-        return candidates[0][1]
-
-    return 0.0
-
-
-def clean_party_name(raw_name):
-    if not raw_name:
-        return ""
-
-    name = raw_name.strip()
-    name = re.split(r"\b(upi|utr|ref|txn|transaction|id)\b", name, flags=re.IGNORECASE)[0]
-    name = re.sub(r"[^A-Za-z0-9 .&_-]", " ", name)
-    name = re.sub(r"\s+", " ", name).strip(" -:")
-    return name[:60]
-
-
-def extract_personal_payment_details(text):
-    if not text:
-        return "Unknown", "Payment Screenshot", 0.0, "Send"
-
-    lines = [line.strip() for line in text.splitlines() if line.strip()]
-
-    person_name = ""
-    status = "Send"
-
-    # Required behavior: from -> Received, to -> Send.
-    for line in lines:
-        from_match = re.match(r"^(received\s+from|from)\s*[:\-]?\s*(.+)$", line, flags=re.IGNORECASE)
-        if from_match:
-            person_name = clean_party_name(from_match.group(2))
-            status = "Received"
-            break
-
-        to_match = re.match(r"^(paid\s+to|to)\s*[:\-]?\s*(.+)$", line, flags=re.IGNORECASE)
-        if to_match:
-            person_name = clean_party_name(to_match.group(2))
-            status = "Send"
-            break
-
-    if not person_name:
-        joined = " ".join(lines)
-        from_any = re.search(r"\bfrom\s*[:\-]?\s*([A-Za-z0-9 .&_-]{2,60})", joined, flags=re.IGNORECASE)
-        to_any = re.search(r"\bto\s*[:\-]?\s*([A-Za-z0-9 .&_-]{2,60})", joined, flags=re.IGNORECASE)
-        if from_any:
-            person_name = clean_party_name(from_any.group(1))
-            status = "Received"
-        elif to_any:
-            person_name = clean_party_name(to_any.group(1))
-            status = "Send"
-
-    if not person_name:
-        person_name = "Unknown"
-
-    amount = extract_payment_amount(text)
-    description = "Payment Screenshot"
-    return person_name, description, amount, status
-
-
 def parse_iso_date(value):
     try:
         return datetime.strptime(str(value), "%Y-%m-%d").date()
@@ -305,18 +203,6 @@ def advance_due_date(current_due, frequency):
     return add_months(current_due, 1)
 
 
-def reminder_meta(next_due_date, reminder_days):
-    today = datetime.now().date()
-    days_left = (next_due_date - today).days
-    if days_left < 0:
-        return "overdue", days_left
-    if days_left == 0:
-        return "due_today", days_left
-    if days_left <= reminder_days:
-        return "upcoming", days_left
-    return "normal", days_left
-
-
 def mask_email(email):
     if not email or "@" not in email:
         return "your email"
@@ -354,20 +240,33 @@ def get_csrf_token():
     return token
 
 
+def mask_csrf_token(token):
+    # Pages are compressed, so a token rendered verbatim next to reflected input could be
+    # recovered byte by byte from response sizes (BREACH). A fresh one-time pad per render
+    # keeps the bytes on the page different every time; the session token never changes.
+    raw = token.encode("utf-8")
+    pad = secrets.token_bytes(len(raw))
+    return base64.urlsafe_b64encode(pad + bytes(a ^ b for a, b in zip(pad, raw))).decode("ascii")
+
+
+def unmask_csrf_token(value):
+    try:
+        data = base64.urlsafe_b64decode(value.encode("ascii"))
+    except (binascii.Error, UnicodeEncodeError, ValueError):
+        return None
+    half = len(data) // 2
+    if not half or len(data) != 2 * half:
+        return None
+    return bytes(a ^ b for a, b in zip(data[:half], data[half:]))
+
+
 @app.context_processor
 def inject_csrf_token():
-    return {"csrf_token": get_csrf_token}
+    return {"csrf_token": lambda: mask_csrf_token(get_csrf_token())}
 
 
 def is_rate_limited(key, limit, window_seconds):
-    now = time.time()
-    bucket = RATE_LIMIT_STORE[key]
-    while bucket and now - bucket[0] > window_seconds:
-        bucket.popleft()
-    if len(bucket) >= limit:
-        return True
-    bucket.append(now)
-    return False
+    return RATE_LIMITER.hit(key, limit, window_seconds)
 
 
 def client_ip():
@@ -393,9 +292,7 @@ def clear_login_lock_for_email(email):
     email = (email or "").strip().lower()
     if not email:
         return
-    keys = [k for k in LOGIN_LOCK_STORE.keys() if str(k).startswith(f"{email}|")]
-    for k in keys:
-        LOGIN_LOCK_STORE.pop(k, None)
+    RATE_LIMITER.clear_login_locks_for_email(email)
 
 
 def is_allowed_image_upload(file_obj):
@@ -410,13 +307,28 @@ def is_allowed_image_upload(file_obj):
     return True
 
 
+@app.errorhandler(PasswordHasherBusyError)
+def password_hasher_busy(_exc):
+    flash("Server is busy. Please try again in a moment.", "error")
+    resp = redirect(request.referrer or "/login")
+    resp.headers["Retry-After"] = "2"
+    return resp
+
+
+@app.before_request
+def allow_large_imports():
+    # Must run before the CSRF hook below reads request.form.
+    if request.endpoint == "import_expenses":
+        request.max_content_length = IMPORT_MAX_BYTES
+
+
 @app.before_request
 def validate_csrf_for_post():
     if request.method != "POST":
         return None
     session_token = session.get("csrf_token")
-    request_token = request.form.get("csrf_token") or request.headers.get("X-CSRF-Token")
-    if not session_token or not request_token or request_token != session_token:
+    request_token = unmask_csrf_token(request.form.get("csrf_token") or request.headers.get("X-CSRF-Token") or "")
+    if not session_token or not request_token or not hmac.compare_digest(request_token, session_token.encode("utf-8")):
         if request.path.startswith("/upload_voice_command"):
             return ("CSRF validation failed", 400)
         flash("Security check failed. Please retry the action.", "error")
@@ -441,39 +353,8 @@ def send_otp_email(recipient_email, otp_code):
         "This OTP expires in 10 minutes.\n"
         "If you did not request this, ignore this email."
     )
-    return send_email_message(recipient_email, "SplitPilot Password Reset OTP", body)
-
-
-def send_recurring_reminder_email(recipient_email, recurring_item, status_key, days_left):
-    title = recurring_item["title"]
-    amount = float(recurring_item["amount"])
-    next_due = recurring_item["next_due_date"]
-    frequency = str(recurring_item["frequency"]).title()
-
-    if status_key == "overdue":
-        status_line = f"This payment is overdue by {abs(days_left)} day(s)."
-    elif status_key == "due_today":
-        status_line = "This payment is due today."
-    else:
-        status_line = f"This payment is due in {days_left} day(s)."
-
-    notes = (recurring_item["notes"] or "").strip()
-    notes_line = f"\nNotes: {notes}" if notes else ""
-
-    subject = f"SplitPilot Reminder: {title} due on {next_due}"
-    body = (
-        f"Hello,\n\n"
-        f"Recurring expense reminder from SplitPilot:\n"
-        f"Title: {title}\n"
-        f"Category: {recurring_item['category']}\n"
-        f"Amount: INR {amount:.2f}\n"
-        f"Frequency: {frequency}\n"
-        f"Next Due Date: {next_due}\n"
-        f"{status_line}{notes_line}\n\n"
-        f"Please open SplitPilot and mark it paid when completed."
-    )
-
-    return send_email_message(recipient_email, subject, body)
+    # Queued for the outbox worker; an OTP nobody received within its lifetime is dropped.
+    return enqueue_email(recipient_email, "SplitPilot Password Reset OTP", body, ttl_seconds=600)
 
 
 def ensure_recurring_last_paid_column(cursor):
@@ -485,11 +366,27 @@ def ensure_recurring_last_paid_column(cursor):
         cursor.execute("ALTER TABLE recurring_expenses ADD COLUMN reminder_last_due_date DATE")
 
 
+def retrain_model():
+    # Retrains in the background, one at a time; writes landing meanwhile make the running
+    # one go again instead of queueing, and the request that triggered it returns at once.
+    ADMISSION_GATES["training"].run_coalesced(train_model)
+
+
 # ---------------------------
 # DATABASE CONNECTION
 # ---------------------------
 def get_db():
-    conn = sqlite3.connect(DATABASE)
+    conn = sqlite3.connect(DATABASE, factory=TimedConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def get_user_db(user_id):
+    # For routes that read or write the user's expenses, personal transactions, recurring
+    # items or budget. Same as get_db() unless SHARD_COUNT is set; then it is the user's
+    # shard with database.db attached, so users and the other shared tables still resolve.
+    conn = connect_user_db(user_id, factory=TimedConnection)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
@@ -498,21 +395,12 @@ def get_db():
 # ---------------------------
 # INITIALIZE DATABASE
 # ---------------------------
-def init_db():
-    conn = get_db()
-    cursor = conn.cursor()
+def ensure_user_data_tables(cursor, foreign_keys=True):
+    # Per-user tables, created in database.db and in every shard. Shards have no users
+    # table to point a foreign key at, so they are created without one.
+    user_fk = ",\n        FOREIGN KEY (user_id) REFERENCES users(id)" if foreign_keys else ""
 
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        profile_photo TEXT DEFAULT ''
-    )
-    """)
-
-    cursor.execute("""
+    cursor.execute(f"""
     CREATE TABLE IF NOT EXISTS expenses (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id INTEGER,
@@ -521,12 +409,11 @@ def init_db():
         amount REAL NOT NULL CHECK (amount > 0),
         status TEXT DEFAULT 'Send' CHECK (status IN ('Send','Received')),
         expense_date DATE DEFAULT CURRENT_DATE,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id)
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP{user_fk}
     )
     """)
 
-    cursor.execute("""
+    cursor.execute(f"""
     CREATE TABLE IF NOT EXISTS personal_transactions (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id INTEGER NOT NULL,
@@ -535,12 +422,11 @@ def init_db():
         amount REAL NOT NULL CHECK (amount > 0),
         status TEXT NOT NULL DEFAULT 'Send' CHECK (status IN ('Send','Received')),
         transaction_date DATE DEFAULT CURRENT_DATE,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id)
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP{user_fk}
     )
     """)
 
-    cursor.execute("""
+    cursor.execute(f"""
     CREATE TABLE IF NOT EXISTS recurring_expenses (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id INTEGER NOT NULL,
@@ -555,17 +441,15 @@ def init_db():
         reminder_days INTEGER NOT NULL DEFAULT 3 CHECK (reminder_days BETWEEN 0 AND 30),
         is_active INTEGER NOT NULL DEFAULT 1,
         notes TEXT DEFAULT '',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id)
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP{user_fk}
     )
     """)
 
-    cursor.execute("""
+    cursor.execute(f"""
     CREATE TABLE IF NOT EXISTS budgets (
         user_id INTEGER PRIMARY KEY,
         monthly_budget REAL NOT NULL DEFAULT 0 CHECK (monthly_budget >= 0),
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id)
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP{user_fk}
     )
     """)
 
@@ -641,12 +525,6 @@ def init_db():
     if "updated_at" not in budget_cols:
         cursor.execute("ALTER TABLE budgets ADD COLUMN updated_at TIMESTAMP")
 
-    # Ensure old databases have the status column.
-    cursor.execute("PRAGMA table_info(users)")
-    user_columns = [row[1] for row in cursor.fetchall()]
-    if "profile_photo" not in user_columns:
-        cursor.execute("ALTER TABLE users ADD COLUMN profile_photo TEXT DEFAULT ''")
-
     # Ensure old databases have the status column.
     cursor.execute("PRAGMA table_info(expenses)")
     expense_columns = [row[1] for row in cursor.fetchall()]
@@ -656,9 +534,48 @@ def init_db():
     # Ensure old recurring schema has last_paid_date.
     ensure_recurring_last_paid_column(cursor)
 
+    ensure_recurring_due_index(cursor)
+    ensure_export_indexes(cursor)
+    ensure_data_version_triggers(cursor)
+    ensure_chart_indexes(cursor)
+
+
+def init_db():
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        profile_photo TEXT DEFAULT ''
+    )
+    """)
+
+    # Ensure old databases have the status column.
+    cursor.execute("PRAGMA table_info(users)")
+    user_columns = [row[1] for row in cursor.fetchall()]
+    if "profile_photo" not in user_columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN profile_photo TEXT DEFAULT ''")
+
+    # Still created when sharded: an unsplit database keeps its rows here until shard-split.
+    ensure_user_data_tables(cursor)
+    ensure_storage_tables(cursor)
+    ensure_outbox_table(cursor)
+
     conn.commit()
     conn.close()
 
+    if sharding_enabled():
+        os.makedirs(SHARD_DIR, exist_ok=True)
+        for index in range(SHARD_COUNT):
+            conn = sqlite3.connect(shard_path(index))
+            ensure_user_data_tables(conn.cursor(), foreign_keys=False)
+            conn.commit()
+            conn.close()
+
 
 # ---------------------------
 # HOME
@@ -670,7 +587,16 @@ def home():
 
 @app.route("/profile_photo/<path:filename>")
 def profile_photo(filename):
-    return send_from_directory(PROFILE_UPLOAD_DIR, filename)
+    # Photo names are content-hashed (or timestamped for old uploads), so a name never
+    # changes content; the browser keeps it and revalidates with ETag/Last-Modified.
+    if is_variant_base(filename):
+        accept_webp = request.accept_mimetypes["image/webp"] > 0
+        filename = pick_variant(filename, request.args.get("size"), accept_webp, PROFILE_UPLOAD_DIR)
+    resp = send_from_directory(PROFILE_UPLOAD_DIR, filename, max_age=PROFILE_PHOTO_MAX_AGE)
+    resp.cache_control.public = False
+    resp.cache_control.private = True
+    resp.vary.add("Accept")
+    return resp
 
 
 # ---------------------------
@@ -741,11 +667,17 @@ def login():
         conn.close()
 
         lock_key = f"{email}|{ip}"
-        lock_meta = LOGIN_LOCK_STORE.get(lock_key, {"count": 0, "lock_until": 0})
+        lock_meta = RATE_LIMITER.get_login_lock(lock_key)
         now = time.time()
 
-        if user and check_password_hash(user["password"], password):
+        if user and verify_password(user["password"], password):
             clear_login_lock_for_email(email)
+            if needs_rehash(user["password"]):
+                # Upgrade stored hashes to the configured PASSWORD_HASH_METHOD on next login.
+                conn = get_db()
+                conn.execute("UPDATE users SET password = ? WHERE id = ?", (hash_password(password), user["id"]))
+                conn.commit()
+                conn.close()
             session["user_id"] = user["id"]
             return redirect("/dashboard")
         else:
@@ -769,7 +701,8 @@ def login():
             else:
                 remaining = LOGIN_MAX_FAILED_ATTEMPTS - fail_count
                 error = f"Invalid credentials. {remaining} attempt(s) left before temporary lock."
-            LOGIN_LOCK_STORE[lock_key] = {"count": fail_count, "lock_until": lock_until}
+            # Failure counts are forgotten after a quiet LOGIN_LOCK_SECONDS, like the lock itself.
+            RATE_LIMITER.set_login_lock(lock_key, {"count": fail_count, "lock_until": lock_until}, LOGIN_LOCK_SECONDS)
 
     return render_template(
         "login.html",
@@ -884,7 +817,7 @@ def verify_signup_otp():
         cursor.execute("""
             INSERT INTO users (name, email, password)
             VALUES (?, ?, ?)
-        """, (name, email, generate_password_hash(password)))
+        """, (name, email, hash_password(password)))
         conn.commit()
     except Exception:
         conn.close()
@@ -932,10 +865,12 @@ def dashboard():
         except Exception:
             clear_password_otp_session()
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, email, profile_photo FROM users WHERE id = ?", (session["user_id"],))
     user_profile = cursor.fetchone()
+    storage_bytes, _ = storage_usage(conn, session["user_id"])
+    storage_used_mb = round(storage_bytes / 1048576, 1)
 
     cursor.execute("""
         SELECT id, description, category, amount, status, expense_date
@@ -1080,31 +1015,8 @@ def dashboard():
     if category_totals:
         top_category_name, top_category_value = max(category_totals.items(), key=lambda kv: kv[1])
 
-    expenses_json = [
-        {
-            "amount": float(row["amount"]),
-            "status": str(row["status"]),
-            "date": str(row["expense_date"]),
-            "category": str(row["category"]),
-            "source": "expense",
-        }
-        for row in expenses
-    ]
-
-    personal_json = [
-        {
-            "amount": float(row["amount"]),
-            "status": str(row["status"]),
-            "date": str(row["transaction_date"]),
-            "category": "Personal",
-            "source": "personal",
-        }
-        for row in personal_transactions
-    ]
-
+    # Reminder emails are sent by the reminder sweeper; the dashboard only displays alerts.
     recurring_alerts = []
-    reminder_updates = []
-    user_email = user_profile["email"] if user_profile and user_profile["email"] else ""
     for rec in recurring_expenses:
         if int(rec["is_active"]) != 1:
             continue
@@ -1113,12 +1025,6 @@ def dashboard():
             continue
         status_key, days_left = reminder_meta(next_due, int(rec["reminder_days"]))
         if status_key in {"overdue", "due_today", "upcoming"}:
-            reminder_due_key = str(rec["next_due_date"])
-            already_sent_for_due = (rec["reminder_last_due_date"] == reminder_due_key)
-            if user_email and not already_sent_for_due:
-                sent, _ = send_recurring_reminder_email(user_email, rec, status_key, days_left)
-                if sent:
-                    reminder_updates.append((reminder_due_key, rec["id"], session["user_id"]))
             recurring_alerts.append({
                 "id": rec["id"],
                 "title": rec["title"],
@@ -1132,17 +1038,6 @@ def dashboard():
                 "days_left": days_left,
             })
 
-    if reminder_updates:
-        conn2 = get_db()
-        cursor2 = conn2.cursor()
-        cursor2.executemany("""
-            UPDATE recurring_expenses
-            SET reminder_last_due_date = ?
-            WHERE id = ? AND user_id = ?
-        """, reminder_updates)
-        conn2.commit()
-        conn2.close()
-
     insights = []
     if monthly_budget > 0:
         if this_month_total > monthly_budget:
@@ -1180,6 +1075,8 @@ def dashboard():
     return render_template(
         "dashboard.html",
         user_profile=user_profile,
+        storage_used_mb=storage_used_mb,
+        storage_quota_mb=round(STORAGE_QUOTA_BYTES / 1048576),
         otp_pending=otp_pending,
         otp_verified=otp_verified,
         expenses=expenses,
@@ -1190,7 +1087,6 @@ def dashboard():
         months=months,
         month_totals=month_totals,
         predicted_expense=predicted_expense,
-        category_totals=category_totals,
         total_expense=round(total, 2),
         total_sent=round(total_sent, 2),
         total_received=round(total_received, 2),
@@ -1201,8 +1097,6 @@ def dashboard():
         budget=monthly_budget,
         budget_percent=budget_percent,
         insights=insights,
-        expenses_json=expenses_json,
-        personal_json=personal_json,
         lifetime_spending=lifetime_spending,
         total_tracked_volume=total_tracked_volume,
         total_transactions=total_transactions,
@@ -1251,7 +1145,7 @@ def add():
     else:
         category = detect_category(description)
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -1262,7 +1156,7 @@ def add():
     conn.commit()
     conn.close()
 
-    train_model()
+    retrain_model()
     flash("Expense added successfully.", "success")
     return redirect("/dashboard")
 
@@ -1275,13 +1169,13 @@ def delete_expense(id):
     if "user_id" not in session:
         return redirect("/login")
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("DELETE FROM expenses WHERE id = ? AND user_id = ?", (id, session["user_id"]))
     conn.commit()
     conn.close()
 
-    train_model()
+    retrain_model()
     return redirect("/dashboard")
 
 
@@ -1308,7 +1202,7 @@ def edit_expense(id):
         flash("Amount must be greater than 0.", "error")
         return redirect("/dashboard")
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("""
         UPDATE expenses
@@ -1322,7 +1216,7 @@ def edit_expense(id):
     conn.commit()
     conn.close()
 
-    train_model()
+    retrain_model()
     return redirect("/dashboard")
 
 
@@ -1346,19 +1240,16 @@ def upload_receipt():
     if not filename:
         flash("Invalid receipt filename.", "error")
         return redirect("/dashboard")
-    os.makedirs("uploads", exist_ok=True)
-    filepath = os.path.join("uploads", filename)
-    file.save(filepath)
 
+    data = file.read()
     try:
-        image = Image.open(filepath)
-        image.verify()
-        image = Image.open(filepath)
-    except Exception:
+        image = open_upload_image(data)
+    except InvalidImageError:
         flash("Uploaded receipt is not a valid image.", "error")
         return redirect("/dashboard")
 
-    text = pytesseract.image_to_string(image)
+    with timed("ocr_receipt"):
+        text = ocr_receipt_text(image)
     amount = extract_receipt_amount(text)
     if amount <= 0:
         flash("Could not detect a valid receipt amount.", "error")
@@ -1366,16 +1257,24 @@ def upload_receipt():
 
     category = detect_category("receipt")
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO expenses (user_id, description, category, amount, status)
-        VALUES (?, ?, ?, ?, ?)
-    """, (session["user_id"], "Scanned Receipt", category, amount, "Send"))
-    conn.commit()
+    # The image is only kept once it backs an expense row.
+    file_id = None
+    try:
+        file_id = save_upload(session["user_id"], "receipt", data, os.path.splitext(filename)[1].lower())
+    except StorageQuotaError as exc:
+        flash(f"{exc}; the receipt image was not kept.", "error")
+
+    conn = get_user_db(session["user_id"])
+    with conn:
+        cursor = conn.execute("""
+            INSERT INTO expenses (user_id, description, category, amount, status)
+            VALUES (?, ?, ?, ?, ?)
+        """, (session["user_id"], "Scanned Receipt", category, amount, "Send"))
+        if file_id:
+            attach_upload(conn, file_id, "expenses", cursor.lastrowid)
     conn.close()
 
-    train_model()
+    retrain_model()
     flash("Receipt processed and expense added.", "success")
     return redirect("/dashboard")
 
@@ -1401,31 +1300,38 @@ def chat_add():
         flash("Please type or speak a command.", "error")
         return redirect("/dashboard")
 
-    amount, description = parse_expense_message(message)
-    if amount is None or not description:
+    # Several commands may arrive in one message: newline, ";" or "and" separated.
+    parsed, rejected = parse_expense_messages(message)
+    if not parsed:
         flash("Could not parse the expense command.", "error")
         return redirect("/dashboard")
-    if amount <= 0:
-        flash("Amount must be greater than 0.", "error")
-        return redirect("/dashboard")
-    category = detect_category(description)
-
-    conn = get_db()
-    cursor = conn.cursor()
+    categories = detect_categories([description for _, description in parsed])
 
-    cursor.execute("""
-        INSERT INTO expenses (user_id, description, category, amount, status)
-        VALUES (?, ?, ?, ?, ?)
-    """, (session["user_id"], description, category, amount, "Send"))
+    rows = [
+        (session["user_id"], description, category, amount, "Send")
+        for (amount, description), category in zip(parsed, categories)
+    ]
 
-    conn.commit()
-    conn.close()
+    conn = get_user_db(session["user_id"])
+    try:
+        with conn:
+            conn.executemany("""
+                INSERT INTO expenses (user_id, description, category, amount, status)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+    finally:
+        conn.close()
 
-    # retrain model
-    from modules.ai_engine import train_model
-    train_model()
+    # retrain model once for the whole batch
+    retrain_model()
 
-    flash(f"Expense added from smart assistant. Category: {category}", "success")
+    if len(rows) == 1:
+        flash(f"Expense added from smart assistant. Category: {categories[0]}", "success")
+    else:
+        flash(f"{len(rows)} expenses added from smart assistant.", "success")
+    if rejected:
+        skipped = ", ".join(f"\"{cmd}\"" for cmd in rejected[:3])
+        flash(f"Skipped {len(rejected)} command(s) that could not be parsed: {skipped}", "error")
     return redirect("/dashboard")
 
 
@@ -1439,25 +1345,19 @@ def upload_voice_command():
         flash("No voice recording received.", "error")
         return redirect("/dashboard")
 
-    os.makedirs("uploads", exist_ok=True)
-    filename = secure_filename(file.filename) or f"voice_{int(datetime.now().timestamp())}.wav"
-    filepath = os.path.join("uploads", filename)
-    file.save(filepath)
-
-    try:
-        import speech_recognition as sr
-    except Exception:
-        flash("Voice transcription dependency missing. Install: pip install SpeechRecognition", "error")
-        return redirect("/dashboard")
-
-    recognizer = sr.Recognizer()
+    # Audio stays in memory; decoding, trimming and recognition run in the voice worker pool.
     try:
-        with sr.AudioFile(filepath) as source:
-            audio = recognizer.record(source)
-        message = recognizer.recognize_google(audio).strip().lower()
-    except sr.UnknownValueError:
+        with timed("voice_transcribe"):
+            message = transcribe_audio(file.read()).strip().lower()
+    except UnrecognizedSpeechError:
         flash("Could not understand the recorded voice.", "error")
         return redirect("/dashboard")
+    except InvalidAudioError:
+        flash("Voice recording must be a WAV file.", "error")
+        return redirect("/dashboard")
+    except TranscriptionUnavailableError as exc:
+        flash(f"Voice transcription unavailable: {exc}", "error")
+        return redirect("/dashboard")
     except Exception:
         flash("Voice transcription failed. Please try again.", "error")
         return redirect("/dashboard")
@@ -1472,7 +1372,7 @@ def upload_voice_command():
 
     category = detect_category(description)
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO expenses (user_id, description, category, amount, status)
@@ -1481,7 +1381,7 @@ def upload_voice_command():
     conn.commit()
     conn.close()
 
-    train_model()
+    retrain_model()
     flash(f"Added from recording: {description} - ₹{amount}", "success")
     return redirect("/dashboard")
 
@@ -1514,7 +1414,7 @@ def add_personal_transaction():
         flash("Amount must be greater than 0.", "error")
         return redirect("/dashboard")
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, email, profile_photo FROM users WHERE id = ?", (session["user_id"],))
     user_profile = cursor.fetchone()
@@ -1542,21 +1442,14 @@ def upload_personal_transaction():
         flash("Only JPG, PNG, or WEBP payment images are allowed.", "error")
         return redirect("/dashboard")
 
-    os.makedirs("uploads", exist_ok=True)
-    safe_name = secure_filename(file.filename) or f"payment_{int(datetime.now().timestamp())}.png"
-    filepath = os.path.join("uploads", safe_name)
-    file.save(filepath)
-
+    data = file.read()
     try:
-        image = Image.open(filepath)
-        image.verify()
-        image = Image.open(filepath)
-    except Exception:
+        image = open_upload_image(data)
+    except InvalidImageError:
         flash("Uploaded payment screenshot is not a valid image.", "error")
         return redirect("/dashboard")
-    text_primary = pytesseract.image_to_string(image, config="--oem 3 --psm 6")
-    text_secondary = pytesseract.image_to_string(image, config="--oem 3 --psm 11")
-    text = f"{text_primary}\n{text_secondary}"
+    with timed("ocr_payment_screenshot"):
+        text = ocr_payment_text(image)
     text_l = text.lower()
     payment_signals = ("upi", "paid", "sent", "received", "transaction", "from", "to", "bank")
     if not any(sig in text_l for sig in payment_signals):
@@ -1571,13 +1464,20 @@ def upload_personal_transaction():
         flash("Could not detect sender/receiver details clearly. Try a clearer screenshot.", "error")
         return redirect("/dashboard")
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO personal_transactions (user_id, person_name, description, amount, status)
-        VALUES (?, ?, ?, ?, ?)
-    """, (session["user_id"], person_name, description, amount, status))
-    conn.commit()
+    file_id = None
+    try:
+        file_id = save_upload(session["user_id"], "payment", data, os.path.splitext(secure_filename(file.filename))[1].lower())
+    except StorageQuotaError as exc:
+        flash(f"{exc}; the screenshot was not kept.", "error")
+
+    conn = get_user_db(session["user_id"])
+    with conn:
+        cursor = conn.execute("""
+            INSERT INTO personal_transactions (user_id, person_name, description, amount, status)
+            VALUES (?, ?, ?, ?, ?)
+        """, (session["user_id"], person_name, description, amount, status))
+        if file_id:
+            attach_upload(conn, file_id, "personal_transactions", cursor.lastrowid)
     conn.close()
 
     flash(f"Personal transaction added: {person_name} - ₹{amount}", "success")
@@ -1589,7 +1489,7 @@ def delete_personal_transaction(id):
     if "user_id" not in session:
         return redirect("/login")
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("""
         DELETE FROM personal_transactions
@@ -1601,38 +1501,56 @@ def delete_personal_transaction(id):
     return redirect("/dashboard")
 
 
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv; charset=utf-8"),
+    "ndjson": (iter_ndjson, "application/x-ndjson; charset=utf-8"),
+    "parquet": (iter_parquet, "application/vnd.apache.parquet"),
+}
+
+
+def export_download_response(name, fmt="csv"):
+    # Streams the export chunk by chunk; ?gzip=1 compresses CSV/NDJSON (Parquet is already compressed).
+    if fmt == "parquet":
+        try:
+            load_pyarrow()
+        except ExportUnavailableError as exc:
+            flash(str(exc), "error")
+            return redirect("/dashboard")
+
+    iter_rows, content_type = EXPORT_FORMATS[fmt]
+    chunks = iter_rows(name, session["user_id"])
+    filename = f"{EXPORTS[name]['filename']}.{fmt}"
+    if fmt != "parquet" and request.args.get("gzip") == "1":
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        content_type = "application/gzip"
+    response = app.response_class(chunks, content_type=content_type)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
+
+
 @app.route("/export_expenses_csv")
 def export_expenses_csv():
     if "user_id" not in session:
         return redirect("/login")
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT description, category, amount, status, expense_date
-        FROM expenses
-        WHERE user_id = ?
-        ORDER BY created_at DESC
-    """, (session["user_id"],))
-    rows = cursor.fetchall()
-    conn.close()
+    return export_download_response("expenses")
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Description", "Category", "Amount", "Status", "Date"])
-    for row in rows:
-        writer.writerow([
-            row["description"],
-            row["category"],
-            float(row["amount"]),
-            row["status"],
-            row["expense_date"],
-        ])
-
-    response = make_response(output.getvalue())
-    response.headers["Content-Type"] = "text/csv; charset=utf-8"
-    response.headers["Content-Disposition"] = "attachment; filename=expenses_history.csv"
-    return response
+
+@app.route("/export_expenses_ndjson")
+def export_expenses_ndjson():
+    if "user_id" not in session:
+        return redirect("/login")
+
+    return export_download_response("expenses", "ndjson")
+
+
+@app.route("/export_expenses_parquet")
+def export_expenses_parquet():
+    if "user_id" not in session:
+        return redirect("/login")
+
+    return export_download_response("expenses", "parquet")
 
 
 @app.route("/export_personal_csv")
@@ -1640,33 +1558,255 @@ def export_personal_csv():
     if "user_id" not in session:
         return redirect("/login")
 
+    return export_download_response("personal")
+
+
+@app.route("/export_personal_ndjson")
+def export_personal_ndjson():
+    if "user_id" not in session:
+        return redirect("/login")
+
+    return export_download_response("personal", "ndjson")
+
+
+@app.route("/export_personal_parquet")
+def export_personal_parquet():
+    if "user_id" not in session:
+        return redirect("/login")
+
+    return export_download_response("personal", "parquet")
+
+
+# ---------------------------
+# CHART DATA API
+# ---------------------------
+@app.route("/api/chart_data")
+def chart_data():
+    if "user_id" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+
+    try:
+        bucket, start, end = parse_chart_range(
+            request.args.get("bucket"), request.args.get("start"), request.args.get("end")
+        )
+    except ChartRangeError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    payload, version = get_chart_data(session["user_id"], bucket, start, end)
+    response = jsonify(payload)
+    # The user id is part of the tag so a shared browser never revalidates another account's data.
+    response.set_etag(f"{session['user_id']}-{version}-{bucket}-{start}-{end}")
+    return response.make_conditional(request)
+
+
+# ---------------------------
+# MONTHLY PDF REPORT
+# ---------------------------
+@app.route("/monthly_report")
+def monthly_report():
+    if "user_id" not in session:
+        return redirect("/login")
+
+    month = (request.args.get("month") or datetime.now().strftime("%Y-%m")).strip()
+    if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", month):
+        flash("Please choose a valid month.", "error")
+        return redirect("/dashboard")
+
+    try:
+        # Rendering happens in the report worker; only wait briefly for small reports.
+        path = request_monthly_report(session["user_id"], month, REPORT_WAIT_SECONDS)
+    except ReportUnavailableError as exc:
+        flash(str(exc), "error")
+        return redirect("/dashboard")
+    except FutureTimeoutError:
+        flash("Your report is being prepared. Please try the download again in a few seconds.", "success")
+        return redirect("/dashboard")
+    except Exception:
+        flash("Could not generate the monthly report. Please try again.", "error")
+        return redirect("/dashboard")
+
+    # Reports are written relative to the working directory; send_file would resolve a
+    # relative path against the app's root instead.
+    return send_file(os.path.abspath(path), mimetype="application/pdf", as_attachment=True,
+                     download_name=f"splitpilot_statement_{month}.pdf")
+
+
+# ---------------------------
+# BULK CSV IMPORT
+# ---------------------------
+def import_summary_messages(inserted, rejected, errors):
+    messages = [(f"Imported {inserted} expense(s).", "success")]
+    if rejected:
+        details = "; ".join(f"line {line}: {reason}" for line, reason in errors[:5])
+        more = " ..." if rejected > len(errors[:5]) else ""
+        messages.append((f"Skipped {rejected} row(s) ({details}{more}).", "error"))
+    return messages
+
+
+@app.route("/import_expenses", methods=["POST"])
+def import_expenses():
+    if "user_id" not in session:
+        return redirect("/login")
+
+    file = request.files.get("expenses_csv")
+    if not file or not file.filename:
+        flash("Please choose a CSV file to import.", "error")
+        return redirect("/dashboard")
+    if os.path.splitext(file.filename)[1].lower() != ".csv":
+        flash("Only .csv files can be imported.", "error")
+        return redirect("/dashboard")
+
+    # Parsed straight off the upload stream; utf-8-sig drops the BOM Excel adds.
+    lines = io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+    try:
+        inserted, rejected, errors = import_expenses_csv(
+            lines, session["user_id"], ALLOWED_CATEGORIES, ALLOWED_STATUS
+        )
+    except ImportFormatError as exc:
+        if exc.inserted:
+            retrain_model()
+        flash(f"Import stopped: {exc}", "error")
+        return redirect("/dashboard")
+
+    if inserted:
+        retrain_model()
+    for message, category in import_summary_messages(inserted, rejected, errors):
+        flash(message, category)
+    return redirect("/dashboard")
+
+
+@app.cli.command("build-static")
+def build_static_command():
+    """Minify and fingerprint static/ into static/dist (also done at startup)."""
+    manifest = build_static_assets(app.static_folder)
+    for source, hashed in sorted(manifest.items()):
+        click.echo(f"{source} -> {hashed}")
+
+
+@app.cli.command("storage-sweep")
+def storage_sweep_command():
+    """Delete orphaned uploads now instead of waiting for the background sweeper."""
+    removed, freed = sweep_orphaned_files()
+    click.echo(f"Removed {removed} orphaned file(s), freed {freed / 1048576:.2f} MB.")
+
+
+@app.cli.command("shard-split")
+@click.option("--keep-source", is_flag=True, help="Leave the copied rows in database.db as well.")
+def shard_split_command(keep_source):
+    """Move per-user rows from database.db into the SHARD_COUNT shard files."""
+    init_db()
+    try:
+        moved = split_into_shards(delete_source=not keep_source)
+    except ShardSplitError as exc:
+        raise click.ClickException(str(exc))
+    for table, count in moved.items():
+        click.echo(f"{table}: {count} row(s) -> {SHARD_COUNT} shard(s) in {SHARD_DIR}/")
+
+
+@app.cli.command("profile-token")
+@click.option("--minutes", default=15, show_default=True, help="How long the token stays valid.")
+def profile_token_command(minutes):
+    """Print an X-Profile header value for profiling requests (needs PROFILER_SECRET)."""
+    try:
+        token = make_profile_token(minutes * 60)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc))
+    click.echo(f"X-Profile: {token}")
+
+
+# ---------------------------
+# SERVING (multi-worker)
+# ---------------------------
+SERVE_WARM_VOICE = os.getenv("SERVE_WARM_VOICE", "1") == "1"
+
+
+def warm_caches():
+    # Everything loaded here before fork is shared copy-on-write by all workers.
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    import sklearn.feature_extraction.text  # noqa: F401  (train_model imports lazily)
+    import sklearn.linear_model  # noqa: F401
+    from PIL import Image
+    Image.init()
+    for loader in (load_reportlab, load_pyarrow):
+        try:
+            loader()
+        except (ReportUnavailableError, ExportUnavailableError):
+            pass
+
+
+def start_background_workers():
+    start_outbox_worker()
+    start_reminder_scheduler()
+    start_storage_sweeper()
+
+
+def start_server_worker():
+    start_background_workers()
+    if SERVE_WARM_VOICE:
+        try:
+            error = warm_voice_pool()
+        except Exception as exc:
+            error = str(exc)
+        if error:
+            # The voice route reports an unavailable engine on use; do not fail the worker.
+            app.logger.warning("Voice transcription unavailable: %s", error)
+
+
+def stop_server_worker():
+    # In-flight requests have finished; let queued voice, PDF and hashing jobs complete too.
+    shutdown_voice_pool(wait=True)
+    shutdown_report_pool(wait=True)
+    shutdown_hasher_pool(wait=True)
+    stop_outbox_worker()
+    stop_reminder_scheduler()
+    stop_storage_sweeper()
+
+
+def prepare_server():
+    init_db()
+    warm_caches()
+
+
+@app.cli.command("serve")
+@click.option("--bind", default=SERVE_BIND, show_default=True)
+@click.option("--workers", default=SERVE_WORKERS, show_default=True, type=int)
+@click.option("--threads", default=SERVE_THREADS, show_default=True, type=int, help="Threads per worker.")
+def serve_command(bind, workers, threads):
+    """Run the production server: pre-forked workers sharing one preloaded app."""
+    try:
+        run_server(app, prepare_server, start_server_worker, stop_server_worker, bind, workers, threads)
+    except ServerUnavailableError as exc:
+        raise click.ClickException(str(exc))
+
+
+@app.cli.command("import-expenses")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--email", required=True, help="Account that will own the imported expenses.")
+def import_expenses_command(csv_path, email):
+    """Bulk import expenses from a bank or app CSV file."""
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT person_name, description, amount, status, transaction_date
-        FROM personal_transactions
-        WHERE user_id = ?
-        ORDER BY created_at DESC
-    """, (session["user_id"],))
-    rows = cursor.fetchall()
+    user = conn.execute("SELECT id FROM users WHERE email = ?", (email.strip().lower(),)).fetchone()
     conn.close()
+    if not user:
+        raise click.ClickException(f"No user with email {email}")
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Person", "Description", "Amount", "Status", "Date"])
-    for row in rows:
-        writer.writerow([
-            row["person_name"],
-            row["description"],
-            float(row["amount"]),
-            row["status"],
-            row["transaction_date"],
-        ])
-
-    response = make_response(output.getvalue())
-    response.headers["Content-Type"] = "text/csv; charset=utf-8"
-    response.headers["Content-Disposition"] = "attachment; filename=personal_transactions.csv"
-    return response
+    started = time.time()
+    with open(csv_path, encoding="utf-8-sig", newline="") as handle:
+        try:
+            inserted, rejected, errors = import_expenses_csv(handle, user["id"], ALLOWED_CATEGORIES, ALLOWED_STATUS)
+        except ImportFormatError as exc:
+            if exc.inserted:
+                train_model()
+            raise click.ClickException(str(exc))
+    parsed_seconds = time.time() - started
+
+    if inserted:
+        train_model()
+    click.echo(f"Imported {inserted} row(s), skipped {rejected} in {parsed_seconds:.2f}s "
+               f"(retrain {time.time() - started - parsed_seconds:.2f}s).")
+    for line, reason in errors:
+        click.echo(f"  line {line}: {reason}")
 
 
 @app.route("/add_recurring_expense", methods=["POST"])
@@ -1713,7 +1853,7 @@ def add_recurring_expense():
         reminder_days = 3
     reminder_days = max(0, min(reminder_days, 30))
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO recurring_expenses
@@ -1731,7 +1871,7 @@ def mark_recurring_paid(id):
     if "user_id" not in session:
         return redirect("/login")
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     ensure_recurring_last_paid_column(cursor)
     cursor.execute("""
@@ -1769,7 +1909,7 @@ def mark_recurring_paid(id):
     conn.commit()
     conn.close()
 
-    train_model()
+    retrain_model()
     flash(f"Marked paid for '{rec['title']}'. Next due: {next_due.isoformat()}", "success")
     return redirect("/dashboard")
 
@@ -1792,7 +1932,7 @@ def set_budget():
         flash("Monthly budget must be greater than 0.", "error")
         return redirect("/dashboard")
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("PRAGMA table_info(budgets)")
     budget_cols = [row[1] for row in cursor.fetchall()]
@@ -1875,7 +2015,7 @@ def change_password():
     cursor = conn.cursor()
     cursor.execute("SELECT password FROM users WHERE id = ?", (session["user_id"],))
     user = cursor.fetchone()
-    if not user or not check_password_hash(user["password"], current_password):
+    if not user or not verify_password(user["password"], current_password):
         conn.close()
         flash("Current password is incorrect.", "error")
         return redirect("/dashboard")
@@ -1884,7 +2024,7 @@ def change_password():
         UPDATE users
         SET password = ?
         WHERE id = ?
-    """, (generate_password_hash(new_password), session["user_id"]))
+    """, (hash_password(new_password), session["user_id"]))
     conn.commit()
     conn.close()
     flash("Password changed successfully.", "success")
@@ -2058,7 +2198,7 @@ def set_password_after_otp():
         UPDATE users
         SET password = ?
         WHERE id = ?
-    """, (generate_password_hash(new_password), target_user_id))
+    """, (hash_password(new_password), target_user_id))
     conn.commit()
     conn.close()
 
@@ -2097,20 +2237,35 @@ def upload_profile_photo():
         flash("Only JPG, PNG, or WEBP images are allowed.", "error")
         return redirect("/dashboard")
 
-    os.makedirs(PROFILE_UPLOAD_DIR, exist_ok=True)
-    stored_name = f"user_{session['user_id']}_{int(datetime.now().timestamp())}{ext}"
-    filepath = os.path.join(PROFILE_UPLOAD_DIR, stored_name)
-    file.save(filepath)
+    try:
+        stored_name, files = render_profile_photo(file.read(), session["user_id"])
+    except InvalidPhotoError as exc:
+        flash(f"{exc}.", "error")
+        return redirect("/dashboard")
 
+    paths = [os.path.join(PROFILE_UPLOAD_DIR, name) for name, _ in files]
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE users
-        SET profile_photo = ?
-        WHERE id = ?
-    """, (stored_name, session["user_id"]))
-    conn.commit()
-    conn.close()
+    try:
+        with conn:
+            # Variant names repeat when the same image is uploaded again. Holding the write
+            # lock from writing the files to registering them keeps the orphan sweeper from
+            # unlinking a file that is about to be claimed again.
+            conn.execute("BEGIN IMMEDIATE")
+            written = sum(len(content) for _, content in files)
+            check_quota(conn, session["user_id"], written - registered_bytes(conn, paths))
+            write_profile_photo(files, PROFILE_UPLOAD_DIR)
+            # Replacing profile_photo orphans the previous variants (trigger); the sweeper deletes them.
+            register_files(conn, session["user_id"], "profile_photo", paths, "users", session["user_id"], stored_name)
+            conn.execute("""
+                UPDATE users
+                SET profile_photo = ?
+                WHERE id = ?
+            """, (stored_name, session["user_id"]))
+    except StorageQuotaError as exc:
+        flash(f"{exc}.", "error")
+        return redirect("/dashboard")
+    finally:
+        conn.close()
 
     flash("Profile photo updated.", "success")
     return redirect("/dashboard")
@@ -2121,7 +2276,7 @@ def toggle_recurring_expense(id):
     if "user_id" not in session:
         return redirect("/login")
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("""
         UPDATE recurring_expenses
@@ -2139,7 +2294,7 @@ def delete_recurring_expense(id):
     if "user_id" not in session:
         return redirect("/login")
 
-    conn = get_db()
+    conn = get_user_db(session["user_id"])
     cursor = conn.cursor()
     cursor.execute("""
         DELETE FROM recurring_expenses
@@ -2152,7 +2307,15 @@ def delete_recurring_expense(id):
 
 if __name__ == "__main__":
     init_db()
+    start_background_workers()
     host = os.getenv("FLASK_HOST", "127.0.0.1")
     port = int(os.getenv("FLASK_PORT", "5000"))
     debug = os.getenv("FLASK_DEBUG", "0") == "1"
+
+    def shut_down(_signum, _frame):
+        # Pool processes inherit the listening socket; stop them so the port is really freed.
+        stop_server_worker()
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shut_down)
     app.run(host=host, port=port, debug=debug, use_reloader=False)
@@ -0,0 +1,169 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_extraction import git_revision, load_manifest, read_corpus_file  # noqa: E402
+from seed_data import create_scratch_app, generate  # noqa: E402
+
+CHAT_MESSAGES = ["spent 250 on pizza", "paid 1200 for electricity bill", "uber ride 340", "bought shoes for 2499"]
+
+
+# ---------------------------
+# TIMING
+# ---------------------------
+def measure(fn, rounds, warmup):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    mean = statistics.fmean(timings)
+    return {
+        "rounds": rounds,
+        "min": timings[0],
+        "max": timings[-1],
+        "mean": mean,
+        "median": statistics.median(timings),
+        "stddev": statistics.stdev(timings) if rounds > 1 else 0.0,
+        "p95": timings[min(rounds - 1, int(round(0.95 * (rounds - 1))))],
+        "ops": 1 / mean if mean else 0.0,
+    }
+
+
+# ---------------------------
+# SCENARIOS
+# ---------------------------
+def http_scenario(client, method, path, data=None, expect=(200,)):
+    # data may be a callable so each round can post a different form.
+    def run():
+        response = client.open(path, method=method, data=data() if callable(data) else data)
+        response.get_data()
+        response.close()
+        if response.status_code not in expect:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}")
+    return run
+
+
+def scenarios(app_module, heavy_user, typical_user):
+    from modules.text_extraction import extract_personal_payment_details, extract_receipt_amount, parse_expense_message
+
+    clients = {}
+    csrf = app_module.mask_csrf_token("bench")
+    for label, user_id in (("heavy", heavy_user), ("typical", typical_user)):
+        client = app_module.app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = user_id
+            sess["csrf_token"] = "bench"
+        clients[label] = client
+
+    chat_cycle = itertools.cycle(CHAT_MESSAGES)
+    manifest = load_manifest()
+    receipts = [read_corpus_file(d["file"]) for d in manifest["documents"] if d["kind"] == "receipt"]
+    payments = [read_corpus_file(d["file"]) for d in manifest["documents"] if d["kind"] != "receipt"]
+    commands = [line.strip() for line in read_corpus_file(manifest["commands"]).splitlines() if line.strip()]
+
+    suite = []
+    for label, client in clients.items():
+        suite += [
+            ("http", f"dashboard[{label}]", http_scenario(client, "GET", "/dashboard")),
+            ("http", f"chart_data[{label}]", http_scenario(client, "GET", "/api/chart_data?bucket=month")),
+            ("http", f"export_csv[{label}]", http_scenario(client, "GET", "/export_expenses_csv")),
+            ("http", f"export_ndjson[{label}]", http_scenario(client, "GET", "/export_expenses_ndjson")),
+        ]
+    typical = clients["typical"]
+    suite += [
+        ("http", "add[typical]", http_scenario(typical, "POST", "/add", {
+            "csrf_token": csrf, "name": "coffee with team", "amount": "180", "manual_category": "Food",
+        }, expect=(302,))),
+        ("http", "chat_add[typical]", http_scenario(typical, "POST", "/chat_add", lambda: {
+            "csrf_token": csrf, "message": next(chat_cycle),
+        }, expect=(302,))),
+        ("extraction", "extract_receipt_amount[corpus]", lambda: [extract_receipt_amount(t) for t in receipts]),
+        ("extraction", "extract_personal_payment_details[corpus]",
+         lambda: [extract_personal_payment_details(t) for t in payments]),
+        ("extraction", "parse_expense_message[corpus]", lambda: [parse_expense_message(t) for t in commands]),
+    ]
+    return suite
+
+
+# ---------------------------
+# REPORT
+# ---------------------------
+def compare(report, baseline_path):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = {b["name"]: b["stats"] for b in json.load(fh)["benchmarks"]}
+    print(f"\nCompared with {baseline_path}:")
+    for bench in report["benchmarks"]:
+        old = baseline.get(bench["name"])
+        if not old:
+            continue
+        change = (bench["stats"]["median"] - old["median"]) / old["median"] * 100 if old["median"] else 0.0
+        print(f"  {bench['name']:42s} {old['median'] * 1000:9.2f}ms -> {bench['stats']['median'] * 1000:9.2f}ms "
+              f"({change:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark suite over seeded data (Flask test client).")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--expenses", type=int, default=20000)
+    parser.add_argument("--personal", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("-k", dest="select", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--json", dest="json_path", help="write the report to this file")
+    parser.add_argument("--compare", help="print median changes against an earlier --json report")
+    args = parser.parse_args()
+    # The predictor's feature-name warning would otherwise print once per dashboard render.
+    warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
+
+    # Report paths are relative to where the suite was started, not the scratch directory.
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    app_module = create_scratch_app()
+    conn = app_module.get_db()
+    counts = generate(conn, args.users, args.expenses, args.personal)
+    conn.close()
+    app_module.train_model()
+    heavy_user, typical_user = 1, args.users // 2 + 1
+
+    report = {
+        "datetime": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": {"rounds": args.rounds, "warmup": args.warmup, "seed_counts": counts},
+        "benchmarks": [],
+    }
+    print(f"{'name':42s} {'min':>9s} {'median':>9s} {'p95':>9s} {'ops/s':>9s}")
+    for group, name, fn in scenarios(app_module, heavy_user, typical_user):
+        if args.select and args.select not in name:
+            continue
+        stats = measure(fn, args.rounds, args.warmup)
+        report["benchmarks"].append({"group": group, "name": name, "stats": stats})
+        print(f"{name:42s} {stats['min'] * 1000:8.2f}ms {stats['median'] * 1000:8.2f}ms "
+              f"{stats['p95'] * 1000:8.2f}ms {stats['ops']:9.1f}")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    if compare_path:
+        compare(report, compare_path)
+
+
+if __name__ == "__main__":
+    main()
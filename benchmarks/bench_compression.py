@@ -0,0 +1,67 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENDPOINTS = ["/dashboard", "/api/chart_data?bucket=week&start=2025-01-01&end=2025-12-31", "/export_expenses_csv"]
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def seed(app_module, rows):
+    rng = random.Random(3)
+    conn = app_module.get_db()
+    conn.execute("INSERT INTO users (name, email, password) VALUES ('Bench', 'bench@example.com', 'x')")
+    conn.executemany(
+        "INSERT INTO expenses (user_id, description, category, amount, status, expense_date) VALUES (1, ?, ?, ?, ?, ?)",
+        [
+            (f"expense {i}", rng.choice(sorted(app_module.ALLOWED_CATEGORIES)), round(rng.uniform(10, 3000), 2),
+             "Received" if rng.random() < 0.1 else "Send", f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+            for i in range(rows)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes on the wire and compression CPU per response.")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # The app keeps its SQLite file in the working directory.
+    os.chdir(tempfile.mkdtemp())
+    import app as app_module
+    from modules import compression
+
+    app_module.init_db()
+    seed(app_module, args.rows)
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = 1
+
+    for path in ENDPOINTS:
+        for encoding in ENCODINGS:
+            if encoding == "br" and compression._brotli_module is None:
+                continue
+            before = compression.compression_stats().get(encoding, {})
+            wire = 0
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                response = client.get(path, headers={"Accept-Encoding": encoding})
+                wire = len(b"".join(response.response))
+                response.close()
+            wall_ms = (time.perf_counter() - started) / args.repeat * 1000
+            after = compression.compression_stats().get(encoding, {})
+            cpu_ms = (after.get("cpu_seconds", 0.0) - before.get("cpu_seconds", 0.0)) / args.repeat * 1000
+            print(f"{path[:40]:<40} {encoding:<8} wire={wire / 1024:9.1f}KB "
+                  f"compress_cpu={cpu_ms:7.2f}ms request={wall_ms:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules import exports  # noqa: E402
+
+
+CATEGORIES = ["Food", "Shopping", "Bills", "Travel", "Others"]
+WORDS = ["swiggy", "uber", "rent", "grocery", "amazon", "petrol", "coffee", "movie", "electricity", "pharmacy"]
+
+
+def build_database(path, rows):
+    rng = random.Random(7)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            description TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount REAL NOT NULL,
+            status TEXT DEFAULT 'Send',
+            expense_date DATE DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE TABLE personal_transactions (user_id INTEGER, created_at TIMESTAMP)")
+    exports.ensure_export_indexes(conn.cursor())
+    conn.executemany(
+        "INSERT INTO expenses (user_id, description, category, amount, status, expense_date) VALUES (1, ?, ?, ?, ?, ?)",
+        (
+            (
+                f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                rng.choice(CATEGORIES),
+                round(rng.uniform(10, 5000), 2),
+                "Received" if rng.random() < 0.1 else "Send",
+                f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            )
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def load_csv(data):
+    return sum(1 for _ in csv.reader(io.StringIO(data.decode("utf-8")))) - 1
+
+
+def load_ndjson(data):
+    return sum(1 for line in data.decode("utf-8").splitlines() if json.loads(line))
+
+
+def load_parquet(data):
+    import pyarrow.parquet as pq
+    return pq.read_table(io.BytesIO(data)).num_rows
+
+
+def run(fmt, iter_rows, load):
+    start = time.perf_counter()
+    data = b"".join(iter_rows("expenses", 1))
+    export_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = load(data)
+    load_s = time.perf_counter() - start
+    print(f"{fmt:<9} size={len(data) / 1e6:8.2f}MB export={export_s:6.2f}s load={load_s:6.2f}s rows={loaded}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export size and time per format, plus time to load the file back.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    formats = [
+        ("csv", exports.iter_csv, load_csv),
+        ("csv.gz", lambda name, user_id: exports.gzip_chunks(exports.iter_csv(name, user_id)),
+         lambda data: load_csv(gzip.decompress(data))),
+        ("ndjson", exports.iter_ndjson, load_ndjson),
+    ]
+    try:
+        exports.load_pyarrow()
+        formats.append(("parquet", exports.iter_parquet, load_parquet))
+    except exports.ExportUnavailableError as exc:
+        print(f"skipping parquet: {exc}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exports.DATABASE = os.path.join(tmp, "bench.db")
+        build_database(exports.DATABASE, args.rows)
+        for fmt, iter_rows, load in formats:
+            run(fmt, iter_rows, load)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(ROOT, "benchmarks", "corpus")
+sys.path.insert(0, ROOT)
+
+from modules.text_extraction import (  # noqa: E402
+    extract_personal_payment_details,
+    extract_receipt_amount,
+    parse_expense_message,
+)
+
+
+# ---------------------------
+# CORPUS
+# ---------------------------
+def load_manifest():
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def read_corpus_file(name):
+    with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as fh:
+        return fh.read()
+
+
+def regenerate_from_images(manifest):
+    # Re-OCR the bundled images with the same tesseract configs the upload routes use.
+    from modules.ocr import ocr_payment_text, ocr_receipt_text
+    from PIL import Image
+
+    for doc in manifest["documents"]:
+        image = Image.open(os.path.join(ROOT, doc["source"]))
+        text = ocr_receipt_text(image) if doc["kind"] == "receipt" else ocr_payment_text(image)
+        with open(os.path.join(CORPUS_DIR, doc["file"]), "w", encoding="utf-8") as fh:
+            fh.write(text)
+        print(f"regenerated {doc['file']} from {doc['source']}")
+
+    import pytesseract
+
+    manifest["text_source"] = f"tesseract {pytesseract.get_tesseract_version()}"
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+        fh.write("\n")
+
+
+# ---------------------------
+# BENCHMARK
+# ---------------------------
+def time_per_document(fn, docs, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for doc in docs:
+            fn(doc)
+    elapsed = time.perf_counter() - start
+    count = iterations * len(docs)
+    return {
+        "documents": count,
+        "seconds": round(elapsed, 6),
+        "us_per_doc": round((elapsed / count) * 1e6, 3) if count else 0.0,
+        "docs_per_sec": round(count / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return ""
+
+
+def run(iterations):
+    manifest = load_manifest()
+    receipts = [read_corpus_file(d["file"]) for d in manifest["documents"] if d["kind"] == "receipt"]
+    payments = [read_corpus_file(d["file"]) for d in manifest["documents"] if d["kind"] != "receipt"]
+    commands = [
+        line.strip()
+        for line in read_corpus_file(manifest["commands"]).splitlines()
+        if line.strip()
+    ]
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "iterations": iterations,
+        "results": {
+            "extract_receipt_amount": time_per_document(extract_receipt_amount, receipts, iterations),
+            "extract_personal_payment_details": time_per_document(
+                extract_personal_payment_details, payments, iterations
+            ),
+            "parse_expense_message": time_per_document(parse_expense_message, commands, iterations),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the text extraction engine over the bundled corpus.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--record", help="append the run as one JSON line to this file")
+    parser.add_argument("--ocr", action="store_true", help="regenerate corpus text from uploads/ images first")
+    args = parser.parse_args()
+
+    if args.ocr:
+        regenerate_from_images(load_manifest())
+
+    report = run(args.iterations)
+    for name, stats in report["results"].items():
+        print(f"{name:34s} {stats['us_per_doc']:>10.1f} us/doc {stats['docs_per_sec']:>12.1f} docs/s")
+
+    if args.record:
+        with open(args.record, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
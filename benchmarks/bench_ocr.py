@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_extraction import git_revision, load_manifest, read_corpus_file  # noqa: E402
+from modules.text_extraction import extract_personal_payment_details, extract_receipt_amount  # noqa: E402
+
+AMOUNT_TOLERANCE = 0.01
+
+
+# ---------------------------
+# PIPELINE (same steps as /upload_receipt and /upload_personal_transaction)
+# ---------------------------
+def ocr_text(doc, data):
+    from modules.ocr import ocr_payment_text, ocr_receipt_text, open_upload_image
+
+    image = open_upload_image(data)
+    return ocr_receipt_text(image) if doc["kind"] == "receipt" else ocr_payment_text(image)
+
+
+def extract(doc, text):
+    if doc["kind"] == "receipt":
+        return {"amount": extract_receipt_amount(text)}
+    person, _, amount, status = extract_personal_payment_details(text)
+    return {"person": person, "amount": amount, "status": status}
+
+
+def field_matches(field, expected, actual):
+    if field == "amount":
+        return actual is not None and abs(float(actual) - float(expected)) <= AMOUNT_TOLERANCE
+    if field == "person":
+        return " ".join(str(actual or "").split()).lower() == " ".join(expected.split()).lower()
+    return actual == expected
+
+
+# ---------------------------
+# BENCHMARK
+# ---------------------------
+def run_document(doc, repeat, text_only):
+    if text_only:
+        data = None
+        text = read_corpus_file(doc["file"])
+    else:
+        with open(os.path.join(ROOT, doc["source"]), "rb") as fh:
+            data = fh.read()
+
+    ocr_times = []
+    extract_times = []
+    for _ in range(repeat):
+        if not text_only:
+            started = time.perf_counter()
+            text = ocr_text(doc, data)
+            ocr_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        result = extract(doc, text)
+        extract_times.append(time.perf_counter() - started)
+
+    fields = {
+        field: {"expected": expected, "actual": result.get(field), "ok": field_matches(field, expected, result.get(field))}
+        for field, expected in doc["expected"].items()
+    }
+    ocr_ms = statistics.median(ocr_times) * 1000 if ocr_times else 0.0
+    extract_ms = statistics.median(extract_times) * 1000
+    return {
+        "source": doc["source"],
+        "kind": doc["kind"],
+        "ocr_ms": round(ocr_ms, 2),
+        "extract_ms": round(extract_ms, 3),
+        "total_ms": round(ocr_ms + extract_ms, 2),
+        "fields": fields,
+        "correct": all(f["ok"] for f in fields.values()),
+    }
+
+
+def run(repeat, text_only):
+    manifest = load_manifest()
+    docs = [doc for doc in manifest["documents"] if doc.get("expected")]
+    started = time.perf_counter()
+    results = [run_document(doc, repeat, text_only) for doc in docs]
+    elapsed = time.perf_counter() - started
+
+    field_results = [f["ok"] for r in results for f in r["fields"].values()]
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "mode": "text-only" if text_only else "ocr",
+        # Text-only accuracy is only as real as the corpus text; see corpus/README.md.
+        "text_source": manifest.get("text_source", "unknown") if text_only else "ocr",
+        "tesseract": "" if text_only else tesseract_version(),
+        "repeat": repeat,
+        "documents": results,
+        "summary": {
+            "images": len(results),
+            "images_per_sec": round(len(results) * repeat / elapsed, 2) if elapsed else 0.0,
+            "median_total_ms": round(statistics.median(r["total_ms"] for r in results), 2) if results else 0.0,
+            "document_accuracy": round(sum(r["correct"] for r in results) / len(results), 4) if results else 0.0,
+            "field_accuracy": round(sum(field_results) / len(field_results), 4) if field_results else 0.0,
+        },
+    }
+
+
+def tesseract_version():
+    import pytesseract
+
+    return str(pytesseract.get_tesseract_version())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR + extraction latency and accuracy over the labeled sample images.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per image (median is reported)")
+    parser.add_argument("--text-only", action="store_true",
+                        help="skip tesseract and score extraction on the cached corpus text")
+    parser.add_argument("--record", help="append the run as one JSON line to this file")
+    parser.add_argument("--min-accuracy", type=float, help="exit non-zero if field accuracy falls below this")
+    args = parser.parse_args()
+
+    if not args.text_only:
+        try:
+            tesseract_version()
+        except Exception as exc:
+            raise SystemExit(f"tesseract is not available ({exc.__class__.__name__}); install it or use --text-only")
+
+    report = run(args.repeat, args.text_only)
+    for doc in report["documents"]:
+        misses = ", ".join(f"{name}={f['actual']!r} (want {f['expected']!r})" for name, f in doc["fields"].items() if not f["ok"])
+        print(f"{os.path.basename(doc['source'])[:44]:44s} {doc['ocr_ms']:9.1f}ms ocr {doc['extract_ms']:8.3f}ms extract  "
+              f"{'ok' if doc['correct'] else 'MISS ' + misses}")
+    summary = report["summary"]
+    print(f"\n{summary['images']} images, {summary['images_per_sec']} images/s, median {summary['median_total_ms']}ms; "
+          f"accuracy {summary['document_accuracy'] * 100:.1f}% of images, {summary['field_accuracy'] * 100:.1f}% of fields "
+          f"({report['mode']})")
+    if report["text_source"] == "hand-transcribed":
+        print("note: the corpus text was transcribed by hand, not produced by tesseract; this scores the "
+              "extractor on clean text only. Regenerate it with bench_extraction.py --ocr.")
+
+    if args.record:
+        with open(args.record, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(report) + "\n")
+    if args.min_accuracy is not None and summary["field_accuracy"] < args.min_accuracy:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
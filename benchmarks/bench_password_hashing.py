@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from werkzeug.security import check_password_hash, generate_password_hash  # noqa: E402
+
+
+def verify_batch(stored_hash, count):
+    for _ in range(count):
+        check_password_hash(stored_hash, "correct horse battery staple")
+    return count
+
+
+def run(method, workers, logins):
+    stored_hash = generate_password_hash("correct horse battery staple", method=method)
+
+    start = time.perf_counter()
+    verify_batch(stored_hash, 3)
+    single_ms = (time.perf_counter() - start) / 3 * 1000
+
+    per_worker = max(1, logins // workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pool.submit(verify_batch, stored_hash, 1).result()  # spawn workers before timing
+        start = time.perf_counter()
+        done = sum(f.result() for f in [pool.submit(verify_batch, stored_hash, per_worker) for _ in range(workers)])
+        elapsed = time.perf_counter() - start
+
+    rate = done / elapsed
+    print(f"{method:<24} workers={workers:>2} verify={single_ms:7.1f}ms "
+          f"logins/s={rate:8.1f} per-core={rate / workers:7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login password verifications per second per core.")
+    parser.add_argument("--methods", nargs="+", default=["scrypt:32768:8:1", "scrypt:16384:8:1", "pbkdf2:sha256:600000"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=40)
+    args = parser.parse_args()
+
+    for method in args.methods:
+        for workers in sorted(set(args.workers)):
+            run(method, workers, args.logins)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.rate_limiter import MemoryRateLimitBackend, SQLiteRateLimitBackend  # noqa: E402
+
+
+def fill(backend, keys):
+    for i in range(keys):
+        backend.hit(f"login:ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 30, 60)
+        if i % 4 == 0:
+            backend.set_login_lock(f"user{i}@example.com|10.0.0.{i & 255}", {"count": 1, "lock_until": 0}, 300)
+
+
+def time_checks(backend, keys, checks):
+    start = time.perf_counter()
+    for i in range(checks):
+        j = (i * 7919) % keys
+        backend.hit(f"login:ip:10.{j >> 16 & 255}.{j >> 8 & 255}.{j & 255}", 30, 60)
+    hit_us = (time.perf_counter() - start) / checks * 1e6
+
+    start = time.perf_counter()
+    for i in range(checks):
+        j = ((i * 7919) % keys) & ~3
+        backend.get_login_lock(f"user{j}@example.com|10.0.0.{j & 255}")
+    lock_us = (time.perf_counter() - start) / checks * 1e6
+
+    start = time.perf_counter()
+    for i in range(min(checks, 1000)):
+        backend.clear_login_locks_for_email(f"user{(i * 4) % keys}@example.com")
+    clear_us = (time.perf_counter() - start) / min(checks, 1000) * 1e6
+    return hit_us, lock_us, clear_us
+
+
+def run_memory(keys, checks):
+    tracemalloc.start()
+    backend = MemoryRateLimitBackend()
+    start = time.perf_counter()
+    fill(backend, keys)
+    fill_s = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    hit_us, lock_us, clear_us = time_checks(backend, keys, checks)
+    print(f"memory  keys={keys:>9} fill={fill_s:7.2f}s mem={current / 1e6:8.1f}MB "
+          f"hit={hit_us:6.2f}us lock={lock_us:6.2f}us clear={clear_us:6.2f}us")
+
+
+def run_sqlite(keys, checks):
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteRateLimitBackend(os.path.join(tmp, "ratelimit.db"))
+        start = time.perf_counter()
+        fill(backend, keys)
+        fill_s = time.perf_counter() - start
+        hit_us, lock_us, clear_us = time_checks(backend, keys, checks)
+        size_mb = os.path.getsize(backend.path) / 1e6
+        print(f"sqlite  keys={keys:>9} fill={fill_s:7.2f}s file={size_mb:7.1f}MB "
+              f"hit={hit_us:6.2f}us lock={lock_us:6.2f}us clear={clear_us:6.2f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limiter check cost as the key count grows.")
+    parser.add_argument("--keys", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--checks", type=int, default=50_000)
+    parser.add_argument("--backend", choices=["memory", "sqlite", "all"], default="all")
+    args = parser.parse_args()
+
+    for keys in args.keys:
+        if args.backend in ("memory", "all"):
+            run_memory(keys, args.checks)
+        if args.backend in ("sqlite", "all"):
+            run_sqlite(keys, args.checks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import argparse
+import gzip
+import http.client
+import itertools
+import json
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_extraction import git_revision  # noqa: E402
+
+CSRF_META_PATTERN = re.compile(rb'<meta name="csrf-token" content="([^"]+)"')
+CHAT_MESSAGES = ["spent 250 on pizza", "paid 1200 for electricity bill", "uber ride 340", "bought shoes for 2499"]
+
+# Each session logs in, runs one or more journeys, then logs out. Weights are relative.
+JOURNEYS = {
+    "browse": (0.55, ["dashboard", "chart_data", "dashboard"]),
+    "record": (0.30, ["dashboard", "add", "dashboard", "chat_add", "dashboard"]),
+    "export": (0.15, ["dashboard", "export_csv"]),
+}
+
+
+# ---------------------------
+# VIRTUAL USER
+# ---------------------------
+class VirtualUser:
+    # One browser: a keep-alive connection, its own session cookie and client address.
+    def __init__(self, base_url, index, record):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = None
+        self.cookies = {}
+        self.csrf = ""
+        self.record = record
+        # The login rate limits are per client IP (X-Forwarded-For) and per account.
+        self.forwarded_for = f"10.{index // 250 % 250}.{index % 250}.1"
+
+    def request(self, name, method, path, form=None, expect=(200,)):
+        body = urlencode(form).encode() if form is not None else None
+        headers = {"X-Forwarded-For": self.forwarded_for, "Accept-Encoding": "gzip"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            if response.getheader("Content-Encoding") == "gzip":
+                data = gzip.decompress(data)
+        except (OSError, http.client.HTTPException) as exc:
+            self.conn = None
+            self.record(name, time.perf_counter() - started, False, type(exc).__name__)
+            return None, b""
+        elapsed = time.perf_counter() - started
+        for header in response.msg.get_all("Set-Cookie") or []:
+            for key, morsel in SimpleCookie(header).items():
+                self.cookies[key] = morsel.value
+        ok = response.status in expect
+        self.record(name, elapsed, ok, None if ok else f"HTTP {response.status}")
+        match = CSRF_META_PATTERN.search(data) if response.status == 200 else None
+        if match:
+            self.csrf = match.group(1).decode()
+        return response, data
+
+    def login(self, email, password):
+        self.request("login_page", "GET", "/login")
+        response, _ = self.request("login", "POST", "/login", {"csrf_token": self.csrf, "email": email,
+                                                                "password": password}, expect=(302,))
+        # A rate-limited or failed login re-renders the form (200) and is counted as an error.
+        return response is not None and response.status == 302
+
+    def step(self, action, rng):
+        if action == "dashboard":
+            self.request("dashboard", "GET", "/dashboard")
+        elif action == "chart_data":
+            self.request("chart_data", "GET", f"/api/chart_data?bucket={rng.choice(['day', 'week', 'month'])}")
+        elif action == "add":
+            self.request("add", "POST", "/add", {"csrf_token": self.csrf, "name": "coffee with team",
+                                                 "amount": str(rng.randint(50, 900)), "manual_category": "Food"},
+                         expect=(302,))
+        elif action == "chat_add":
+            self.request("chat_add", "POST", "/chat_add", {"csrf_token": self.csrf, "message": rng.choice(CHAT_MESSAGES)},
+                         expect=(302,))
+        elif action == "export_csv":
+            self.request("export_csv", "GET", "/export_expenses_csv")
+
+    def logout(self):
+        self.request("logout", "GET", "/logout", expect=(302,))
+        self.cookies.clear()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+# ---------------------------
+# RUNNER
+# ---------------------------
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # name -> [latency seconds]
+        self.errors = {}  # name -> {reason: count}
+        self.measuring = False
+
+    def record(self, name, seconds, ok, reason):
+        if not self.measuring:
+            return
+        with self.lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                counts = self.errors.setdefault(name, {})
+                counts[reason] = counts.get(reason, 0) + 1
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_virtual_user(index, args, accounts, results, stop_at):
+    rng = random.Random(args.seed + index)
+    user = VirtualUser(args.url, index, results.record)
+    names = list(JOURNEYS)
+    weights = [JOURNEYS[name][0] for name in names]
+    # Stagger start-up over the ramp so logins do not arrive as one burst.
+    time.sleep(args.ramp_up * index / max(1, args.concurrency))
+    try:
+        while time.time() < stop_at:
+            email = next(accounts)
+            if not user.login(email, args.password):
+                time.sleep(1)
+                continue
+            for _ in range(args.journeys_per_login):
+                for action in JOURNEYS[rng.choices(names, weights)[0]][1]:
+                    if time.time() >= stop_at:
+                        return
+                    user.step(action, rng)
+                    if args.think:
+                        time.sleep(rng.expovariate(1 / args.think))
+            user.logout()
+    finally:
+        user.close()
+
+
+def wait_for_port(host, port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def start_local_server(args):
+    # Seeds a scratch directory and runs app.py from it, so the real database.db is untouched.
+    directory = tempfile.mkdtemp(prefix="expense-load-")
+    subprocess.run([sys.executable, os.path.join(BENCH_DIR, "seed_data.py"), "--dir", directory,
+                    "--users", str(args.users), "--expenses", str(args.expenses)], check=True)
+    port = urlsplit(args.url).port or 5000
+    env = dict(os.environ, FLASK_PORT=str(port), FLASK_DEBUG="0", PYTHONWARNINGS="ignore")
+    if args.serve_workers:
+        command = [sys.executable, "-m", "flask", "--app", os.path.join(ROOT, "app.py"), "serve",
+                   "--bind", f"127.0.0.1:{port}", "--workers", str(args.serve_workers)]
+    else:
+        command = [sys.executable, os.path.join(ROOT, "app.py")]
+    if wait_for_port("127.0.0.1", port, timeout=0.5):
+        raise SystemExit(f"port {port} is already in use")
+    # Own process group, so the server and every pool process it forks can be stopped together.
+    server = subprocess.Popen(command, cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    if not wait_for_port("127.0.0.1", port):
+        stop_local_server(server)
+        raise SystemExit("server did not start")
+    return server
+
+
+def stop_local_server(server):
+    try:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+    except ProcessLookupError:
+        return
+    # Pool processes that outlived the parent still hold the listening socket.
+    try:
+        os.killpg(server.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed-loop HTTP load test with scripted user journeys.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--serve", action="store_true", help="seed a scratch database and start app.py for the run")
+    parser.add_argument("--serve-workers", type=int, default=0,
+                        help="with --serve: run `flask serve` with this many workers (0 = development server)")
+    parser.add_argument("--users", type=int, default=200, help="seeded accounts (user1..N@example.com)")
+    parser.add_argument("--expenses", type=int, default=50000, help="seeded expenses across all accounts")
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds before measuring starts")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds over which virtual users start")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between steps (0 = none)")
+    parser.add_argument("--journeys-per-login", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="write the report to this file")
+    args = parser.parse_args()
+
+    server = start_local_server(args) if args.serve else None
+    results = Results()
+    # Accounts are shared round-robin so per-account login limits are spread out.
+    account_lock = threading.Lock()
+    account_cycle = itertools.cycle([f"user{i}@example.com" for i in range(1, args.users + 1)])
+
+    def accounts():
+        while True:
+            with account_lock:
+                yield next(account_cycle)
+
+    stop_at = time.time() + args.warmup + args.duration
+    shared_accounts = accounts()
+    threads = [
+        threading.Thread(target=run_virtual_user, args=(i, args, shared_accounts, results, stop_at), daemon=True)
+        for i in range(args.concurrency)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(args.warmup)
+        results.measuring = True
+        measured_from = time.time()
+        for thread in threads:
+            thread.join()
+        measured = time.time() - measured_from
+    finally:
+        if server is not None:
+            stop_local_server(server)
+
+    report = {
+        "datetime": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("password", "json_path")},
+        "measured_seconds": round(measured, 2),
+        "endpoints": {},
+    }
+    print(f"{'endpoint':12s} {'requests':>9s} {'req/s':>8s} {'errors':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    total = errors_total = 0
+    for name in sorted(results.samples):
+        latencies = sorted(results.samples[name])
+        errors = sum(results.errors.get(name, {}).values())
+        total += len(latencies)
+        errors_total += errors
+        entry = {
+            "requests": len(latencies),
+            "throughput": round(len(latencies) / measured, 2),
+            "error_rate": round(errors / len(latencies), 4),
+            "errors": results.errors.get(name, {}),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        }
+        report["endpoints"][name] = entry
+        print(f"{name:12s} {entry['requests']:9d} {entry['throughput']:8.1f} {entry['error_rate'] * 100:7.2f}% "
+              f"{entry['p50_ms']:8.1f}ms {entry['p95_ms']:8.1f}ms {entry['p99_ms']:8.1f}ms")
+    report["total"] = {"requests": total, "throughput": round(total / measured, 2),
+                       "error_rate": round(errors_total / total, 4) if total else 0.0}
+    print(f"{'total':12s} {total:9d} {report['total']['throughput']:8.1f} {report['total']['error_rate'] * 100:7.2f}%")
+    for name, reasons in sorted(results.errors.items()):
+        print(f"  {name}: " + ", ".join(f"{reason} x{count}" for reason, count in reasons.items()))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEED_PASSWORD = "benchmark"
+
+# (share of expenses, median amount, lognormal sigma, descriptions)
+CATEGORY_PROFILES = {
+    "Food": (0.38, 260, 0.8, ["swiggy order", "zomato dinner", "grocery run", "coffee", "lunch with team", "bakery"]),
+    "Shopping": (0.20, 900, 1.0, ["amazon order", "flipkart", "clothes", "shoes", "myntra", "electronics"]),
+    "Bills": (0.17, 1400, 0.7, ["electricity bill", "mobile recharge", "internet bill", "water bill", "gas cylinder"]),
+    "Travel": (0.15, 450, 1.1, ["uber ride", "ola cab", "metro card", "petrol", "train ticket", "flight booking"]),
+    "Others": (0.10, 600, 1.2, ["pharmacy", "movie tickets", "gift", "haircut", "donation", "gym"]),
+}
+INCOME_DESCRIPTIONS = ["salary", "refund", "cashback", "freelance payment"]
+PEOPLE = ["Aarav", "Diya", "Rohan", "Priya", "Kabir", "Ananya", "Vikram", "Meera", "Arjun", "Isha", "Rahul", "Sneha"]
+PERSONAL_DESCRIPTIONS = ["dinner split", "trip share", "rent share", "borrowed", "returned", "movie split", "cab share"]
+RECURRING_ITEMS = [
+    ("Rent", "Bills", 15000, "monthly"),
+    ("Netflix", "Others", 649, "monthly"),
+    ("Electricity", "Bills", 1800, "monthly"),
+    ("Internet", "Bills", 799, "monthly"),
+    ("Gym membership", "Others", 1500, "monthly"),
+    ("Milk delivery", "Food", 420, "weekly"),
+    ("Car insurance", "Travel", 12000, "yearly"),
+    ("Amazon Prime", "Shopping", 1499, "yearly"),
+]
+
+
+def lognormal_amount(rng, median, sigma):
+    return round(max(1.0, rng.lognormvariate(math.log(median), sigma)), 2)
+
+
+def spend_date(rng, today, months):
+    # Uniform over the window, with weekends ~30% busier than weekdays.
+    while True:
+        day = today - timedelta(days=rng.randrange(months * 30))
+        if day.weekday() >= 5 or rng.random() < 1 / 1.3:
+            return day
+
+
+def split_counts(rng, total, users):
+    # Heavy-tailed activity: a few users own most rows. Sorted so user 1 is the heaviest.
+    weights = sorted((rng.paretovariate(1.3) for _ in range(users)), reverse=True)
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for index in range(total - sum(counts)):
+        counts[index % users] += 1
+    return counts
+
+
+def expense_rows(rng, user_id, count, today, months):
+    categories = list(CATEGORY_PROFILES)
+    shares = [CATEGORY_PROFILES[c][0] for c in categories]
+    for _ in range(count):
+        day = spend_date(rng, today, months)
+        if rng.random() < 0.06:
+            yield (user_id, rng.choice(INCOME_DESCRIPTIONS), "Others", lognormal_amount(rng, 20000, 0.6), "Received", day.isoformat())
+            continue
+        category = rng.choices(categories, shares)[0]
+        _, median, sigma, words = CATEGORY_PROFILES[category]
+        yield (user_id, rng.choice(words), category, lognormal_amount(rng, median, sigma), "Send", day.isoformat())
+
+
+def generate(conn, users=20, expenses=20000, personal=2000, recurring_per_user=3, months=12, seed=42, password_hash=None):
+    # Fills an initialised (empty) database; returns the number of rows written per table.
+    rng = random.Random(seed)
+    today = date.today()
+    if password_hash is None:
+        from werkzeug.security import generate_password_hash
+        password_hash = generate_password_hash(SEED_PASSWORD)
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (id, name, email, password) VALUES (?, ?, ?, ?)",
+            [(uid, f"Bench User {uid}", f"user{uid}@example.com", password_hash) for uid in range(1, users + 1)],
+        )
+        expense_counts = split_counts(rng, expenses, users)
+        personal_counts = split_counts(rng, personal, users)
+        for uid, count in enumerate(expense_counts, start=1):
+            conn.executemany("""
+                INSERT INTO expenses (user_id, description, category, amount, status, expense_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, expense_rows(rng, uid, count, today, months))
+
+        for uid, count in enumerate(personal_counts, start=1):
+            conn.executemany("""
+                INSERT INTO personal_transactions (user_id, person_name, description, amount, status, transaction_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (uid, rng.choice(PEOPLE), rng.choice(PERSONAL_DESCRIPTIONS), lognormal_amount(rng, 500, 0.9),
+                 "Send" if rng.random() < 0.55 else "Received", spend_date(rng, today, months).isoformat())
+                for _ in range(count)
+            ])
+
+        recurring_rows = []
+        for uid in range(1, users + 1):
+            for title, category, amount, frequency in rng.sample(RECURRING_ITEMS, min(recurring_per_user, len(RECURRING_ITEMS))):
+                start = today - timedelta(days=rng.randrange(30, 365))
+                next_due = today + timedelta(days=rng.randrange(-3, 28))
+                recurring_rows.append((uid, title, category, amount, frequency, start.isoformat(), next_due.isoformat(),
+                                       rng.choice([1, 3, 5]), 1 if rng.random() < 0.9 else 0))
+        conn.executemany("""
+            INSERT INTO recurring_expenses
+                (user_id, title, category, amount, frequency, start_date, next_due_date, reminder_days, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, recurring_rows)
+
+        # ~70% of users set a budget a little above their typical month.
+        budgets = []
+        for uid, count in enumerate(expense_counts, start=1):
+            if rng.random() < 0.7 and count:
+                monthly_spend = conn.execute(
+                    "SELECT SUM(amount) FROM expenses WHERE user_id = ? AND status = 'Send'", (uid,)
+                ).fetchone()[0] or 0
+                budgets.append((uid, round(max(1000, monthly_spend / months * rng.uniform(0.9, 1.4)), -2)))
+        conn.executemany("INSERT INTO budgets (user_id, monthly_budget) VALUES (?, ?)", budgets)
+
+    return {
+        "users": users,
+        "expenses": expenses,
+        "personal_transactions": personal,
+        "recurring_expenses": len(recurring_rows),
+        "budgets": len(budgets),
+    }
+
+
+def create_scratch_app(directory=None):
+    # The app and its modules keep database.db (and uploads/, reports/) relative to the
+    # working directory, so a scratch run must chdir before importing app.
+    directory = directory or tempfile.mkdtemp(prefix="expense-bench-")
+    os.makedirs(directory, exist_ok=True)
+    os.chdir(directory)
+    import app as app_module
+
+    app_module.init_db()
+    return app_module
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate a scratch database.db with realistic synthetic data.")
+    parser.add_argument("--dir", help="directory for database.db (default: a new temporary directory)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--expenses", type=int, default=20000, help="total across all users (heavy-tailed)")
+    parser.add_argument("--personal", type=int, default=2000)
+    parser.add_argument("--recurring", type=int, default=3, help="recurring items per user")
+    parser.add_argument("--months", type=int, default=12, help="history window")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.dir and os.path.exists(os.path.join(args.dir, "database.db")):
+        parser.error(f"{os.path.join(args.dir, 'database.db')} already exists; pick an empty directory")
+
+    app_module = create_scratch_app(args.dir)
+    started = time.perf_counter()
+    conn = app_module.get_db()
+    counts = generate(conn, args.users, args.expenses, args.personal, args.recurring, args.months, args.seed)
+    conn.close()
+    print(f"Seeded {os.path.join(os.getcwd(), 'database.db')} in {time.perf_counter() - started:.1f}s")
+    for table, count in counts.items():
+        print(f"  {table:22s} {count}")
+    print(f"Log in as user1@example.com (heaviest) .. user{args.users}@example.com, password '{SEED_PASSWORD}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,22 @@
 import os
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 
+from modules.metrics import timed_function
+
+
+# Socket timeout for each SMTP connect/command.
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "20"))
+
+_SMTP_CONFIG = None
+_SMTP_CONFIG_LOCK = threading.Lock()
+
+# Idle authenticated connections as (server, last_used) pairs; most recent last.
+_SMTP_POOL = []
+_SMTP_POOL_LOCK = threading.Lock()
+
 
 def _try_load_dotenv():
     try:
@@ -11,7 +26,7 @@ def _try_load_dotenv():
         pass
 
 
-def _get_smtp_config():
+def _read_smtp_config():
     _try_load_dotenv()
 
     host = os.getenv("SMTP_HOST", "smtp.gmail.com").strip()
@@ -29,6 +44,12 @@ def _get_smtp_config():
     except ValueError:
         port = 587
 
+    def int_env(name, default):
+        try:
+            return int(os.getenv(name, str(default)).strip())
+        except ValueError:
+            return default
+
     return {
         "host": host,
         "port": port,
@@ -36,29 +57,175 @@ def _get_smtp_config():
         "password": password,
         "sender": sender,
         "use_tls": use_tls,
+        "pool_size": max(1, int_env("SMTP_POOL_SIZE", 2)),
+        "idle_check_seconds": int_env("SMTP_IDLE_CHECK_SECONDS", 30),
+        "max_idle_seconds": int_env("SMTP_MAX_IDLE_SECONDS", 240),
     }
 
 
-def send_email(receiver_email: str, subject: str, body: str):
-    cfg = _get_smtp_config()
+def _get_smtp_config():
+    global _SMTP_CONFIG
+    if _SMTP_CONFIG is None:
+        with _SMTP_CONFIG_LOCK:
+            if _SMTP_CONFIG is None:
+                _SMTP_CONFIG = _read_smtp_config()
+    return _SMTP_CONFIG
+
+
+def reload_smtp_config():
+    # Drop cached settings and pooled connections, e.g. after rotating credentials.
+    global _SMTP_CONFIG
+    with _SMTP_CONFIG_LOCK:
+        _SMTP_CONFIG = None
+    close_smtp_pool()
+    return _get_smtp_config()
+
+
+# ---------------------------
+# CONNECTION POOL
+# ---------------------------
+def _quit_quietly(server):
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+def _open_connection(cfg):
+    server = smtplib.SMTP(cfg["host"], cfg["port"], timeout=SMTP_TIMEOUT_SECONDS)
+    try:
+        if cfg["use_tls"]:
+            server.starttls()
+        # A local relay (or test server) may not offer AUTH; only log in when configured.
+        if cfg["user"] and cfg["password"]:
+            server.login(cfg["user"], cfg["password"])
+    except Exception:
+        _quit_quietly(server)
+        raise
+    return server
+
+
+def _is_healthy(server):
+    try:
+        return server.noop()[0] == 250
+    except Exception:
+        return False
+
+
+def _checkout(cfg):
+    now = time.time()
+    while True:
+        with _SMTP_POOL_LOCK:
+            if not _SMTP_POOL:
+                break
+            server, last_used = _SMTP_POOL.pop()
+        idle = now - last_used
+        if idle > cfg["max_idle_seconds"]:
+            _quit_quietly(server)
+            continue
+        # Recently used connections are trusted; older ones get a NOOP round-trip.
+        if idle <= cfg["idle_check_seconds"] or _is_healthy(server):
+            return server
+        _quit_quietly(server)
+    return _open_connection(cfg)
+
+
+def _checkin(cfg, server):
+    with _SMTP_POOL_LOCK:
+        if len(_SMTP_POOL) < cfg["pool_size"]:
+            _SMTP_POOL.append((server, time.time()))
+            return
+    _quit_quietly(server)
 
-    if not receiver_email or "@" not in receiver_email:
-        return False, "Invalid receiver email"
 
-    if not cfg["host"] or not cfg["port"] or not cfg["user"] or not cfg["password"]:
-        return False, "SMTP not configured"
+def close_smtp_pool():
+    with _SMTP_POOL_LOCK:
+        servers = [server for server, _ in _SMTP_POOL]
+        _SMTP_POOL.clear()
+    for server in servers:
+        _quit_quietly(server)
 
+
+# ---------------------------
+# SENDING
+# ---------------------------
+def _build_message(cfg, receiver_email, subject, body):
     msg = MIMEText(body, "plain", "utf-8")
     msg["From"] = cfg["sender"]
     msg["To"] = receiver_email
     msg["Subject"] = subject
+    return msg.as_string()
 
-    try:
-        with smtplib.SMTP(cfg["host"], cfg["port"], timeout=20) as server:
-            if cfg["use_tls"]:
-                server.starttls()
-            server.login(cfg["user"], cfg["password"])
-            server.sendmail(cfg["sender"], [receiver_email], msg.as_string())
-        return True, "Email sent"
-    except Exception as exc:
-        return False, str(exc)
+
+def smtp_configured():
+    cfg = _get_smtp_config()
+    # Credentials are optional (SMTP_FROM alone is enough for a relay), but a user without
+    # a password is a half-finished setup.
+    if cfg["user"] and not cfg["password"]:
+        return False
+    return bool(cfg["host"] and cfg["port"] and cfg["sender"])
+
+
+def _validate(cfg, receiver_email):
+    if not receiver_email or "@" not in receiver_email:
+        return "Invalid receiver email"
+    if not smtp_configured():
+        return "SMTP not configured"
+    return None
+
+
+def _send_on(server, cfg, receiver_email, subject, body):
+    server.sendmail(cfg["sender"], [receiver_email], _build_message(cfg, receiver_email, subject, body))
+
+
+@timed_function("send_email")
+def send_many(messages):
+    # messages: (receiver_email, subject, body) tuples sent over one pooled connection.
+    # Returns (ok, reason) per message, in order.
+    cfg = _get_smtp_config()
+    results = [None] * len(messages)
+    pending = []
+    for index, (receiver_email, subject, body) in enumerate(messages):
+        problem = _validate(cfg, receiver_email)
+        if problem:
+            results[index] = (False, problem)
+        else:
+            pending.append(index)
+
+    server = None
+    for index in pending:
+        receiver_email, subject, body = messages[index]
+        # One reconnect per message covers connections the server dropped while idle.
+        for attempt in range(2):
+            try:
+                if server is None:
+                    server = _checkout(cfg)
+                _send_on(server, cfg, receiver_email, subject, body)
+                results[index] = (True, "Email sent")
+                break
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as exc:
+                # Rejected by the server; the connection itself is still usable.
+                results[index] = (False, str(exc))
+                break
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as exc:
+                if server is not None:
+                    _quit_quietly(server)
+                    server = None
+                results[index] = (False, str(exc))
+            except Exception as exc:
+                if server is not None:
+                    _quit_quietly(server)
+                    server = None
+                results[index] = (False, str(exc))
+                break
+
+    if server is not None:
+        _checkin(cfg, server)
+    return results
+
+
+def send_email(receiver_email: str, subject: str, body: str):
+    return send_many([(receiver_email, subject, body)])[0]
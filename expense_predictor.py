@@ -1,10 +1,14 @@
-import sqlite3
 import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
 
+from modules.metrics import timed_function
+from modules.sharding import connect_user_db
+
+
+@timed_function("predict_next_month_expense")
 def predict_next_month_expense(user_id):
-    conn = sqlite3.connect("database.db")
+    conn = connect_user_db(user_id)
 
     query = """
     SELECT expense_date, amount FROM expenses
@@ -0,0 +1,193 @@
+import math
+import os
+import threading
+import time
+
+from flask import g, make_response, request
+
+from modules.metrics import observe
+
+
+def _limits(name, concurrency, queue):
+    prefix = f"ADMISSION_{name.upper()}"
+    return int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))), int(os.getenv(f"{prefix}_QUEUE", str(queue)))
+
+
+# Per worker process: (requests running at once, requests allowed to wait for a slot).
+ADMISSION_LIMITS = {
+    "ocr": _limits("ocr", 2, 4),
+    "voice": _limits("voice", 2, 4),
+    "export": _limits("export", 4, 8),
+    # Retrains run in the background and never queue: callers that find one running
+    # are folded into it.
+    "training": _limits("training", 1, 0),
+}
+# A queued request gives up after this long and gets a 503 instead.
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+MAX_RETRY_AFTER = 30
+
+BUSY_PAGE = (
+    "<!doctype html><title>Busy</title><p>The server is busy processing other uploads. "
+    "Please try again in {seconds} seconds.</p><p><a href=\"/dashboard\">Back to dashboard</a></p>"
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is saturated")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    # A counting semaphore with a bounded wait queue and an estimate of when a slot frees up.
+    def __init__(self, name, limit, queue):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.dirty = False
+        self.avg_hold_seconds = 1.0
+        self._cond = threading.Condition()
+
+    def retry_after(self):
+        # Time for the queue ahead to drain at the observed service rate.
+        backlog = (self.waiting + 1) / max(1, self.limit)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(backlog * self.avg_hold_seconds)))
+
+    def acquire(self, timeout=ADMISSION_QUEUE_TIMEOUT):
+        started = time.perf_counter()
+        with self._cond:
+            if self.active >= self.limit:
+                if self.waiting >= self.queue:
+                    self.rejected += 1
+                    raise AdmissionRejected(self.name, self.retry_after())
+                self.waiting += 1
+                deadline = started + timeout
+                try:
+                    while self.active >= self.limit:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            raise AdmissionRejected(self.name, self.retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+        observe("admission_wait_seconds", time.perf_counter() - started,
+                "Time spent queued for an admission slot.", endpoint_class=self.name)
+        return time.perf_counter()
+
+    def release(self, acquired_at=None):
+        with self._cond:
+            self.active -= 1
+            if acquired_at is not None:
+                self.avg_hold_seconds = 0.8 * self.avg_hold_seconds + 0.2 * (time.perf_counter() - acquired_at)
+            self._cond.notify()
+
+    def run_coalesced(self, func):
+        # Runs func on a background thread so no request waits for it. Callers that find
+        # every slot busy leave a note instead, and the running thread goes once more.
+        # Returns False if the call was folded into one already running.
+        with self._cond:
+            if self.active >= self.limit:
+                self.dirty = True
+                self.coalesced += 1
+                return False
+            self.active += 1
+            self.admitted += 1
+            self.dirty = False
+        threading.Thread(target=self._run_until_clean, args=(func,), name=f"{self.name}-coalesced", daemon=True).start()
+        return True
+
+    def _run_until_clean(self, func):
+        acquired_at = time.perf_counter()
+        try:
+            while True:
+                try:
+                    func()
+                except Exception:
+                    pass
+                with self._cond:
+                    if not self.dirty:
+                        break
+                    self.dirty = False
+        finally:
+            self.release(acquired_at)
+
+
+GATES = {name: AdmissionGate(name, limit, queue) for name, (limit, queue) in ADMISSION_LIMITS.items()}
+
+
+def admission_metrics():
+    # Collector for modules.metrics.
+    gates = sorted(GATES.items())
+    return [
+        ("admission_active", "gauge", "Requests holding an admission slot.",
+         [({"endpoint_class": name}, gate.active) for name, gate in gates]),
+        ("admission_queue_depth", "gauge", "Requests waiting for an admission slot.",
+         [({"endpoint_class": name}, gate.waiting) for name, gate in gates]),
+        ("admission_admitted_total", "counter", "Requests admitted.",
+         [({"endpoint_class": name}, gate.admitted) for name, gate in gates]),
+        ("admission_rejected_total", "counter", "Requests turned away with 503.",
+         [({"endpoint_class": name}, gate.rejected) for name, gate in gates]),
+        ("admission_coalesced_total", "counter", "Background jobs folded into one already running.",
+         [({"endpoint_class": name}, gate.coalesced) for name, gate in gates]),
+    ]
+
+
+# ---------------------------
+# FLASK WIRING
+# ---------------------------
+class _Ticket:
+    # Released exactly once: when a streamed body is closed, or at teardown otherwise.
+    def __init__(self, gate, acquired_at):
+        self.gate = gate
+        self.acquired_at = acquired_at
+        self.released = False
+        self.lock = threading.Lock()
+
+    def release(self):
+        with self.lock:
+            if self.released:
+                return
+            self.released = True
+        self.gate.release(self.acquired_at)
+
+
+def init_admission(app, endpoint_classes):
+    # endpoint_classes maps endpoint name -> gate name ("ocr", "voice", "export", ...).
+    def admit_request():
+        name = endpoint_classes.get(request.endpoint)
+        if name is None:
+            return None
+        gate = GATES[name]
+        try:
+            g.admission_ticket = _Ticket(gate, gate.acquire())
+        except AdmissionRejected as exc:
+            resp = make_response(BUSY_PAGE.format(seconds=exc.retry_after), 503)
+            resp.headers["Retry-After"] = str(exc.retry_after)
+            return resp
+        return None
+
+    def hold_until_body_sent(resp):
+        ticket = g.get("admission_ticket")
+        if ticket is not None and resp.is_streamed:
+            # Streamed exports keep their slot until the last chunk has been written.
+            resp.call_on_close(ticket.release)
+            g.admission_ticket_handed_off = True
+        return resp
+
+    def release_on_teardown(exc):
+        ticket = g.pop("admission_ticket", None)
+        if ticket is not None and (exc is not None or not g.get("admission_ticket_handed_off")):
+            ticket.release()
+
+    app.before_request(admit_request)
+    app.after_request(hold_until_body_sent)
+    app.teardown_request(release_on_teardown)
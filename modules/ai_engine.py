@@ -1,9 +1,11 @@
 import os
 import re
-import sqlite3
 
 import joblib
 
+from modules.metrics import timed_function
+from modules.sharding import iter_user_dbs
+
 
 # ---------------------------
 # TEXT CLEANING
@@ -17,21 +19,22 @@ def clean_text(text):
 # ---------------------------
 # TRAIN MODEL
 # ---------------------------
-DATABASE = "database.db"
 MODEL_PATH = "expense_model.pkl"
 VECTORIZER_PATH = "vectorizer.pkl"
 
+@timed_function("train_model")
 def train_model():
     # Import heavy ML dependencies only when training.
     from sklearn.feature_extraction.text import TfidfVectorizer
     from sklearn.linear_model import LogisticRegression
 
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT description, category FROM expenses")
-    data = cursor.fetchall()
-    conn.close()
+    # Trained on every user's expenses, which may be spread over several shards.
+    data = []
+    for conn in iter_user_dbs():
+        try:
+            data.extend(conn.execute("SELECT description, category FROM expenses").fetchall())
+        finally:
+            conn.close()
 
     if len(data) < 5:
         return
@@ -44,7 +47,8 @@ def train_model():
             texts.append(cleaned)
             labels.append(row[1])
 
-    if len(texts) < 5:
+    # LogisticRegression needs at least two categories (a bulk import can be all one category).
+    if len(texts) < 5 or len(set(labels)) < 2:
         return
 
     vectorizer = TfidfVectorizer(
@@ -73,56 +77,57 @@ def load_model():
 # ---------------------------
 # DETECT CATEGORY
 # ---------------------------
+# Fully rule-based detection (no ML fallback). This prevents wrong bias like everything -> Food.
+KEYWORD_MAP = {
+    "Travel": [
+        "fuel", "petrol", "diesel", "cab", "taxi", "uber", "ola", "auto",
+        "bus", "metro", "train", "flight", "ticket", "toll", "parking",
+        "trip", "travel", "commute", "ride"
+    ],
+    "Bills": [
+        "emi", "insurance", "electricity", "bill", "recharge", "rent",
+        "wifi", "internet", "broadband", "mobile", "water", "gas",
+        "subscription", "netflix", "prime", "hotstar", "loan",
+        "postpaid", "utility", "maintenance", "fees", "tuition"
+    ],
+    "Food": [
+        "biryani", "dosa", "pizza", "burger", "curry", "sandwich",
+        "grocery", "groceries", "vegetable", "vegetables", "fruit",
+        "fruits", "milk", "restaurant", "cafe", "coffee", "tea", "lunch",
+        "dinner", "breakfast", "snacks", "food", "meal", "zomato",
+        "swiggy", "juice", "bakery", "chocolate"
+    ],
+    "Shopping": [
+        "clothes", "cloth", "dress", "shirt", "tshirt", "pant", "jeans",
+        "saree", "kurti", "shoe", "shoes", "slipper", "footwear", "bag",
+        "gift", "gifts", "present", "shopping", "amazon", "flipkart",
+        "mall", "cosmetics", "makeup", "accessory", "watch", "phone",
+        "laptop", "headphone", "electronics", "furniture"
+    ],
+}
+
+# Stem-like matching to handle OCR/voice truncation (e.g., "subscript" -> "subscription")
+KEYWORD_STEMS = {
+    cat: {kw[:6] for kw in kws if len(kw) >= 4}
+    for cat, kws in KEYWORD_MAP.items()
+}
+
+
 def detect_category(description):
     text = clean_text(description or "").strip()
     if not text:
         return "Others"
 
-    # Fully rule-based detection (no ML fallback). This prevents wrong bias like everything -> Food.
-    keyword_map = {
-        "Travel": [
-            "fuel", "petrol", "diesel", "cab", "taxi", "uber", "ola", "auto",
-            "bus", "metro", "train", "flight", "ticket", "toll", "parking",
-            "trip", "travel", "commute", "ride"
-        ],
-        "Bills": [
-            "emi", "insurance", "electricity", "bill", "recharge", "rent",
-            "wifi", "internet", "broadband", "mobile", "water", "gas",
-            "subscription", "netflix", "prime", "hotstar", "loan",
-            "postpaid", "utility", "maintenance", "fees", "tuition"
-        ],
-        "Food": [
-            "biryani", "dosa", "pizza", "burger", "curry", "sandwich",
-            "grocery", "groceries", "vegetable", "vegetables", "fruit",
-            "fruits", "milk", "restaurant", "cafe", "coffee", "tea", "lunch",
-            "dinner", "breakfast", "snacks", "food", "meal", "zomato",
-            "swiggy", "juice", "bakery", "chocolate"
-        ],
-        "Shopping": [
-            "clothes", "cloth", "dress", "shirt", "tshirt", "pant", "jeans",
-            "saree", "kurti", "shoe", "shoes", "slipper", "footwear", "bag",
-            "gift", "gifts", "present", "shopping", "amazon", "flipkart",
-            "mall", "cosmetics", "makeup", "accessory", "watch", "phone",
-            "laptop", "headphone", "electronics", "furniture"
-        ],
-    }
-
     tokens = re.findall(r"[a-z]+", text)
     if not tokens:
         return "Others"
 
-    # Stem-like matching to handle OCR/voice truncation (e.g., "subscript" -> "subscription")
-    keyword_stems = {
-        cat: {kw[:6] for kw in kws if len(kw) >= 4}
-        for cat, kws in keyword_map.items()
-    }
-
-    scores = {cat: 0 for cat in keyword_map}
+    scores = {cat: 0 for cat in KEYWORD_MAP}
     for token in tokens:
-        for category, keywords in keyword_map.items():
+        for category, keywords in KEYWORD_MAP.items():
             if token in keywords:
                 scores[category] += 3
-            elif len(token) >= 4 and token[:6] in keyword_stems[category]:
+            elif len(token) >= 4 and token[:6] in KEYWORD_STEMS[category]:
                 scores[category] += 2
 
     # Phrase contains checks for multi-word signals.
@@ -133,3 +138,15 @@ def detect_category(description):
     if best_score <= 0:
         return "Others"
     return best_category
+
+
+def detect_categories(descriptions):
+    # Batch variant for multi-row inserts; repeated descriptions are scored once.
+    cache = {}
+    categories = []
+    for description in descriptions:
+        key = description or ""
+        if key not in cache:
+            cache[key] = detect_category(key)
+        categories.append(cache[key])
+    return categories
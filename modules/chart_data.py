@@ -0,0 +1,169 @@
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from modules.data_version import get_data_version
+from modules.sharding import connect_user_db
+
+
+CHART_CACHE_SIZE = 512
+# Day buckets over many years would ship thousands of points; callers narrow the range instead.
+MAX_DAY_BUCKETS = 366
+
+BUCKET_EXPRESSIONS = {
+    "day": "date({col})",
+    "week": "date({col}, 'weekday 0', '-6 days')",  # Monday of the row's week
+    "month": "strftime('%Y-%m', {col})",
+}
+
+SOURCES = {
+    "expense": ("expenses", "expense_date"),
+    "personal": ("personal_transactions", "transaction_date"),
+}
+
+
+class ChartRangeError(Exception):
+    pass
+
+
+def ensure_chart_indexes(cursor):
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_expenses_user_date
+    ON expenses (user_id, expense_date)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_personal_user_date
+    ON personal_transactions (user_id, transaction_date)
+    """)
+
+
+def parse_chart_range(bucket, start, end):
+    # Returns (bucket, start_date_or_None, end_date_or_None) or raises ChartRangeError.
+    bucket = (bucket or "month").strip().lower()
+    if bucket not in BUCKET_EXPRESSIONS:
+        raise ChartRangeError("bucket must be day, week or month")
+    try:
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) if end else None
+    except ValueError:
+        raise ChartRangeError("start and end must be YYYY-MM-DD dates")
+    if start and end and start > end:
+        raise ChartRangeError("start must not be after end")
+    if bucket == "day":
+        end = end or date.today()
+        start = start or end - timedelta(days=89)
+        if (end - start).days >= MAX_DAY_BUCKETS:
+            raise ChartRangeError(f"day buckets are limited to {MAX_DAY_BUCKETS} days")
+    return bucket, start, end
+
+
+def bucket_label(bucket, day):
+    if bucket == "day":
+        return day.isoformat()
+    if bucket == "week":
+        return (day - timedelta(days=day.weekday())).isoformat()
+    return day.strftime("%Y-%m")
+
+
+def bucket_labels(bucket, first, last):
+    # Continuous labels from first to last so the charts show empty periods as zero.
+    labels = []
+    if bucket == "month":
+        year, month = map(int, first.split("-"))
+        while f"{year:04d}-{month:02d}" <= last:
+            labels.append(f"{year:04d}-{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return labels
+    step = timedelta(days=1 if bucket == "day" else 7)
+    current, stop = date.fromisoformat(first), date.fromisoformat(last)
+    while current <= stop:
+        labels.append(current.isoformat())
+        current += step
+    return labels
+
+
+def aggregate_chart_data(conn, user_id, bucket, start, end):
+    per_bucket = {}     # (source, status) -> {label: total}
+    categories = {}
+    status_totals = {source: {"Send": 0.0, "Received": 0.0} for source in SOURCES}
+    count = 0
+
+    for source, (table, column) in SOURCES.items():
+        where = ["user_id = ?", f"date({column}) IS NOT NULL"]
+        params = [user_id]
+        if start:
+            where.append(f"{column} >= ?")
+            params.append(start.isoformat())
+        if end:
+            where.append(f"{column} <= ?")
+            params.append(end.isoformat())
+        category = "category" if source == "expense" else "'Personal'"
+        rows = conn.execute(f"""
+            SELECT {BUCKET_EXPRESSIONS[bucket].format(col=column)} AS bucket,
+                   status, {category} AS category, SUM(amount), COUNT(*)
+            FROM {table}
+            WHERE {" AND ".join(where)}
+            GROUP BY bucket, status, category
+        """, params).fetchall()
+
+        for label, status, row_category, total, rows_in_group in rows:
+            total = float(total or 0.0)
+            count += rows_in_group
+            series = per_bucket.setdefault((source, status), {})
+            series[label] = series.get(label, 0.0) + total
+            status_totals[source][status] = status_totals[source].get(status, 0.0) + total
+            if source == "expense":
+                categories[row_category] = categories.get(row_category, 0.0) + total
+
+    seen = [label for series in per_bucket.values() for label in series]
+    if start and end:
+        labels = bucket_labels(bucket, bucket_label(bucket, start), bucket_label(bucket, end))
+    elif seen:
+        labels = bucket_labels(bucket, min(seen), max(seen))
+    else:
+        labels = []
+
+    return {
+        "bucket": bucket,
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "labels": labels,
+        "series": {
+            f"{source}_{status.lower()}": [round(per_bucket.get((source, status), {}).get(label, 0.0), 2) for label in labels]
+            for source in SOURCES
+            for status in ("Send", "Received")
+        },
+        "categories": {name: round(total, 2) for name, total in categories.items()},
+        "status": {source: {k: round(v, 2) for k, v in totals.items()} for source, totals in status_totals.items()},
+        "count": count,
+    }
+
+
+# ---------------------------
+# CACHE
+# ---------------------------
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_chart_data(user_id, bucket, start, end):
+    # Returns (payload, version). Cached per data version, so any write to the user's
+    # expenses or personal transactions invalidates it without explicit purges.
+    conn = connect_user_db(user_id)
+    try:
+        version = get_data_version(conn, user_id)
+        key = (user_id, version, bucket, start, end)
+        with _cache_lock:
+            payload = _cache.get(key)
+            if payload is not None:
+                _cache.move_to_end(key)
+                return payload, version
+        payload = aggregate_chart_data(conn, user_id, bucket, start, end)
+    finally:
+        conn.close()
+
+    with _cache_lock:
+        _cache[key] = payload
+        while len(_cache) > CHART_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return payload, version
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+import zlib
+
+from flask import request
+
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+# Quality 4-5 is the usual sweet spot for on-the-fly brotli; 11 is for prebuilt assets.
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+}
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+_brotli_module = _brotli()
+
+
+# ---------------------------
+# STATS (bytes on wire and CPU cost per encoding)
+# ---------------------------
+_stats_lock = threading.Lock()
+_stats = {}  # encoding -> {"responses", "bytes_in", "bytes_out", "cpu_seconds"}
+
+
+def record_compression(encoding, bytes_in, bytes_out, cpu_seconds):
+    with _stats_lock:
+        entry = _stats.setdefault(encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0})
+        entry["responses"] += 1
+        entry["bytes_in"] += bytes_in
+        entry["bytes_out"] += bytes_out
+        entry["cpu_seconds"] += cpu_seconds
+
+
+def compression_stats():
+    with _stats_lock:
+        return {encoding: dict(entry) for encoding, entry in _stats.items()}
+
+
+def compression_metrics():
+    # Collector for modules.metrics: exported as Prometheus counters.
+    stats = compression_stats()
+    families = [
+        ("http_compression_responses_total", "Responses compressed.", "responses"),
+        ("http_compression_bytes_in_total", "Uncompressed bytes fed to the encoder.", "bytes_in"),
+        ("http_compression_bytes_out_total", "Compressed bytes sent.", "bytes_out"),
+        ("http_compression_cpu_seconds_total", "CPU time spent compressing.", "cpu_seconds"),
+    ]
+    return [
+        (name, "counter", help_text, [({"encoding": encoding}, entry[key]) for encoding, entry in sorted(stats.items())])
+        for name, help_text, key in families
+    ]
+
+
+# ---------------------------
+# ENCODERS
+# ---------------------------
+def choose_encoding(accept_encodings):
+    if _brotli_module is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def new_compressor(encoding):
+    # Returns (compress(chunk) -> bytes, flush(final) -> bytes).
+    if encoding == "br":
+        compressor = _brotli_module.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        return compressor.process, lambda final: compressor.finish() if final else compressor.flush()
+    compressor = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, lambda final: compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def compress_body(encoding, data):
+    compress, flush = new_compressor(encoding)
+    return compress(data) + flush(True)
+
+
+def compress_stream(encoding, chunks):
+    # Each upstream chunk is flushed so streamed exports keep their time-to-first-byte.
+    compress, flush = new_compressor(encoding)
+    bytes_in = bytes_out = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            started = time.thread_time()
+            data = compress(chunk) + flush(False)
+            cpu_seconds += time.thread_time() - started
+            bytes_in += len(chunk)
+            bytes_out += len(data)
+            if data:
+                yield data
+        started = time.thread_time()
+        data = flush(True)
+        cpu_seconds += time.thread_time() - started
+        bytes_out += len(data)
+        yield data
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+        record_compression(encoding, bytes_in, bytes_out, cpu_seconds)
+
+
+# ---------------------------
+# FLASK WIRING
+# ---------------------------
+def should_compress(resp):
+    if request.method == "HEAD" or resp.status_code < 200 or resp.status_code in (204, 206, 304):
+        return False
+    if resp.direct_passthrough or "Content-Encoding" in resp.headers:
+        return False
+    if resp.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    if "no-transform" in (resp.headers.get("Cache-Control") or ""):
+        return False
+    if not resp.is_streamed and (resp.content_length or 0) < COMPRESS_MIN_BYTES:
+        return False
+    return True
+
+
+def compress_response(resp):
+    if resp.mimetype in COMPRESSIBLE_MIMETYPES and "Content-Encoding" not in resp.headers:
+        resp.vary.add("Accept-Encoding")
+    if not should_compress(resp):
+        return resp
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return resp
+
+    if resp.is_streamed:
+        resp.response = compress_stream(encoding, resp.response)
+        resp.headers.pop("Content-Length", None)
+    else:
+        data = resp.get_data()
+        started = time.thread_time()
+        compressed = compress_body(encoding, data)
+        record_compression(encoding, len(data), len(compressed), time.thread_time() - started)
+        resp.set_data(compressed)
+
+    resp.headers["Content-Encoding"] = encoding
+    # Compressed and identity bodies differ byte-for-byte, so a strong ETag must become weak.
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    return resp
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -0,0 +1,196 @@
+import csv
+import os
+import re
+from datetime import datetime
+
+from modules.ai_engine import detect_categories
+from modules.sharding import connect_user_db
+
+
+IMPORT_CHUNK_ROWS = max(1, int(os.getenv("IMPORT_CHUNK_ROWS", "5000")))
+IMPORT_MAX_ERRORS = 20
+MAX_DESCRIPTION_LENGTH = 200
+
+# Lower-cased header aliases seen in our own exports and common bank/UPI statements.
+COLUMN_ALIASES = {
+    "description": {"description", "narration", "details", "remarks", "particulars", "name", "merchant", "expense"},
+    "amount": {"amount", "value", "amount (inr)", "amount(inr)", "inr"},
+    "debit": {"debit", "withdrawal", "withdrawal amt.", "withdrawal amount", "debit amount", "dr"},
+    "credit": {"credit", "deposit", "deposit amt.", "deposit amount", "credit amount", "cr"},
+    "category": {"category"},
+    "status": {"status", "type", "dr/cr", "transaction type"},
+    "date": {"date", "expense_date", "transaction date", "txn date", "value date", "posted date"},
+}
+
+STATUS_ALIASES = {
+    "send": "Send", "sent": "Send", "debit": "Send", "dr": "Send", "paid": "Send", "expense": "Send",
+    "received": "Received", "receive": "Received", "credit": "Received", "cr": "Received", "income": "Received",
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d/%m/%y", "%d-%m-%y", "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%Y/%m/%d")
+AMOUNT_NOISE_PATTERN = re.compile(r"[,\s₹]|inr|rs\.?", re.IGNORECASE)
+
+
+class ImportFormatError(Exception):
+    def __init__(self, message, inserted=0):
+        super().__init__(message)
+        # Rows already committed by earlier chunks before the file turned out to be malformed.
+        self.inserted = inserted
+
+
+def map_columns(header):
+    columns = {}
+    for index, name in enumerate(header):
+        key = (name or "").strip().lower()
+        for field, aliases in COLUMN_ALIASES.items():
+            if key in aliases and field not in columns:
+                columns[field] = index
+    if "description" not in columns:
+        raise ImportFormatError("CSV needs a Description (or Narration/Details) column")
+    if "amount" not in columns and "debit" not in columns and "credit" not in columns:
+        raise ImportFormatError("CSV needs an Amount column (or Debit/Credit columns)")
+    return columns
+
+
+def parse_amount(value):
+    text = AMOUNT_NOISE_PATTERN.sub("", value or "")
+    if not text:
+        return None
+    negative = text.startswith("(") and text.endswith(")")
+    try:
+        amount = float(text.strip("()"))
+    except ValueError:
+        return None
+    return -amount if negative else amount
+
+
+_date_cache = {}
+
+
+def parse_import_date(value):
+    # Statements repeat the same few dates thousands of times; parse each string once.
+    text = (value or "").strip()
+    if text in _date_cache:
+        return _date_cache[text]
+    parsed = None
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt).date().isoformat()
+            break
+        except ValueError:
+            continue
+    if len(_date_cache) < 10000:
+        _date_cache[text] = parsed
+    return parsed
+
+
+def cell(row, columns, field):
+    index = columns.get(field)
+    if index is None or index >= len(row):
+        return ""
+    return row[index].strip()
+
+
+def parse_import_row(row, columns, allowed_categories, allowed_status):
+    # Returns ((description, category_or_None, amount, status, date_or_None), None) or (None, reason).
+    description = re.sub(r"\s+", " ", cell(row, columns, "description"))[:MAX_DESCRIPTION_LENGTH]
+    if not description:
+        return None, "missing description"
+
+    status = None
+    raw_status = cell(row, columns, "status")
+    if raw_status:
+        status = STATUS_ALIASES.get(raw_status.lower(), raw_status.title())
+        if status not in allowed_status:
+            return None, f"invalid status '{raw_status}'"
+
+    amount = parse_amount(cell(row, columns, "amount")) if "amount" in columns else None
+    if amount is None:
+        debit = parse_amount(cell(row, columns, "debit"))
+        credit = parse_amount(cell(row, columns, "credit"))
+        if debit:
+            amount, status = debit, status or "Send"
+        elif credit:
+            amount, status = credit, status or "Received"
+    if amount is None:
+        return None, "invalid amount"
+    if amount < 0:
+        amount, status = -amount, status or "Send"
+    if amount <= 0:
+        return None, "amount must be greater than 0"
+
+    category = None
+    raw_category = cell(row, columns, "category")
+    if raw_category:
+        category = raw_category.title()
+        if category not in allowed_categories:
+            return None, f"invalid category '{raw_category}'"
+
+    expense_date = None
+    raw_date = cell(row, columns, "date")
+    if raw_date:
+        expense_date = parse_import_date(raw_date)
+        if expense_date is None:
+            return None, f"unrecognised date '{raw_date}'"
+
+    return (description, category, round(amount, 2), status or "Send", expense_date), None
+
+
+def insert_chunk(conn, user_id, parsed):
+    # Missing categories are filled in one batch per chunk; missing dates fall back to today.
+    missing = [i for i, item in enumerate(parsed) if item[1] is None]
+    for i, category in zip(missing, detect_categories([parsed[i][0] for i in missing])):
+        parsed[i] = (parsed[i][0], category) + parsed[i][2:]
+
+    today = datetime.now().date().isoformat()
+    with conn:
+        conn.executemany("""
+            INSERT INTO expenses (user_id, description, category, amount, status, expense_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (user_id, description, category, amount, status, expense_date or today)
+            for description, category, amount, status, expense_date in parsed
+        ])
+
+
+def import_expenses_csv(lines, user_id, allowed_categories, allowed_status, chunk_rows=IMPORT_CHUNK_ROWS):
+    # lines: any iterable of text lines (an open file or a wrapped upload stream).
+    # Each chunk commits on its own, so a bad row never rolls back earlier rows.
+    # Returns (inserted, rejected, errors) where errors is [(line_number, reason), ...].
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        raise ImportFormatError("CSV file is empty")
+    columns = map_columns(header)
+
+    inserted = 0
+    rejected = 0
+    errors = []
+    parsed = []
+
+    conn = connect_user_db(user_id)
+    try:
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue
+            item, reason = parse_import_row(row, columns, allowed_categories, allowed_status)
+            if item is None:
+                rejected += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append((reader.line_num, reason))
+                continue
+            parsed.append(item)
+            if len(parsed) >= chunk_rows:
+                insert_chunk(conn, user_id, parsed)
+                inserted += len(parsed)
+                parsed = []
+
+        if parsed:
+            insert_chunk(conn, user_id, parsed)
+            inserted += len(parsed)
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ImportFormatError(f"Could not read CSV near line {reader.line_num}: {exc}", inserted) from exc
+    finally:
+        conn.close()
+
+    return inserted, rejected, errors
@@ -0,0 +1,39 @@
+# Per-user counter bumped by triggers on every expense / personal transaction write.
+# Anything derived from a user's data (reports, chart aggregates) can be cached under it.
+
+VERSIONED_TABLES = ("expenses", "personal_transactions")
+
+
+def ensure_data_version_triggers(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_data_versions (
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    for table in VERSIONED_TABLES:
+        for event, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+            AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO user_data_versions (user_id, version) VALUES ({ref}.user_id, 1)
+                ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+            END
+            """)
+    # An UPDATE that moves a row to another user must invalidate the old owner too.
+    for table in VERSIONED_TABLES:
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_owner_version
+        AFTER UPDATE OF user_id ON {table}
+        WHEN OLD.user_id IS NOT NEW.user_id
+        BEGIN
+            INSERT INTO user_data_versions (user_id, version) VALUES (OLD.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+        END
+        """)
+
+
+def get_data_version(conn, user_id):
+    row = conn.execute("SELECT version FROM user_data_versions WHERE user_id = ?", (user_id,)).fetchone()
+    return int(row[0]) if row else 0
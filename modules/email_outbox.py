@@ -0,0 +1,225 @@
+import os
+import sqlite3
+import threading
+import time
+
+from emailsender import send_many, smtp_configured, SMTP_TIMEOUT_SECONDS
+
+
+DATABASE = "database.db"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "15"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "1800"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+# A claimed row that is not finished within the lease is picked up again (worker crashed).
+# It must outlast a whole send_many batch: each message may reconnect once, and connecting
+# and sending can each take up to the SMTP timeout.
+OUTBOX_LEASE_SECONDS = float(os.getenv(
+    "OUTBOX_LEASE_SECONDS", str(OUTBOX_BATCH_SIZE * 4 * SMTP_TIMEOUT_SECONDS + 60)
+))
+
+
+def ensure_outbox_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recipient TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','sending','sent','failed','expired')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        expires_at REAL,
+        last_error TEXT DEFAULT '',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        sent_at TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+    ON email_outbox (status, next_attempt_at)
+    """)
+
+
+def get_outbox_db():
+    conn = sqlite3.connect(DATABASE, timeout=10)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def backoff_seconds(attempts):
+    return min(OUTBOX_MAX_BACKOFF_SECONDS, OUTBOX_BACKOFF_SECONDS * (2 ** max(0, attempts - 1)))
+
+
+# ---------------------------
+# ENQUEUE (request path)
+# ---------------------------
+def enqueue_email(recipient_email, subject, body, ttl_seconds=None, conn=None):
+    # Returns (queued, reason) so callers can keep the send_email() contract.
+    # With conn, the row joins the caller's transaction and the caller wakes the worker after commit.
+    if not recipient_email or "@" not in recipient_email:
+        return False, "Invalid receiver email"
+    if not smtp_configured():
+        return False, "SMTP not configured"
+
+    now = time.time()
+    expires_at = now + ttl_seconds if ttl_seconds else None
+    params = (recipient_email, subject, body, now, expires_at)
+    insert_sql = """
+        INSERT INTO email_outbox (recipient, subject, body, next_attempt_at, expires_at)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    if conn is not None:
+        conn.execute(insert_sql, params)
+        return True, "Email queued"
+
+    own_conn = get_outbox_db()
+    try:
+        with own_conn:
+            own_conn.execute(insert_sql, params)
+    finally:
+        own_conn.close()
+
+    wake_outbox_worker()
+    return True, "Email queued"
+
+
+def wake_outbox_worker():
+    start_outbox_worker()
+    _wakeup.set()
+
+
+# ---------------------------
+# DELIVERY
+# ---------------------------
+def claim_due_messages(conn, now, limit=OUTBOX_BATCH_SIZE):
+    # BEGIN IMMEDIATE serializes claims between processes sharing the database.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute("""
+            SELECT id, recipient, subject, body, status, attempts, expires_at
+            FROM email_outbox
+            WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+            ORDER BY next_attempt_at
+            LIMIT ?
+        """, (now, limit)).fetchall()
+
+        expired = {row["id"] for row in rows if row["expires_at"] is not None and row["expires_at"] <= now}
+        # A row still 'sending' after its lease means the sender died on it; that counts as
+        # an attempt, so a message that crashes the worker cannot be retried forever.
+        abandoned = {row["id"]: int(row["attempts"]) + 1 for row in rows
+                     if row["status"] == "sending" and row["id"] not in expired}
+        given_up = {row_id for row_id, attempts in abandoned.items() if attempts >= OUTBOX_MAX_ATTEMPTS}
+        claimed = [dict(row, attempts=abandoned.get(row["id"], row["attempts"])) for row in rows
+                   if row["id"] not in expired and row["id"] not in given_up]
+
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'expired' WHERE id = ?",
+            [(row_id,) for row_id in expired],
+        )
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'failed', attempts = ?, last_error = 'Sender stopped while sending' WHERE id = ?",
+            [(abandoned[row_id], row_id) for row_id in given_up],
+        )
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'sending', attempts = ?, next_attempt_at = ? WHERE id = ?",
+            [(row["attempts"], now + OUTBOX_LEASE_SECONDS, row["id"]) for row in claimed],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return claimed
+
+
+def deliver_due_messages():
+    conn = get_outbox_db()
+    conn.isolation_level = None
+    try:
+        now = time.time()
+        claimed = claim_due_messages(conn, now)
+        if not claimed:
+            return 0
+
+        results = send_many([(row["recipient"], row["subject"], row["body"]) for row in claimed])
+
+        sent_updates = []
+        retry_updates = []
+        failed_updates = []
+        done_at = time.time()
+        for row, (ok, reason) in zip(claimed, results):
+            if ok:
+                sent_updates.append((row["id"],))
+                continue
+            attempts = int(row["attempts"]) + 1
+            if attempts >= OUTBOX_MAX_ATTEMPTS:
+                failed_updates.append((attempts, reason, row["id"]))
+            else:
+                retry_updates.append((attempts, done_at + backoff_seconds(attempts), reason, row["id"]))
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("""
+            UPDATE email_outbox
+            SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = ''
+            WHERE id = ?
+        """, sent_updates)
+        conn.executemany("""
+            UPDATE email_outbox
+            SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?
+            WHERE id = ?
+        """, retry_updates)
+        conn.executemany("""
+            UPDATE email_outbox
+            SET status = 'failed', attempts = ?, last_error = ?
+            WHERE id = ?
+        """, failed_updates)
+        conn.commit()
+        return len(claimed)
+    finally:
+        conn.close()
+
+
+# ---------------------------
+# BACKGROUND WORKER
+# ---------------------------
+_worker = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+_stopping = threading.Event()
+
+
+def _worker_loop():
+    while not _stopping.is_set():
+        _wakeup.clear()
+        try:
+            # Keep draining while full batches come back.
+            while deliver_due_messages() >= OUTBOX_BATCH_SIZE:
+                pass
+        except Exception:
+            pass
+        _wakeup.wait(OUTBOX_POLL_SECONDS)
+
+
+def start_outbox_worker():
+    global _worker
+    with _worker_lock:
+        # Checked by pid so a forked server worker starts its own thread.
+        if _worker is not None and _worker[1] == os.getpid() and _worker[0].is_alive():
+            return
+        _stopping.clear()
+        thread = threading.Thread(target=_worker_loop, name="email-outbox", daemon=True)
+        thread.start()
+        _worker = (thread, os.getpid())
+
+
+def stop_outbox_worker(timeout=10):
+    global _worker
+    with _worker_lock:
+        worker = _worker
+        _worker = None
+    if worker is None:
+        return
+    _stopping.set()
+    _wakeup.set()
+    worker[0].join(timeout)
@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+import os
+import zlib
+
+from modules.sharding import connect_user_db
+
+
+EXPORT_CHUNK_ROWS = max(1, int(os.getenv("EXPORT_CHUNK_ROWS", "1000")))
+EXPORT_PARQUET_ROW_GROUP_ROWS = max(1, int(os.getenv("EXPORT_PARQUET_ROW_GROUP_ROWS", "50000")))
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd").strip().lower()
+
+
+class ExportUnavailableError(Exception):
+    pass
+
+
+# name -> query (ordered newest first), CSV header, row -> CSV values,
+# typed fields for NDJSON/Parquet (same order as the query), download filename
+EXPORTS = {
+    "expenses": {
+        "query": """
+            SELECT description, category, amount, status, expense_date
+            FROM expenses
+            WHERE user_id = ?
+            ORDER BY created_at DESC
+        """,
+        "header": ["Description", "Category", "Amount", "Status", "Date"],
+        "row": lambda row: [row[0], row[1], float(row[2]), row[3], row[4]],
+        "fields": [("description", "string"), ("category", "string"), ("amount", "float"),
+                   ("status", "string"), ("date", "date")],
+        "filename": "expenses_history",
+    },
+    "personal": {
+        "query": """
+            SELECT person_name, description, amount, status, transaction_date
+            FROM personal_transactions
+            WHERE user_id = ?
+            ORDER BY created_at DESC
+        """,
+        "header": ["Person", "Description", "Amount", "Status", "Date"],
+        "row": lambda row: [row[0], row[1], float(row[2]), row[3], row[4]],
+        "fields": [("person", "string"), ("description", "string"), ("amount", "float"),
+                   ("status", "string"), ("date", "date")],
+        "filename": "personal_transactions",
+    },
+}
+
+
+def ensure_export_indexes(cursor):
+    # Lets the ORDER BY walk an index, so the first rows stream out before the last are read.
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_expenses_user_created
+    ON expenses (user_id, created_at)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_personal_user_created
+    ON personal_transactions (user_id, created_at)
+    """)
+
+
+def iter_export_rows(name, user_id, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Yields lists of raw row tuples; holds one chunk in memory at a time.
+    # Opens its own connection because the generator outlives the request handler.
+    spec = EXPORTS[name]
+    conn = connect_user_db(user_id)
+    try:
+        cursor = conn.execute(spec["query"], (user_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def iter_csv(name, user_id, chunk_rows=EXPORT_CHUNK_ROWS):
+    spec = EXPORTS[name]
+    to_values = spec["row"]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(spec["header"])
+    for rows in iter_export_rows(name, user_id, chunk_rows):
+        writer.writerows(to_values(row) for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    # wbits=31 writes a gzip header/trailer so the download is a regular .gz file.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ---------------------------
+# NDJSON
+# ---------------------------
+def iter_ndjson(name, user_id, chunk_rows=EXPORT_CHUNK_ROWS):
+    # One JSON object per line; dates stay ISO strings.
+    fields = EXPORTS[name]["fields"]
+    names = [field for field, _ in fields]
+    float_columns = [i for i, (_, kind) in enumerate(fields) if kind == "float"]
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    for rows in iter_export_rows(name, user_id, chunk_rows):
+        lines = []
+        for row in rows:
+            values = list(row)
+            for i in float_columns:
+                values[i] = float(values[i])
+            lines.append(dumps(dict(zip(names, values))))
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+
+
+# ---------------------------
+# PARQUET (optional: pyarrow)
+# ---------------------------
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ExportUnavailableError("Parquet export needs pyarrow installed") from exc
+    return pyarrow
+
+
+class _DrainableSink(io.RawIOBase):
+    # ParquetWriter writes here; bytes are handed to the response after every row group.
+    # tell() keeps counting across drains because the footer records absolute offsets.
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_schema(pa, name):
+    types = {"string": pa.string(), "float": pa.float64(), "date": pa.date32()}
+    return pa.schema([(field, types[kind]) for field, kind in EXPORTS[name]["fields"]])
+
+
+def parquet_columns(pa, schema, rows):
+    columns = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        if field.type == pa.date32():
+            # Dates are stored as TEXT; anything that is not YYYY-MM-DD becomes null.
+            parsed = pa.compute.strptime(pa.array(values, pa.string()), format="%Y-%m-%d", unit="s", error_is_null=True)
+            columns.append(parsed.cast(pa.date32()))
+        else:
+            columns.append(pa.array(values, field.type))
+    return columns
+
+
+def iter_parquet(name, user_id, row_group_rows=EXPORT_PARQUET_ROW_GROUP_ROWS):
+    # Each fetchmany chunk becomes one row group, so memory is bounded by row_group_rows.
+    pa = load_pyarrow()
+    schema = parquet_schema(pa, name)
+    sink = _DrainableSink()
+    writer = pa.parquet.ParquetWriter(sink, schema, compression=EXPORT_PARQUET_COMPRESSION)
+    try:
+        for rows in iter_export_rows(name, user_id, row_group_rows):
+            writer.write_batch(pa.record_batch(parquet_columns(pa, schema, rows), schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,235 @@
+import functools
+import hmac
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, abort, g, request
+
+
+# Seconds; covers a 1ms SQL statement up to a slow OCR pass or SMTP handshake.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+# /metrics is for a local scraper; anything else gets a 404.
+METRICS_ALLOWED_IPS = {ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()}
+# When set, scrapers must send "Authorization: Bearer <token>" (required behind a reverse proxy).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+
+SQL_VERB_PATTERN = re.compile(r"^\s*(\w+)", re.IGNORECASE)
+SQL_TABLE_PATTERN = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?|ON)\s+(?!(?:OF|ON|OR)\b)([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE
+)
+
+
+# ---------------------------
+# REGISTRY
+# ---------------------------
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.total += value
+
+
+_lock = threading.Lock()
+_histograms = {}  # name -> {"help", "buckets", "series": {labels: Histogram}}
+_collectors = []
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def observe(name, value, help_text="", buckets=LATENCY_BUCKETS, **labels):
+    with _lock:
+        family = _histograms.setdefault(name, {"help": help_text, "buckets": buckets, "series": {}})
+        series = family["series"].get(_labels_key(labels))
+        if series is None:
+            series = family["series"][_labels_key(labels)] = Histogram(family["buckets"])
+        series.observe(value)
+
+
+def register_collector(callback):
+    # callback() -> [(name, type, help, [(labels_dict, value), ...]), ...], read at scrape time.
+    _collectors.append(callback)
+
+
+@contextmanager
+def timed(operation):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("app_operation_duration_seconds", time.perf_counter() - started,
+                "Time spent in instrumented operations (model training, OCR, SMTP, ...).", operation=operation)
+
+
+def timed_function(operation):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------------------------
+# SQL TIMING
+# ---------------------------
+_request_sql = threading.local()
+
+
+def statement_label(sql):
+    # "SELECT expenses", "INSERT stored_files": low-cardinality, unlike the raw SQL text.
+    verb = SQL_VERB_PATTERN.match(sql)
+    table = SQL_TABLE_PATTERN.search(sql)
+    label = verb.group(1).upper() if verb else "OTHER"
+    return f"{label} {table.group(1)}" if table else label
+
+
+def _record_statement(sql, seconds):
+    label = statement_label(sql)
+    observe("sqlite_statement_duration_seconds", seconds,
+            "Time spent in Cursor.execute (first step only; fetching large results is not included).", statement=label)
+    if getattr(_request_sql, "active", False):
+        _request_sql.count += 1
+        _request_sql.seconds += seconds
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_statement(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_statement(sql, time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    # sqlite3.connect(..., factory=TimedConnection): every statement run through this
+    # connection, directly or via conn.cursor(), is counted and timed.
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# ---------------------------
+# EXPOSITION
+# ---------------------------
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+def render_metrics():
+    lines = []
+    with _lock:
+        for name, family in sorted(_histograms.items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, series in sorted(family["series"].items()):
+                cumulative = 0
+                for bound, count in zip(series.buckets, series.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(float(bound))),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {series.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {series.total:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {series.count}")
+
+    for callback in _collectors:
+        for name, metric_type, help_text, samples in callback():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(_labels_key(labels))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# FLASK WIRING
+# ---------------------------
+def start_request_timer():
+    g.metrics_started = time.perf_counter()
+    _request_sql.active = True
+    _request_sql.count = 0
+    _request_sql.seconds = 0.0
+
+
+def _finish_request(status):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return
+    endpoint = request.endpoint or "unmatched"
+    observe("http_request_duration_seconds", time.perf_counter() - started,
+            "Time from the first before_request hook to the response leaving the app (streamed bodies excluded).",
+            endpoint=endpoint, method=request.method, status=str(status))
+    observe("http_request_sql_statements", _request_sql.count, "SQL statements executed per request.",
+            buckets=COUNT_BUCKETS, endpoint=endpoint)
+    observe("http_request_sql_seconds", _request_sql.seconds, "Time spent in SQL per request.", endpoint=endpoint)
+    _request_sql.active = False
+
+
+def stop_request_timer(resp):
+    _finish_request(resp.status_code)
+    return resp
+
+
+def stop_request_timer_on_error(exc):
+    # after_request is skipped for unhandled exceptions; record those as 500s here.
+    if exc is not None:
+        _finish_request(500)
+
+
+def metrics_allowed():
+    if request.remote_addr not in METRICS_ALLOWED_IPS:
+        return False
+    if METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        return hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode())
+    # Behind a proxy every request arrives from loopback; proxied requests carry these headers.
+    return "X-Forwarded-For" not in request.headers and "Forwarded" not in request.headers
+
+
+def metrics_endpoint():
+    if not metrics_allowed():
+        abort(404)
+    return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def init_metrics(app):
+    # Registered before every other hook so the timer covers them all; after_request
+    # hooks run in reverse, so this one sees the finished (compressed) response.
+    app.before_request(start_request_timer)
+    app.after_request(stop_request_timer)
+    app.teardown_request(stop_request_timer_on_error)
+    app.add_url_rule("/metrics", "metrics", metrics_endpoint)
@@ -0,0 +1,31 @@
+import io
+
+import pytesseract
+from PIL import Image
+
+
+# Payment screenshots are read twice: block mode (6) keeps the amount line intact and
+# sparse mode (11) picks up the names scattered around it.
+PAYMENT_OCR_CONFIGS = ("--oem 3 --psm 6", "--oem 3 --psm 11")
+
+
+class InvalidImageError(Exception):
+    pass
+
+
+def open_upload_image(data):
+    # verify() leaves the image unusable, so it is reopened after the check.
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.verify()
+        return Image.open(io.BytesIO(data))
+    except Exception as exc:
+        raise InvalidImageError("Not a valid image") from exc
+
+
+def ocr_receipt_text(image):
+    return pytesseract.image_to_string(image)
+
+
+def ocr_payment_text(image):
+    return "\n".join(pytesseract.image_to_string(image, config=config) for config in PAYMENT_OCR_CONFIGS)
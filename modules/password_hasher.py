@@ -0,0 +1,118 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+# Any werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1").strip()
+# Per server process; `flask serve` runs several, so this stays small by default.
+PASSWORD_HASH_WORKERS = max(1, int(os.getenv("PASSWORD_HASH_WORKERS", "2")))
+# Requests allowed to wait for a worker beyond the ones being hashed right now.
+PASSWORD_HASH_QUEUE_LIMIT = max(0, int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "16")))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+
+class PasswordHasherBusyError(Exception):
+    pass
+
+
+def hash_params(stored_hash):
+    return str(stored_hash or "").split("$", 1)[0]
+
+
+_current_params = None
+
+
+def current_hash_params():
+    # werkzeug expands defaults ("scrypt" -> "scrypt:32768:8:1"); learn the stored form once.
+    global _current_params
+    if _current_params is None:
+        _current_params = hash_params(generate_password_hash("", method=PASSWORD_HASH_METHOD))
+    return _current_params
+
+
+def needs_rehash(stored_hash):
+    return hash_params(stored_hash) != current_hash_params()
+
+
+# ---------------------------
+# PROCESS POOL
+# ---------------------------
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT)
+
+
+def get_hasher_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A forked server worker must not reuse its parent's executor.
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_hasher_pool(wait=True):
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=wait)
+        _pool = None
+        _pool_pid = None
+
+
+def _discard_pool(pool):
+    # A worker that died (OOM kill, crash) breaks the whole executor; drop it so the next
+    # call starts a fresh one instead of failing until the server restarts.
+    global _pool, _pool_pid
+    with _pool_lock:
+        if pool is not None and _pool is pool:
+            _pool = None
+            _pool_pid = None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def _run_bounded(fn, *args, retry=True):
+    # Fail fast instead of letting a login storm queue without limit.
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusyError("Password hashing queue is full")
+    pool = None
+    try:
+        pool = get_hasher_pool()
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool as exc:
+        _slots.release()
+        return _retry_on_fresh_pool(pool, exc, retry, fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    # The slot is held until the job itself finishes, even if this request stops waiting,
+    # so jobs left running after a timeout still count against the queue limit.
+    future.add_done_callback(lambda _future: _slots.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT_SECONDS)
+    except FutureTimeoutError as exc:
+        raise PasswordHasherBusyError("Password hashing timed out") from exc
+    except BrokenProcessPool as exc:
+        return _retry_on_fresh_pool(pool, exc, retry, fn, *args)
+
+
+def _retry_on_fresh_pool(pool, exc, retry, fn, *args):
+    _discard_pool(pool)
+    if not retry:
+        raise PasswordHasherBusyError("Password hashing workers stopped") from exc
+    return _run_bounded(fn, *args, retry=False)
+
+
+def verify_password(stored_hash, password):
+    return _run_bounded(check_password_hash, stored_hash, password)
+
+
+def hash_password(password):
+    return _run_bounded(generate_password_hash, password, PASSWORD_HASH_METHOD)
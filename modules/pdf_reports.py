@@ -0,0 +1,318 @@
+import glob
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from xml.sax.saxutils import escape
+
+from modules.data_version import get_data_version
+from modules.sharding import connect_user_db
+
+
+FONT_PATH = "DejaVuSans.ttf"
+FONT_NAME = "DejaVuSans"
+REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
+REPORT_WORKERS = max(1, int(os.getenv("REPORT_WORKERS", "1")))
+REPORT_TREND_MONTHS = 6
+CATEGORY_ORDER = ["Food", "Shopping", "Bills", "Travel", "Others"]
+
+
+class ReportUnavailableError(Exception):
+    pass
+
+
+def load_reportlab():
+    try:
+        import reportlab  # noqa: F401
+    except ImportError as exc:
+        raise ReportUnavailableError("PDF reports need reportlab installed") from exc
+
+
+def month_bounds(month):
+    # month is "YYYY-MM"; returns (first day, first day of next month) as ISO strings.
+    start = date.fromisoformat(f"{month}-01")
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def shift_month(month, delta):
+    year, mon = map(int, month.split("-"))
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+# ---------------------------
+# CACHE
+# ---------------------------
+def report_cache_path(user_id, month, version):
+    return os.path.join(REPORTS_DIR, str(int(user_id)), f"{month}-v{version}.pdf")
+
+
+def cached_report(user_id, month):
+    # Returns (path, exists); the path changes whenever the user's data version does.
+    conn = connect_user_db(user_id)
+    try:
+        version = get_data_version(conn, user_id)
+    finally:
+        conn.close()
+    path = report_cache_path(user_id, month, version)
+    return path, os.path.exists(path)
+
+
+def prune_stale_reports(user_id, month, keep_path):
+    for path in glob.glob(os.path.join(REPORTS_DIR, str(int(user_id)), f"{month}-v*.pdf")):
+        if os.path.abspath(path) != os.path.abspath(keep_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ---------------------------
+# DATA
+# ---------------------------
+def load_report_data(conn, user_id, month):
+    start, end = month_bounds(month)
+    trend_start, _ = month_bounds(shift_month(month, -(REPORT_TREND_MONTHS - 1)))
+
+    user = conn.execute("SELECT name, email FROM users WHERE id = ?", (user_id,)).fetchone()
+    expenses = conn.execute("""
+        SELECT expense_date, description, category, status, amount
+        FROM expenses
+        WHERE user_id = ? AND expense_date >= ? AND expense_date < ?
+        ORDER BY expense_date, id
+    """, (user_id, start, end)).fetchall()
+    personal = conn.execute("""
+        SELECT transaction_date, person_name, description, status, amount
+        FROM personal_transactions
+        WHERE user_id = ? AND transaction_date >= ? AND transaction_date < ?
+        ORDER BY transaction_date, id
+    """, (user_id, start, end)).fetchall()
+    trend_rows = conn.execute("""
+        SELECT substr(expense_date, 1, 7) AS month, SUM(amount)
+        FROM expenses
+        WHERE user_id = ? AND status = 'Send' AND expense_date >= ? AND expense_date < ?
+        GROUP BY month
+    """, (user_id, trend_start, end)).fetchall()
+
+    categories = {category: 0.0 for category in CATEGORY_ORDER}
+    for row in expenses:
+        if row[3] == "Send":
+            categories[row[2]] = categories.get(row[2], 0.0) + float(row[4])
+    trend_totals = dict(trend_rows)
+    trend = [
+        (m, float(trend_totals.get(m) or 0.0))
+        for m in (shift_month(month, -i) for i in range(REPORT_TREND_MONTHS - 1, -1, -1))
+    ]
+    return {
+        "name": user[0] if user else "",
+        "email": user[1] if user else "",
+        "expenses": expenses,
+        "personal": personal,
+        "categories": categories,
+        "trend": trend,
+    }
+
+
+# ---------------------------
+# RENDERING (runs in worker processes)
+# ---------------------------
+_font_registered = False
+
+
+def register_report_font():
+    # Parsing the TTF is the slowest part of a small report; do it once per process.
+    global _font_registered
+    if _font_registered:
+        return
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+    _font_registered = True
+
+
+def _init_worker():
+    try:
+        register_report_font()
+    except Exception:
+        # Surfaces again, with the real error, from the first render call.
+        pass
+
+
+def money(value):
+    return f"₹{float(value):,.2f}"
+
+
+def trend_chart(trend):
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+
+    drawing = Drawing(460, 170)
+    chart = VerticalBarChart()
+    chart.x, chart.y, chart.width, chart.height = 50, 30, 390, 120
+    chart.data = [[total for _, total in trend]]
+    chart.categoryAxis.categoryNames = [m for m, _ in trend]
+    chart.categoryAxis.labels.fontName = FONT_NAME
+    chart.categoryAxis.labels.fontSize = 8
+    chart.valueAxis.labels.fontName = FONT_NAME
+    chart.valueAxis.labels.fontSize = 8
+    chart.valueAxis.valueMin = 0
+    chart.bars[0].fillColor = colors.HexColor("#4f46e5")
+    drawing.add(chart)
+    return drawing
+
+
+def build_report_pdf(path, month, data):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    register_report_font()
+    title_style = ParagraphStyle("title", fontName=FONT_NAME, fontSize=18, leading=22, spaceAfter=6)
+    heading_style = ParagraphStyle("heading", fontName=FONT_NAME, fontSize=13, leading=16, spaceBefore=12, spaceAfter=6)
+    body_style = ParagraphStyle("body", fontName=FONT_NAME, fontSize=9, leading=12)
+    table_style = TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), FONT_NAME),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#eef2ff")),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5e1")),
+        ("ALIGN", (-1, 0), (-1, -1), "RIGHT"),
+    ])
+
+    def table(header, rows, widths):
+        if not rows:
+            return Paragraph("No records this month.", body_style)
+        t = Table([header] + rows, colWidths=widths, repeatRows=1)
+        t.setStyle(table_style)
+        return t
+
+    month_label = date.fromisoformat(f"{month}-01").strftime("%B %Y")
+    spent = sum(float(r[4]) for r in data["expenses"] if r[3] == "Send")
+    received = sum(float(r[4]) for r in data["expenses"] if r[3] == "Received")
+    lent = sum(float(r[4]) for r in data["personal"] if r[3] == "Send")
+    got_back = sum(float(r[4]) for r in data["personal"] if r[3] == "Received")
+
+    story = [
+        Paragraph(f"SplitPilot Monthly Statement - {month_label}", title_style),
+        # Paragraph text is ReportLab markup; user text is escaped so it is never parsed as tags.
+        Paragraph(f"{escape(str(data['name']))} &lt;{escape(str(data['email']))}&gt;", body_style),
+        Spacer(1, 8),
+        table(["Summary", "Amount"], [
+            ["Expenses (sent)", money(spent)],
+            ["Expenses (received)", money(received)],
+            ["Personal sent", money(lent)],
+            ["Personal received", money(got_back)],
+        ], [250, 120]),
+        Paragraph("Category Breakdown", heading_style),
+        table(["Category", "Share", "Amount"], [
+            [category, f"{(total / spent * 100) if spent else 0:.1f}%", money(total)]
+            for category, total in data["categories"].items()
+        ], [200, 80, 120]),
+        Paragraph(f"Spending Trend (last {len(data['trend'])} months)", heading_style),
+        trend_chart(data["trend"]),
+        Paragraph("Expenses", heading_style),
+        table(["Date", "Description", "Category", "Status", "Amount"], [
+            [r[0], Paragraph(escape(str(r[1])), body_style), r[2], r[3], money(r[4])] for r in data["expenses"]
+        ], [65, 200, 70, 60, 80]),
+        Paragraph("Personal Transactions", heading_style),
+        table(["Date", "Person", "Description", "Status", "Amount"], [
+            [r[0], Paragraph(escape(str(r[1])), body_style), Paragraph(escape(str(r[2])), body_style), r[3], money(r[4])]
+            for r in data["personal"]
+        ], [65, 110, 160, 60, 80]),
+    ]
+
+    # Written next to the target and renamed, so a half-written file is never served.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    SimpleDocTemplate(tmp_path, pagesize=A4, title=f"SplitPilot {month_label}").build(story)
+    os.replace(tmp_path, path)
+
+
+def render_monthly_report(user_id, month, path):
+    conn = connect_user_db(user_id)
+    try:
+        data = load_report_data(conn, user_id, month)
+    finally:
+        conn.close()
+    build_report_pdf(path, month, data)
+    prune_stale_reports(user_id, month, path)
+    return path
+
+
+# ---------------------------
+# PROCESS POOL
+# ---------------------------
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pending = {}  # cache path -> Future, so concurrent requests share one render
+
+
+def get_report_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, initializer=_init_worker)
+            _pool_pid = os.getpid()
+            _pending.clear()
+        return _pool
+
+
+def shutdown_report_pool(wait=True):
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=wait)
+        _pool = None
+        _pool_pid = None
+        _pending.clear()
+
+
+def _discard_pool(pool):
+    # A worker that died (OOM kill, crash) breaks the whole executor, and every render
+    # queued on it fails; drop both so the next request starts over on a fresh pool.
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            _pool_pid = None
+            _pending.clear()
+    pool.shutdown(wait=False)
+
+
+def _forget_render(path, future):
+    if _pending.get(path) is future:
+        _pending.pop(path, None)
+
+
+def _submit_render(pool, user_id, month, path):
+    # Concurrent requests for the same report share one render; a failed one is not reused.
+    with _pool_lock:
+        future = _pending.get(path)
+        if future is None or (future.done() and future.exception() is not None):
+            future = pool.submit(render_monthly_report, user_id, month, path)
+            _pending[path] = future
+            future.add_done_callback(lambda done: _forget_render(path, done))
+    return future
+
+
+def request_monthly_report(user_id, month, timeout):
+    # Returns the PDF path once it is on disk. Raises concurrent.futures.TimeoutError if the
+    # render takes longer than timeout; it carries on, and a later request picks it up.
+    load_reportlab()
+    path, exists = cached_report(user_id, month)
+    if exists:
+        return path
+
+    for attempt in range(2):
+        pool = get_report_pool()
+        try:
+            _submit_render(pool, user_id, month, path).result(timeout=timeout)
+            return path
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            if attempt:
+                raise
@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "ratelimit.db")
+
+
+def lock_email(lock_key):
+    # Login lock keys are "<email>|<ip>".
+    return str(lock_key).split("|", 1)[0]
+
+
+# ---------------------------
+# IN-MEMORY BACKEND (single process)
+# ---------------------------
+class MemoryRateLimitBackend:
+    # Keys are kept in last-touched order, so expired keys are evicted from the
+    # front in amortized O(1) per call and memory stays bounded by active keys.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()      # key -> (sorted list of hit times, expires_at)
+        self._login_locks = OrderedDict()  # lock_key -> (meta, expires_at)
+        self._email_index = {}             # email -> set of lock keys
+
+    def _evict(self, store, now, on_evict=None):
+        while store:
+            key, value = next(iter(store.items()))
+            if value[1] > now:
+                break
+            store.popitem(last=False)
+            if on_evict:
+                on_evict(key)
+
+    def _unindex(self, lock_key):
+        email = lock_email(lock_key)
+        keys = self._email_index.get(email)
+        if keys is not None:
+            keys.discard(lock_key)
+            if not keys:
+                del self._email_index[email]
+
+    def hit(self, key, limit, window_seconds):
+        now = time.time()
+        with self._lock:
+            self._evict(self._buckets, now)
+            entry = self._buckets.pop(key, None)
+            bucket = entry[0] if entry else []
+            # A short list is far smaller than a deque when millions of keys are live.
+            stale = bisect_left(bucket, now - window_seconds)
+            if stale:
+                del bucket[:stale]
+            limited = len(bucket) >= limit
+            if not limited:
+                bucket.append(now)
+            if bucket:
+                self._buckets[key] = (bucket, bucket[-1] + window_seconds)
+            return limited
+
+    def get_login_lock(self, lock_key):
+        now = time.time()
+        with self._lock:
+            self._evict(self._login_locks, now, self._unindex)
+            entry = self._login_locks.get(lock_key)
+            if entry is None or entry[1] <= now:
+                return {"count": 0, "lock_until": 0}
+            return dict(entry[0])
+
+    def set_login_lock(self, lock_key, meta, ttl_seconds):
+        now = time.time()
+        with self._lock:
+            self._login_locks.pop(lock_key, None)
+            self._login_locks[lock_key] = (dict(meta), now + ttl_seconds)
+            self._email_index.setdefault(lock_email(lock_key), set()).add(lock_key)
+
+    def clear_login_locks_for_email(self, email):
+        with self._lock:
+            for lock_key in self._email_index.pop(email, ()):
+                self._login_locks.pop(lock_key, None)
+
+    def size(self):
+        return len(self._buckets) + len(self._login_locks)
+
+
+# ---------------------------
+# SQLITE BACKEND (shared across worker processes)
+# ---------------------------
+class SQLiteRateLimitBackend:
+    PURGE_EVERY = 1000
+
+    def __init__(self, path=RATE_LIMIT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._conn()
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS rate_limit_hits (
+            key TEXT NOT NULL,
+            hit_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_rate_limit_hits_key ON rate_limit_hits (key, hit_at);
+        CREATE INDEX IF NOT EXISTS idx_rate_limit_hits_expiry ON rate_limit_hits (expires_at);
+
+        CREATE TABLE IF NOT EXISTS login_locks (
+            lock_key TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            lock_until REAL NOT NULL DEFAULT 0,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_login_locks_email ON login_locks (email);
+        CREATE INDEX IF NOT EXISTS idx_login_locks_expiry ON login_locks (expires_at);
+        """)
+
+    def _conn(self):
+        # One connection per thread; WAL keeps readers off the writer's lock.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _maybe_purge(self, conn, now):
+        self._calls += 1
+        if self._calls % self.PURGE_EVERY:
+            return
+        conn.execute("DELETE FROM rate_limit_hits WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM login_locks WHERE expires_at <= ?", (now,))
+
+    def hit(self, key, limit, window_seconds):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rate_limit_hits WHERE key = ? AND hit_at < ?", (key, now - window_seconds))
+            count = conn.execute("SELECT COUNT(*) FROM rate_limit_hits WHERE key = ?", (key,)).fetchone()[0]
+            limited = count >= limit
+            if not limited:
+                conn.execute(
+                    "INSERT INTO rate_limit_hits (key, hit_at, expires_at) VALUES (?, ?, ?)",
+                    (key, now, now + window_seconds),
+                )
+            self._maybe_purge(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return limited
+
+    def get_login_lock(self, lock_key):
+        row = self._conn().execute(
+            "SELECT count, lock_until FROM login_locks WHERE lock_key = ? AND expires_at > ?",
+            (lock_key, time.time()),
+        ).fetchone()
+        if row is None:
+            return {"count": 0, "lock_until": 0}
+        return {"count": row[0], "lock_until": row[1]}
+
+    def set_login_lock(self, lock_key, meta, ttl_seconds):
+        self._conn().execute("""
+            INSERT INTO login_locks (lock_key, email, count, lock_until, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(lock_key) DO UPDATE SET
+                count = excluded.count,
+                lock_until = excluded.lock_until,
+                expires_at = excluded.expires_at
+        """, (lock_key, lock_email(lock_key), int(meta.get("count", 0)),
+              float(meta.get("lock_until", 0)), time.time() + ttl_seconds))
+
+    def clear_login_locks_for_email(self, email):
+        self._conn().execute("DELETE FROM login_locks WHERE email = ?", (email,))
+
+    def size(self):
+        conn = self._conn()
+        hits = conn.execute("SELECT COUNT(DISTINCT key) FROM rate_limit_hits").fetchone()[0]
+        locks = conn.execute("SELECT COUNT(*) FROM login_locks").fetchone()[0]
+        return hits + locks
+
+
+RATE_LIMIT_BACKENDS = {
+    "memory": MemoryRateLimitBackend,
+    "sqlite": SQLiteRateLimitBackend,
+}
+
+
+def create_rate_limiter(name=RATE_LIMIT_BACKEND):
+    backend = RATE_LIMIT_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown rate limit backend: {name}")
+    return backend()
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from modules.email_outbox import enqueue_email, wake_outbox_worker
+from modules.sharding import iter_user_dbs
+
+
+REMINDER_SWEEP_SECONDS = float(os.getenv("REMINDER_SWEEP_SECONDS", "900"))
+# Matches the reminder_days CHECK constraint; bounds the next_due_date range scan.
+MAX_REMINDER_DAYS = 30
+
+
+def ensure_recurring_due_index(cursor):
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_recurring_active_due
+    ON recurring_expenses (is_active, next_due_date)
+    """)
+
+
+def reminder_meta(next_due_date, reminder_days, today=None):
+    today = today or datetime.now().date()
+    days_left = (next_due_date - today).days
+    if days_left < 0:
+        return "overdue", days_left
+    if days_left == 0:
+        return "due_today", days_left
+    if days_left <= reminder_days:
+        return "upcoming", days_left
+    return "normal", days_left
+
+
+# ---------------------------
+# DIGEST EMAIL
+# ---------------------------
+def reminder_item_text(item, status_key, days_left):
+    if status_key == "overdue":
+        status_line = f"This payment is overdue by {abs(days_left)} day(s)."
+    elif status_key == "due_today":
+        status_line = "This payment is due today."
+    else:
+        status_line = f"This payment is due in {days_left} day(s)."
+
+    notes = (item["notes"] or "").strip()
+    notes_line = f"\nNotes: {notes}" if notes else ""
+
+    return (
+        f"Title: {item['title']}\n"
+        f"Category: {item['category']}\n"
+        f"Amount: INR {float(item['amount']):.2f}\n"
+        f"Frequency: {str(item['frequency']).title()}\n"
+        f"Next Due Date: {item['next_due_date']}\n"
+        f"{status_line}{notes_line}"
+    )
+
+
+def build_reminder_digest(entries):
+    # entries: [(recurring_row, status_key, days_left), ...] for one user.
+    if len(entries) == 1:
+        item = entries[0][0]
+        subject = f"SplitPilot Reminder: {item['title']} due on {item['next_due_date']}"
+        intro = "Recurring expense reminder from SplitPilot:"
+        outro = "Please open SplitPilot and mark it paid when completed."
+    else:
+        subject = f"SplitPilot Reminder: {len(entries)} recurring payments need attention"
+        intro = f"You have {len(entries)} recurring expense reminders from SplitPilot:"
+        outro = "Please open SplitPilot and mark them paid when completed."
+
+    blocks = "\n\n".join(reminder_item_text(*entry) for entry in entries)
+    spacer = "\n" if len(entries) == 1 else "\n\n"
+    body = f"Hello,\n\n{intro}{spacer}{blocks}\n\n{outro}"
+    return subject, body
+
+
+# ---------------------------
+# SWEEP
+# ---------------------------
+def sweep_due_reminders(today=None):
+    # Queues one digest per user and stamps reminder_last_due_date for every item in it.
+    # Each shard (or database.db) is swept in its own IMMEDIATE transaction so concurrent
+    # sweepers never double-send.
+    today = today or datetime.now().date()
+    horizon = (today + timedelta(days=MAX_REMINDER_DAYS)).isoformat()
+
+    queued_total = 0
+    for conn in iter_user_dbs(timeout=30):
+        try:
+            queued_total += _sweep_database(conn, today, horizon)
+        finally:
+            conn.close()
+
+    if queued_total:
+        wake_outbox_worker()
+    return queued_total
+
+
+def _sweep_database(conn, today, horizon):
+    conn.row_factory = sqlite3.Row
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute("""
+            SELECT r.id, r.user_id, r.title, r.category, r.amount, r.frequency,
+                   r.next_due_date, r.reminder_days, r.notes, u.email
+            FROM recurring_expenses r
+            JOIN users u ON u.id = r.user_id
+            WHERE r.is_active = 1
+              AND r.next_due_date <= ?
+              AND (r.reminder_last_due_date IS NULL OR r.reminder_last_due_date != r.next_due_date)
+            ORDER BY r.user_id, r.next_due_date
+        """, (horizon,)).fetchall()
+
+        per_user = OrderedDict()
+        for row in rows:
+            try:
+                next_due = datetime.strptime(str(row["next_due_date"]), "%Y-%m-%d").date()
+            except ValueError:
+                continue
+            status_key, days_left = reminder_meta(next_due, int(row["reminder_days"]), today)
+            if status_key == "normal" or not row["email"]:
+                continue
+            per_user.setdefault((row["user_id"], row["email"]), []).append((row, status_key, days_left))
+
+        reminder_updates = []
+        for (user_id, email), entries in per_user.items():
+            subject, body = build_reminder_digest(entries)
+            queued, _ = enqueue_email(email, subject, body, conn=conn)
+            if queued:
+                reminder_updates.extend(
+                    (str(row["next_due_date"]), row["id"], user_id) for row, _, _ in entries
+                )
+
+        conn.executemany("""
+            UPDATE recurring_expenses
+            SET reminder_last_due_date = ?
+            WHERE id = ? AND user_id = ?
+        """, reminder_updates)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(reminder_updates)
+
+
+# ---------------------------
+# SCHEDULER
+# ---------------------------
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_stopping = threading.Event()
+
+
+def _scheduler_loop():
+    while not _stopping.is_set():
+        try:
+            sweep_due_reminders()
+        except Exception:
+            pass
+        _stopping.wait(REMINDER_SWEEP_SECONDS)
+
+
+def start_reminder_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler[1] == os.getpid() and _scheduler[0].is_alive():
+            return
+        _stopping.clear()
+        thread = threading.Thread(target=_scheduler_loop, name="reminder-sweeper", daemon=True)
+        thread.start()
+        _scheduler = (thread, os.getpid())
+
+
+def stop_reminder_scheduler(timeout=10):
+    global _scheduler
+    with _scheduler_lock:
+        scheduler = _scheduler
+        _scheduler = None
+    if scheduler is None:
+        return
+    _stopping.set()
+    scheduler[0].join(timeout)
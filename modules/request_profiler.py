@@ -0,0 +1,214 @@
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, request
+
+
+PROFILES_DIR = os.getenv("PROFILES_DIR", "profiles")
+# Signs X-Profile tokens; leave empty to allow only admin sessions (?profile=1).
+PROFILER_SECRET = os.getenv("PROFILER_SECRET", "")
+PROFILER_INTERVAL_SECONDS = float(os.getenv("PROFILER_INTERVAL_MS", "1")) / 1000
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_ARG = "profile"
+MAX_STACK_DEPTH = 128
+
+UNSAFE_NAME_PATTERN = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+# ---------------------------
+# SIGNED TOKENS
+# ---------------------------
+def _token_signature(expires_at):
+    return hmac.new(PROFILER_SECRET.encode("utf-8"), f"profile:{expires_at}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def make_profile_token(ttl_seconds):
+    # Header value "<expires_at>.<hmac>"; anyone holding it can profile requests until it expires.
+    if not PROFILER_SECRET:
+        raise RuntimeError("PROFILER_SECRET is not set")
+    expires_at = int(time.time() + ttl_seconds)
+    return f"{expires_at}.{_token_signature(expires_at)}"
+
+
+def verify_profile_token(token):
+    if not PROFILER_SECRET or not token:
+        return False
+    expires_raw, _, signature = token.partition(".")
+    try:
+        expires_at = int(expires_raw)
+    except ValueError:
+        return False
+    return expires_at >= time.time() and hmac.compare_digest(signature, _token_signature(expires_at))
+
+
+# ---------------------------
+# SAMPLER
+# ---------------------------
+class StackSampler:
+    # Samples one thread's Python stack from a helper thread. Nothing is hooked into the
+    # interpreter, so only the profiled request pays for it.
+    def __init__(self, thread_id, interval=PROFILER_INTERVAL_SECONDS, max_seconds=PROFILER_MAX_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples = Counter()  # (frame, ...) root first -> seconds
+        self.sample_count = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        last = time.perf_counter()
+        deadline = last + self.max_seconds
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or now > deadline:
+                break
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            # Weight by real elapsed time so a late wake-up still counts correctly.
+            self.samples[tuple(reversed(stack))] += now - last
+            self.sample_count += 1
+            last = now
+
+
+def _short_path(filename):
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def speedscope_profile(sampler, name):
+    # https://www.speedscope.app/file-format-schema.json ("sampled" profile).
+    frame_index = {}
+    frames = []
+    samples = []
+    weights = []
+    for stack, seconds in sampler.samples.items():
+        indexes = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": _short_path(frame[1]), "line": frame[2]})
+            indexes.append(frame_index[frame])
+        samples.append(indexes)
+        weights.append(round(seconds, 6))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "expense-manager request profiler",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": round(sampler.elapsed, 6),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+def collapsed_stacks(sampler):
+    # Brendan Gregg's folded format (flamegraph.pl, inferno); values are microseconds.
+    lines = []
+    for stack, seconds in sorted(sampler.samples.items()):
+        path = ";".join(f"{name} ({_short_path(filename)}:{line})" for name, filename, line in stack)
+        lines.append(f"{path} {max(1, int(seconds * 1_000_000))}")
+    return "\n".join(lines) + "\n"
+
+
+def profile_basename(label):
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{UNSAFE_NAME_PATTERN.sub('_', label)[:60]}-{os.getpid()}-{secrets.token_hex(3)}"
+
+
+def write_profile(sampler, base, label, profiles_dir=PROFILES_DIR):
+    # Writes <base>.speedscope.json (open in speedscope.app) and <base>.folded (flamegraph.pl).
+    os.makedirs(profiles_dir, exist_ok=True)
+    with open(os.path.join(profiles_dir, f"{base}.speedscope.json"), "w", encoding="utf-8") as handle:
+        json.dump(speedscope_profile(sampler, label), handle)
+    with open(os.path.join(profiles_dir, f"{base}.folded"), "w", encoding="utf-8") as handle:
+        handle.write(collapsed_stacks(sampler))
+
+
+# ---------------------------
+# FLASK WIRING
+# ---------------------------
+_is_admin_request = None
+
+
+def profiling_requested():
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        return verify_profile_token(token)
+    if request.args.get(PROFILE_QUERY_ARG) == "1" and _is_admin_request is not None:
+        return _is_admin_request()
+    return False
+
+
+def start_request_profile():
+    if PROFILE_HEADER not in request.headers and PROFILE_QUERY_ARG not in request.args:
+        return
+    if not profiling_requested():
+        return
+    label = f"{request.method} {request.endpoint or request.path}"
+    sampler = StackSampler(threading.get_ident())
+    g.request_profile = (sampler, profile_basename(label), label)
+    sampler.start()
+
+
+def add_profile_header(resp):
+    # The profile is written at teardown, after the response; tell the caller where to find it.
+    profile = g.get("request_profile")
+    if profile is not None:
+        resp.headers["X-Profile-Id"] = profile[1]
+    return resp
+
+
+def stop_request_profile(_exc):
+    profile = g.pop("request_profile", None)
+    if profile is None:
+        return
+    sampler, base, label = profile
+    sampler.stop()
+    write_profile(sampler, base, label)
+    current_app.logger.info("profiled %s: %.1fms, %d samples -> %s", label, sampler.elapsed * 1000,
+                            sampler.sample_count, os.path.join(PROFILES_DIR, base))
+
+
+def init_request_profiler(app, is_admin_request=None):
+    # is_admin_request() decides whether a logged-in session may use ?profile=1.
+    # With neither a secret nor an admin check configured, no hooks are installed at all.
+    global _is_admin_request
+    _is_admin_request = is_admin_request
+    if not PROFILER_SECRET and is_admin_request is None:
+        return False
+    app.before_request(start_request_profile)
+    app.after_request(add_profile_header)
+    app.teardown_request(stop_request_profile)
+    return True
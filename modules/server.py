@@ -0,0 +1,62 @@
+import gc
+import os
+
+
+SERVE_BIND = os.getenv("SERVE_BIND", "127.0.0.1:8000")
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", str(min(4, os.cpu_count() or 1))))
+SERVE_THREADS = int(os.getenv("SERVE_THREADS", "8"))
+# Worker heartbeat: a worker process that stops checking in for this long is restarted.
+# With threads > 1 (gthread) the heartbeat runs beside the request threads, so this is not
+# a per-request limit (voice and PDF jobs have their own timeouts; OCR has none).
+SERVE_TIMEOUT = int(os.getenv("SERVE_TIMEOUT", "120"))
+# On SIGTERM/SIGHUP workers stop accepting and get this long to finish in-flight requests.
+SERVE_GRACEFUL_TIMEOUT = int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "60"))
+# Recycle a worker after this many requests (0 = never); jitter avoids all restarting at once.
+SERVE_MAX_REQUESTS = int(os.getenv("SERVE_MAX_REQUESTS", "0"))
+
+
+class ServerUnavailableError(Exception):
+    pass
+
+
+def load_gunicorn():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as exc:
+        raise ServerUnavailableError("The multi-worker server needs gunicorn installed (pip install gunicorn)") from exc
+    return BaseApplication
+
+
+def run_server(app, prepare, start_worker, stop_worker, bind=SERVE_BIND, workers=SERVE_WORKERS,
+               threads=SERVE_THREADS):
+    # prepare() runs once in the master before any fork (schema, warm caches). Every worker
+    # then calls start_worker() after fork and stop_worker() once its requests have drained.
+    BaseApplication = load_gunicorn()
+
+    class PreforkServer(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": bind,
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread" if threads > 1 else "sync",
+                "preload_app": True,
+                "timeout": SERVE_TIMEOUT,
+                "graceful_timeout": SERVE_GRACEFUL_TIMEOUT,
+                "max_requests": SERVE_MAX_REQUESTS,
+                "max_requests_jitter": SERVE_MAX_REQUESTS // 10,
+                "post_fork": lambda server, worker: start_worker(),
+                "worker_exit": lambda server, worker: stop_worker(),
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    prepare()
+    # Objects created so far (app, templates, libraries) are moved out of the GC's reach,
+    # so collections in the workers do not touch them and break copy-on-write sharing.
+    gc.collect()
+    gc.freeze()
+    PreforkServer().run()
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+
+from modules.metrics import TimedConnection
+
+
+DATABASE = "database.db"
+# 0 keeps everything in database.db. N > 0 moves each user's rows into shard file
+# user_id % N, so users in different shards no longer queue behind one write lock.
+# Fixed once data has been split: changing it would route users to the wrong file.
+SHARD_COUNT = max(0, int(os.getenv("SHARD_COUNT", "0")))
+SHARD_DIR = os.getenv("SHARD_DIR", "shards")
+# Per-user tables (and their data-version counters) that live in the shards; users,
+# email_outbox and stored_files stay in database.db, the directory. (Rate limits have
+# their own RATE_LIMIT_DB.)
+# Versions come first when splitting: the shard's triggers bump them as the other rows arrive.
+SHARDED_TABLES = ("user_data_versions", "expenses", "personal_transactions", "recurring_expenses", "budgets")
+DIRECTORY_ALIAS = "directory"
+
+
+class ShardSplitError(Exception):
+    pass
+
+
+def sharding_enabled():
+    return SHARD_COUNT > 0
+
+
+def shard_index(user_id):
+    return int(user_id) % SHARD_COUNT
+
+
+def shard_path(index):
+    return os.path.join(SHARD_DIR, f"shard_{index:03d}.db")
+
+
+def connect_shard(index, factory=TimedConnection, timeout=5.0):
+    # The shard is "main" and the directory database is attached. Unqualified table names
+    # resolve main first, so user data comes from the shard while users, email_outbox and
+    # stored_files come from the directory, and existing queries run unchanged.
+    from modules.storage import install_shard_file_triggers
+
+    conn = sqlite3.connect(shard_path(index), timeout=timeout, factory=factory)
+    conn.execute(f"ATTACH DATABASE ? AS {DIRECTORY_ALIAS}", (DATABASE,))
+    install_shard_file_triggers(conn)
+    return conn
+
+
+def connect_user_db(user_id, factory=TimedConnection, timeout=5.0):
+    # The database holding this user's expenses, personal transactions, recurring items and budget.
+    # Statements are timed into the query-latency metrics like get_db()'s; those run in the PDF
+    # report workers land in the worker's own registry, which /metrics does not see.
+    if not sharding_enabled():
+        return sqlite3.connect(DATABASE, timeout=timeout, factory=factory)
+    return connect_shard(shard_index(user_id), factory, timeout)
+
+
+def iter_user_dbs(factory=TimedConnection, timeout=5.0):
+    # For jobs that scan every user (model training, reminders): each shard in turn, or
+    # just database.db. The caller closes each connection.
+    if not sharding_enabled():
+        yield sqlite3.connect(DATABASE, timeout=timeout, factory=factory)
+        return
+    for index in range(SHARD_COUNT):
+        yield connect_shard(index, factory, timeout)
+
+
+# ---------------------------
+# SPLIT (migration)
+# ---------------------------
+def _columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def split_into_shards(delete_source=True):
+    # Copies every per-user row from database.db into its shard (ids kept) and returns
+    # {table: rows}. Only runs into empty shards: once the app has served from them, copying
+    # again would overwrite later edits and bring back deleted rows. The directory holds a
+    # write lock from the first copy to the delete, so nothing written meanwhile is lost;
+    # if the split stops part way, the source is untouched and SHARD_DIR can be removed.
+    if not sharding_enabled():
+        raise ShardSplitError("Sharding is off; set SHARD_COUNT first")
+    for index in range(SHARD_COUNT):
+        conn = sqlite3.connect(shard_path(index))
+        try:
+            for table in SHARDED_TABLES:
+                if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    raise ShardSplitError(
+                        f"{shard_path(index)} already holds {table} rows; the split has run before "
+                        f"(or the app already wrote to the shards), so nothing was copied"
+                    )
+        finally:
+            conn.close()
+
+    directory = sqlite3.connect(DATABASE, timeout=30, isolation_level=None)
+    try:
+        directory.execute("BEGIN IMMEDIATE")
+        moved = {table: 0 for table in SHARDED_TABLES}
+        for index in range(SHARD_COUNT):
+            conn = connect_shard(index, timeout=30)
+            try:
+                with conn:
+                    for table in SHARDED_TABLES:
+                        target = set(_columns(conn, "main", table))
+                        columns = ", ".join(c for c in _columns(conn, DIRECTORY_ALIAS, table) if c in target)
+                        moved[table] += conn.execute(f"""
+                            INSERT INTO main.{table} ({columns})
+                            SELECT {columns} FROM {DIRECTORY_ALIAS}.{table}
+                            WHERE user_id IS NOT NULL AND user_id % ? = ?
+                        """, (SHARD_COUNT, index)).rowcount
+            finally:
+                conn.close()
+
+        for table in SHARDED_TABLES:
+            total = directory.execute(f"SELECT COUNT(*) FROM {table} WHERE user_id IS NOT NULL").fetchone()[0]
+            if total != moved[table]:
+                raise ShardSplitError(f"{table}: copied {moved[table]} of {total} rows; source left untouched")
+        if delete_source:
+            # Without their triggers the deletes neither orphan upload files nor bump
+            # data versions; init_db recreates them on the next start.
+            placeholders = ", ".join("?" for _ in SHARDED_TABLES)
+            triggers = directory.execute(f"""
+                SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({placeholders})
+            """, SHARDED_TABLES).fetchall()
+            for (name,) in triggers:
+                directory.execute(f"DROP TRIGGER {name}")
+            for table in SHARDED_TABLES:
+                directory.execute(f"DELETE FROM {table} WHERE user_id IS NOT NULL")
+        directory.execute("COMMIT")
+        if delete_source:
+            directory.execute("VACUUM")
+    except BaseException:
+        if directory.in_transaction:
+            directory.execute("ROLLBACK")
+        raise
+    finally:
+        directory.close()
+    return moved
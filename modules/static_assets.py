@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+
+
+STATIC_DIR = "static"
+DIST_DIRNAME = "dist"
+ASSET_MAX_AGE = 365 * 24 * 3600
+# Un-fingerprinted files under static/ (not referenced through url_for) still get a short cache.
+PLAIN_STATIC_MAX_AGE = int(os.getenv("PLAIN_STATIC_MAX_AGE", "3600"))
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+
+CSS_TOKEN_PATTERN = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/""", re.DOTALL)
+CSS_SPACE_PATTERN = re.compile(r"\s+")
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*")
+CSS_COLON_PATTERN = re.compile(r":\s+")
+
+_manifest = {}  # "style.css" -> "dist/style.<hash>.css"
+_static_dir = os.path.abspath(STATIC_DIR)
+
+
+# ---------------------------
+# BUILD
+# ---------------------------
+def minify_css(text):
+    # String literals are kept verbatim; comments are dropped and whitespace collapsed
+    # around punctuation. Whitespace before ':' is kept ("a :hover" is a descendant selector).
+    parts = []
+    last = 0
+    for match in CSS_TOKEN_PATTERN.finditer(text):
+        parts.append(_minify_css_code(text[last:match.start()]))
+        if match.group(1):
+            parts.append(match.group(1))
+        last = match.end()
+    parts.append(_minify_css_code(text[last:]))
+    return "".join(parts).strip()
+
+
+def _minify_css_code(code):
+    code = CSS_SPACE_PATTERN.sub(" ", code)
+    code = CSS_PUNCTUATION_PATTERN.sub(r"\1", code)
+    return CSS_COLON_PATTERN.sub(":", code).replace(";}", "}")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _write_atomic(path, data):
+    # Several server workers may build at startup; never expose a half-written file.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_static_assets(static_dir=STATIC_DIR):
+    # Writes static/dist/<name>.<hash><ext> (+ .gz / .br) for every file under static/
+    # and returns the manifest. Unchanged files are not rewritten; stale builds are pruned.
+    dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+    os.makedirs(dist_dir, exist_ok=True)
+    brotli = _brotli()
+    manifest = {}
+
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for filename in files:
+            source = os.path.join(root, filename)
+            relative = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as handle:
+                data = handle.read()
+            stem, ext = os.path.splitext(relative)
+            if ext == ".css":
+                data = minify_css(data.decode("utf-8")).encode("utf-8")
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = f"{stem}.{digest}{ext}"
+            target = os.path.join(dist_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                _write_atomic(target, data)
+            if ext in COMPRESSIBLE_EXTENSIONS:
+                if not os.path.exists(target + ".gz"):
+                    _write_atomic(target + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None and not os.path.exists(target + ".br"):
+                    _write_atomic(target + ".br", brotli.compress(data, quality=11))
+            manifest[relative] = f"{DIST_DIRNAME}/{hashed}"
+
+    keep = {os.path.basename(path) for path in manifest.values()}
+    for root, _, files in os.walk(dist_dir):
+        for filename in files:
+            base = filename[:-3] if filename.endswith((".gz", ".br")) else filename
+            if base not in keep and filename != "manifest.json" and not filename.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(root, filename))
+                except OSError:
+                    pass
+
+    _write_atomic(os.path.join(dist_dir, "manifest.json"), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+# ---------------------------
+# FLASK WIRING
+# ---------------------------
+def asset_url_defaults(endpoint, values):
+    # url_for('static', filename='style.css') -> /static/dist/style.<hash>.css
+    if endpoint == "static":
+        hashed = _manifest.get(values.get("filename"))
+        if hashed:
+            values["filename"] = hashed
+
+
+def serve_static(filename):
+    static_dir = _static_dir
+    if not filename.startswith(f"{DIST_DIRNAME}/"):
+        response = send_from_directory(static_dir, filename, max_age=PLAIN_STATIC_MAX_AGE)
+        response.cache_control.public = True
+        return response
+
+    # Fingerprinted: content never changes under this name, so cache it for a year and
+    # hand out the precompressed variant the client accepts.
+    accepted = request.accept_encodings
+    variant = None
+    for suffix, encoding in ((".br", "br"), (".gz", "gzip")):
+        if accepted[encoding] and os.path.isfile(os.path.join(static_dir, filename + suffix)):
+            variant = (suffix, encoding)
+            break
+
+    if variant:
+        response = send_from_directory(static_dir, filename + variant[0],
+                                       mimetype=mimetypes.guess_type(filename)[0], max_age=ASSET_MAX_AGE)
+        response.headers["Content-Encoding"] = variant[1]
+    else:
+        response = send_from_directory(static_dir, filename, max_age=ASSET_MAX_AGE)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_static_assets(app):
+    global _manifest, _static_dir
+    _static_dir = os.path.abspath(app.static_folder or STATIC_DIR)
+    _manifest = build_static_assets(_static_dir)
+    app.url_defaults(asset_url_defaults)
+    app.view_functions["static"] = serve_static
+    return _manifest
@@ -0,0 +1,282 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+DATABASE = "database.db"
+UPLOAD_ROOT = "uploads"
+STORAGE_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_BYTES", str(100 * 1024 * 1024)))
+# Orphans are kept this long so an in-flight request can still attach its upload.
+STORAGE_ORPHAN_GRACE_SECONDS = float(os.getenv("STORAGE_ORPHAN_GRACE_SECONDS", "3600"))
+STORAGE_SWEEP_SECONDS = float(os.getenv("STORAGE_SWEEP_SECONDS", "3600"))
+STORAGE_SWEEP_BATCH = 500
+
+
+class StorageQuotaError(Exception):
+    pass
+
+
+def ensure_storage_tables(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS stored_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        path TEXT NOT NULL UNIQUE,
+        kind TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        ref_table TEXT,
+        ref_id INTEGER,
+        ref_key TEXT,
+        orphaned_at REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stored_files_ref ON stored_files (ref_table, ref_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stored_files_orphaned ON stored_files (orphaned_at) WHERE orphaned_at IS NOT NULL")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_storage (
+        user_id INTEGER PRIMARY KEY,
+        bytes_used INTEGER NOT NULL DEFAULT 0,
+        file_count INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    # Per-user totals follow stored_files exactly, whoever inserts or deletes rows.
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_stored_files_insert_usage
+    AFTER INSERT ON stored_files
+    BEGIN
+        INSERT INTO user_storage (user_id, bytes_used, file_count) VALUES (NEW.user_id, NEW.size_bytes, 1)
+        ON CONFLICT(user_id) DO UPDATE SET bytes_used = bytes_used + NEW.size_bytes, file_count = file_count + 1;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_stored_files_delete_usage
+    AFTER DELETE ON stored_files
+    BEGIN
+        UPDATE user_storage
+        SET bytes_used = MAX(0, bytes_used - OLD.size_bytes), file_count = MAX(0, file_count - 1)
+        WHERE user_id = OLD.user_id;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_stored_files_update_usage
+    AFTER UPDATE OF size_bytes ON stored_files
+    BEGIN
+        UPDATE user_storage SET bytes_used = MAX(0, bytes_used - OLD.size_bytes + NEW.size_bytes)
+        WHERE user_id = NEW.user_id;
+    END
+    """)
+
+    # Deleting or replacing the owning row orphans its files; the sweeper removes them later.
+    for table in ("expenses", "personal_transactions"):
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_files
+        AFTER DELETE ON {table}
+        BEGIN
+            UPDATE stored_files SET orphaned_at = strftime('%s', 'now')
+            WHERE ref_table = '{table}' AND ref_id = OLD.id AND orphaned_at IS NULL;
+        END
+        """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_users_profile_photo_files
+    AFTER UPDATE OF profile_photo ON users
+    WHEN OLD.profile_photo IS NOT NEW.profile_photo
+    BEGIN
+        UPDATE stored_files SET orphaned_at = strftime('%s', 'now')
+        WHERE ref_table = 'users' AND ref_id = OLD.id AND ref_key = OLD.profile_photo AND orphaned_at IS NULL;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_users_delete_files
+    AFTER DELETE ON users
+    BEGIN
+        UPDATE stored_files SET orphaned_at = strftime('%s', 'now')
+        WHERE user_id = OLD.id AND orphaned_at IS NULL;
+    END
+    """)
+
+
+def install_shard_file_triggers(conn):
+    # Shard files cannot hold triggers that reach stored_files in the directory database,
+    # but TEMP triggers can; they live as long as the connection. Ids repeat across shards,
+    # so the match includes the owner.
+    for table in ("expenses", "personal_transactions"):
+        conn.execute(f"""
+        CREATE TEMP TRIGGER IF NOT EXISTS trg_shard_{table}_delete_files
+        AFTER DELETE ON main.{table}
+        BEGIN
+            UPDATE stored_files SET orphaned_at = strftime('%s', 'now')
+            WHERE ref_table = '{table}' AND ref_id = OLD.id AND user_id = OLD.user_id AND orphaned_at IS NULL;
+        END
+        """)
+
+
+def get_storage_db():
+    conn = sqlite3.connect(DATABASE, timeout=10)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def storage_usage(conn, user_id):
+    # Returns (bytes_used, file_count).
+    row = conn.execute("SELECT bytes_used, file_count FROM user_storage WHERE user_id = ?", (user_id,)).fetchone()
+    return (int(row[0]), int(row[1])) if row else (0, 0)
+
+
+def registered_bytes(conn, paths):
+    # Bytes already counted for these paths; re-registering one replaces its size.
+    if not paths:
+        return 0
+    placeholders = ", ".join("?" for _ in paths)
+    row = conn.execute(f"SELECT COALESCE(SUM(size_bytes), 0) FROM stored_files WHERE path IN ({placeholders})",
+                       list(paths)).fetchone()
+    return int(row[0])
+
+
+def check_quota(conn, user_id, incoming_bytes):
+    used, _ = storage_usage(conn, user_id)
+    if used + incoming_bytes > STORAGE_QUOTA_BYTES:
+        raise StorageQuotaError(
+            f"Storage limit reached ({used / 1048576:.1f} of {STORAGE_QUOTA_BYTES / 1048576:.0f} MB used)"
+        )
+
+
+# ---------------------------
+# SAVE / ATTACH (request path)
+# ---------------------------
+def save_upload(user_id, kind, data, ext):
+    # Writes uploads/<user_id>/<kind>/<random><ext> and records it as a pending orphan.
+    # The caller attaches it inside the transaction that creates the owning row, so a crash
+    # in between leaves nothing the sweeper will not clean up.
+    conn = get_storage_db()
+    try:
+        check_quota(conn, user_id, len(data))
+        directory = os.path.join(UPLOAD_ROOT, str(int(user_id)), kind)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{uuid.uuid4().hex}{ext}")
+        with open(path, "wb") as handle:
+            handle.write(data)
+        with conn:
+            cursor = conn.execute("""
+                INSERT INTO stored_files (user_id, path, kind, size_bytes, orphaned_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (user_id, path, kind, len(data), time.time()))
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def attach_upload(conn, file_id, ref_table, ref_id, ref_key=None):
+    conn.execute("""
+        UPDATE stored_files SET ref_table = ?, ref_id = ?, ref_key = ?, orphaned_at = NULL
+        WHERE id = ?
+    """, (ref_table, ref_id, ref_key, file_id))
+
+
+def register_files(conn, user_id, kind, paths, ref_table, ref_id, ref_key=None):
+    # For files written elsewhere (profile photo variants). Re-registering a path that is
+    # waiting to be swept simply takes it back.
+    for path in paths:
+        conn.execute("""
+            INSERT INTO stored_files (user_id, path, kind, size_bytes, ref_table, ref_id, ref_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                size_bytes = excluded.size_bytes,
+                ref_table = excluded.ref_table,
+                ref_id = excluded.ref_id,
+                ref_key = excluded.ref_key,
+                orphaned_at = NULL
+        """, (user_id, path, kind, os.path.getsize(path), ref_table, ref_id, ref_key))
+
+
+# ---------------------------
+# SWEEP
+# ---------------------------
+def sweep_orphaned_files(now=None):
+    # Returns (files_removed, bytes_freed). Each row is deleted and its file unlinked inside
+    # one write transaction. Writers of reusable (content-hashed) names write the file and
+    # register it under the same lock, so a file re-uploaded and re-registered by another
+    # request or process is either kept or written again afterwards, never lost.
+    cutoff = (now or time.time()) - STORAGE_ORPHAN_GRACE_SECONDS
+    removed = 0
+    freed = 0
+    last_id = 0
+    conn = get_storage_db()
+    try:
+        while True:
+            candidates = conn.execute("""
+                SELECT id, path, size_bytes FROM stored_files
+                WHERE orphaned_at IS NOT NULL AND orphaned_at <= ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (cutoff, last_id, STORAGE_SWEEP_BATCH)).fetchall()
+            if not candidates:
+                break
+            for row in candidates:
+                last_id = row["id"]
+                try:
+                    with conn:
+                        conn.execute("BEGIN IMMEDIATE")
+                        deleted = conn.execute("""
+                            DELETE FROM stored_files
+                            WHERE id = ? AND orphaned_at IS NOT NULL AND orphaned_at <= ?
+                        """, (row["id"], cutoff)).rowcount
+                        if deleted:
+                            try:
+                                os.remove(row["path"])
+                            except FileNotFoundError:
+                                pass
+                except OSError:
+                    # The row is kept and the file retried on the next sweep.
+                    continue
+                if not deleted:
+                    continue
+                removed += 1
+                freed += int(row["size_bytes"])
+            if len(candidates) < STORAGE_SWEEP_BATCH:
+                break
+    finally:
+        conn.close()
+    return removed, freed
+
+
+# ---------------------------
+# SWEEPER THREAD
+# ---------------------------
+_sweeper = None
+_sweeper_lock = threading.Lock()
+_stopping = threading.Event()
+
+
+def _sweeper_loop():
+    while not _stopping.is_set():
+        try:
+            sweep_orphaned_files()
+        except Exception:
+            pass
+        _stopping.wait(STORAGE_SWEEP_SECONDS)
+
+
+def start_storage_sweeper():
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is not None and _sweeper[1] == os.getpid() and _sweeper[0].is_alive():
+            return
+        _stopping.clear()
+        thread = threading.Thread(target=_sweeper_loop, name="storage-sweeper", daemon=True)
+        thread.start()
+        _sweeper = (thread, os.getpid())
+
+
+def stop_storage_sweeper(timeout=10):
+    global _sweeper
+    with _sweeper_lock:
+        sweeper = _sweeper
+        _sweeper = None
+    if sweeper is None:
+        return
+    _stopping.set()
+    sweeper[0].join(timeout)
@@ -0,0 +1,341 @@
+import re
+
+
+# ---------------------------
+# PRECOMPILED PATTERNS
+# ---------------------------
+AMOUNT_TOKEN = r"(\d[\d,]*(?:\.\d+)?)"
+
+# One alternation for every supported command prefix; only one branch can match
+# because the prefixes are mutually exclusive.
+COMMAND_PATTERN = re.compile(
+    r"^(?:"
+    r"add\s+(?P<add_amount>\d[\d,]*(?:\.\d+)?)\s+(?P<add_desc>.+)"
+    r"|(?:i\s+)?spent\s+(?P<spent_amount>\d[\d,]*(?:\.\d+)?)\s+on\s+(?P<spent_desc>.+)"
+    r"|pay(?:ed)?\s+(?P<pay_amount>\d[\d,]*(?:\.\d+)?)\s+for\s+(?P<pay_desc>.+)"
+    r")$"
+)
+COMMAND_GROUPS = (
+    ("add_amount", "add_desc"),
+    ("spent_amount", "spent_desc"),
+    ("pay_amount", "pay_desc"),
+)
+FIRST_AMOUNT_PATTERN = re.compile(AMOUNT_TOKEN)
+LEADING_CONNECTOR_PATTERN = re.compile(r"^(on|for)\s+")
+LEADING_FILLER_PATTERN = re.compile(r"^(add|spent|i spent|pay|paid|on|for)\s+")
+EDGE_PUNCTUATION_PATTERN = re.compile(r"^[,.\s]+|[,.\s]+$")
+COMMAND_SEPARATOR_PATTERN = re.compile(r"[\r\n;]+")
+COMMAND_AND_PATTERN = re.compile(r"\s+and\s+", flags=re.IGNORECASE)
+DIGIT_PATTERN = re.compile(r"\d")
+
+# Dates and times pollute numeric extraction on receipts.
+DATE_TIME_PATTERNS = (
+    re.compile(r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b"),
+    re.compile(r"\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b"),
+    re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b"),
+)
+RECEIPT_AMOUNT_PATTERN = re.compile(r"(?<!\d)(\d+(?:,\d{3})*(?:\.\d{1,2})?)(?!\d)")
+PAYMENT_AMOUNT_PATTERN = re.compile(r"(?<!\d)(\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d{1,6}(?:\.\d{1,2})?)(?!\d)")
+CURRENCY_MARKER_PATTERN = re.compile(
+    r"(?:₹|rs\.?|inr)\s*([0-9O]{1,7}(?:,[0-9O]{2,3})*(?:\.[0-9O]{1,2})?)",
+    flags=re.IGNORECASE,
+)
+OCR_ZERO_PATTERN = re.compile(r"(?<=\d)[oO](?=\d|\b)")
+PLAIN_AMOUNT_PATTERN = re.compile(r"\d+(?:\.\d{1,2})?")
+
+FROM_LINE_PATTERN = re.compile(r"^(received\s+from|from)\s*[:\-]?\s*(.+)$", flags=re.IGNORECASE)
+TO_LINE_PATTERN = re.compile(r"^(paid\s+to|to)\s*[:\-]?\s*(.+)$", flags=re.IGNORECASE)
+FROM_ANY_PATTERN = re.compile(r"\bfrom\s*[:\-]?\s*([A-Za-z0-9 .&_-]{2,60})", flags=re.IGNORECASE)
+TO_ANY_PATTERN = re.compile(r"\bto\s*[:\-]?\s*([A-Za-z0-9 .&_-]{2,60})", flags=re.IGNORECASE)
+PARTY_STOP_PATTERN = re.compile(r"\b(upi|utr|ref|txn|transaction|id)\b", flags=re.IGNORECASE)
+PARTY_INVALID_CHARS_PATTERN = re.compile(r"[^A-Za-z0-9 .&_-]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def keyword_pattern(keywords):
+    # Substring match against any keyword, equivalent to any(k in line for k in keywords).
+    return re.compile("|".join(re.escape(k) for k in keywords))
+
+
+RECEIPT_PRIORITY_KEYWORDS = keyword_pattern([
+    "grand total", "total amount", "net amount", "amount due", "payable", "total"
+])
+RECEIPT_LOW_PRIORITY_KEYWORDS = keyword_pattern([
+    "qty", "quantity", "item", "invoice no", "bill no", "gstin", "phone"
+])
+PAYMENT_ACTION_KEYWORDS = keyword_pattern(["paid", "sent", "received", "from", "to", "completed"])
+PAYMENT_LOW_PRIORITY_KEYWORDS = keyword_pattern([
+    "upi", "transaction id", "google transaction id", "utr", "ref", "account", "bank", "@"
+])
+
+
+# ---------------------------
+# TOKENIZATION
+# ---------------------------
+def tokenize_document(text):
+    # Single pass over the OCR text; every extractor below reads from this.
+    lines = []
+    lower_lines = []
+    for raw_line in (text or "").splitlines():
+        line = raw_line.strip()
+        if line:
+            lines.append(line)
+            lower_lines.append(line.lower())
+    return {
+        "text": text or "",
+        "lines": lines,
+        "lower_lines": lower_lines,
+        "compact": " ".join(lines),
+    }
+
+
+def best_candidate(candidates, default=0.0):
+    # Highest score first; for ties choose larger amount.
+    if not candidates:
+        return default
+    return max(candidates, key=lambda c: (c[0], c[1]))[1]
+
+
+# ---------------------------
+# CHAT / VOICE COMMANDS
+# ---------------------------
+def parse_amount_token(token):
+    token = (token or "").replace(",", "").strip()
+    try:
+        return float(token)
+    except Exception:
+        return None
+
+
+def clean_description(description, prefix_pattern):
+    description = prefix_pattern.sub("", description.strip(), count=1).strip()
+    return EDGE_PUNCTUATION_PATTERN.sub("", description).strip()
+
+
+def split_expense_commands(message):
+    # "add 50 tea; add 20 snacks and 120 lunch" -> three commands. An "and" piece
+    # without any number stays with the previous command ("bread and butter").
+    commands = []
+    for chunk in COMMAND_SEPARATOR_PATTERN.split(message or ""):
+        pieces = []
+        for piece in COMMAND_AND_PATTERN.split(chunk):
+            piece = piece.strip()
+            if not piece:
+                continue
+            if pieces and not DIGIT_PATTERN.search(piece):
+                pieces[-1] = f"{pieces[-1]} and {piece}"
+            else:
+                pieces.append(piece)
+        commands.extend(pieces)
+    return commands
+
+
+def parse_expense_messages(message):
+    # Returns ([(amount, description), ...], [unparsed command, ...]).
+    parsed = []
+    rejected = []
+    for command in split_expense_commands(message):
+        amount, description = parse_expense_message(command)
+        if amount is None or not description or amount <= 0:
+            rejected.append(command)
+        else:
+            parsed.append((amount, description))
+    return parsed, rejected
+
+
+def parse_expense_message(message):
+    message = message.strip().lower()
+    if not message:
+        return None, None
+
+    match = COMMAND_PATTERN.match(message)
+    if match:
+        for amount_group, desc_group in COMMAND_GROUPS:
+            if match.group(amount_group) is None:
+                continue
+            amount = parse_amount_token(match.group(amount_group))
+            description = clean_description(match.group(desc_group), LEADING_CONNECTOR_PATTERN)
+            if amount is not None and description:
+                return amount, description
+            break
+
+    # Fallback: first number is amount, remaining words become description.
+    amount_match = FIRST_AMOUNT_PATTERN.search(message)
+    if not amount_match:
+        return None, None
+
+    amount = parse_amount_token(amount_match.group())
+    if amount is None:
+        return None, None
+    before = message[:amount_match.start()].strip()
+    after = message[amount_match.end():].strip()
+
+    # Trim filler words common in voice commands.
+    description = clean_description(f"{before} {after}", LEADING_FILLER_PATTERN)
+    if not description:
+        return None, None
+
+    return amount, description
+
+
+# ---------------------------
+# RECEIPTS
+# ---------------------------
+def receipt_amount_from_document(doc):
+    candidates = []
+
+    for line in doc["lower_lines"]:
+        for pattern in DATE_TIME_PATTERNS:
+            line = pattern.sub(" ", line)
+        line = line.strip()
+        if not line:
+            continue
+
+        nums = RECEIPT_AMOUNT_PATTERN.findall(line)
+        if not nums:
+            continue
+
+        line_score = 0
+        if RECEIPT_PRIORITY_KEYWORDS.search(line):
+            line_score += 3
+        if RECEIPT_LOW_PRIORITY_KEYWORDS.search(line):
+            line_score -= 2
+
+        for raw in nums:
+            try:
+                value = float(raw.replace(",", ""))
+            except ValueError:
+                continue
+
+            if value <= 0 or value > 100000:
+                continue
+
+            score = line_score
+            if "." in raw:
+                score += 1
+            candidates.append((score, value))
+
+    return best_candidate(candidates)
+
+
+def extract_receipt_amount(text):
+    if not text:
+        return 0.0
+    return receipt_amount_from_document(tokenize_document(text))
+
+
+# ---------------------------
+# PAYMENT SCREENSHOTS
+# ---------------------------
+def parse_payment_token(raw):
+    token = raw.strip().replace(",", "")
+    token = OCR_ZERO_PATTERN.sub("0", token)
+    if not PLAIN_AMOUNT_PATTERN.fullmatch(token):
+        return None
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    if 0 < value <= 200000:
+        return value
+    return None
+
+
+def payment_amount_from_document(doc):
+    candidates = []
+
+    for raw in CURRENCY_MARKER_PATTERN.findall(doc["compact"]):
+        parsed = parse_payment_token(raw)
+        if parsed is not None:
+            candidates.append((12, parsed))
+
+    # Generic number extraction with scoring to avoid transaction IDs.
+    for line, line_l in zip(doc["lines"], doc["lower_lines"]):
+        raws = PAYMENT_AMOUNT_PATTERN.findall(line)
+        if not raws:
+            continue
+
+        line_score = 0
+        if "₹" in line or " rs" in f" {line_l}" or "inr" in line_l:
+            line_score += 5
+        if PAYMENT_ACTION_KEYWORDS.search(line_l):
+            line_score += 1
+        if PAYMENT_LOW_PRIORITY_KEYWORDS.search(line_l):
+            line_score -= 5
+        if len(line) <= 18:
+            line_score += 2
+
+        for raw in raws:
+            parsed = parse_payment_token(raw)
+            if parsed is None:
+                continue
+            score = line_score
+            if "," in raw:
+                score += 4
+            if "." in raw:
+                score += 1
+            candidates.append((score, parsed))
+
+    return best_candidate(candidates)
+
+
+def extract_payment_amount(text):
+    if not text:
+        return 0.0
+    return payment_amount_from_document(tokenize_document(text))
+
+
+def clean_party_name(raw_name):
+    if not raw_name:
+        return ""
+
+    name = raw_name.strip()
+    name = PARTY_STOP_PATTERN.split(name, maxsplit=1)[0]
+    name = PARTY_INVALID_CHARS_PATTERN.sub(" ", name)
+    name = WHITESPACE_PATTERN.sub(" ", name).strip(" -:")
+    return name[:60]
+
+
+def party_from_document(doc):
+    person_name = ""
+    status = "Send"
+
+    # Required behavior: from -> Received, to -> Send.
+    for line in doc["lines"]:
+        from_match = FROM_LINE_PATTERN.match(line)
+        if from_match:
+            person_name = clean_party_name(from_match.group(2))
+            status = "Received"
+            break
+
+        to_match = TO_LINE_PATTERN.match(line)
+        if to_match:
+            person_name = clean_party_name(to_match.group(2))
+            status = "Send"
+            break
+
+    if not person_name:
+        from_any = FROM_ANY_PATTERN.search(doc["compact"])
+        to_any = TO_ANY_PATTERN.search(doc["compact"]) if not from_any else None
+        if from_any:
+            person_name = clean_party_name(from_any.group(1))
+            status = "Received"
+        elif to_any:
+            person_name = clean_party_name(to_any.group(1))
+            status = "Send"
+
+    return person_name, status
+
+
+def extract_personal_payment_details(text):
+    if not text:
+        return "Unknown", "Payment Screenshot", 0.0, "Send"
+
+    doc = tokenize_document(text)
+    person_name, status = party_from_document(doc)
+    if not person_name:
+        person_name = "Unknown"
+
+    amount = payment_amount_from_document(doc)
+    description = "Payment Screenshot"
+    return person_name, description, amount, status
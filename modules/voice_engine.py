@@ -0,0 +1,276 @@
+import io
+import json
+import os
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+TARGET_SAMPLE_RATE = 16000
+SILENCE_WINDOW_SECONDS = 0.02
+SILENCE_PADDING_WINDOWS = 5
+SILENCE_FLOOR_RMS = 300.0
+SILENCE_RELATIVE_RMS = 0.08
+
+# "vosk" transcribes locally; "google" sends recordings to Google Web Speech and is opt-in.
+VOICE_BACKEND = os.getenv("VOICE_BACKEND", "vosk").strip().lower()
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", os.path.join("models", "vosk-model-small-en-us"))
+VOICE_WORKERS = max(1, int(os.getenv("VOICE_WORKERS", "1")))
+VOICE_TIMEOUT_SECONDS = float(os.getenv("VOICE_TIMEOUT_SECONDS", "30"))
+
+
+class TranscriptionError(Exception):
+    pass
+
+
+class InvalidAudioError(TranscriptionError):
+    pass
+
+
+class UnrecognizedSpeechError(TranscriptionError):
+    pass
+
+
+class TranscriptionUnavailableError(TranscriptionError):
+    pass
+
+
+# ---------------------------
+# AUDIO PREPROCESSING
+# ---------------------------
+def decode_wav(data):
+    # Returns float32 mono samples in int16 scale plus the source sample rate.
+    import numpy as np
+
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            raw = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        raise InvalidAudioError("Recording is not a valid WAV file")
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32)
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 65536.0
+    else:
+        raise InvalidAudioError(f"Unsupported sample width: {width * 8} bit")
+
+    if channels > 1:
+        usable = len(samples) - (len(samples) % channels)
+        samples = samples[:usable].reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def trim_silence(samples, rate):
+    import numpy as np
+
+    window = max(1, int(rate * SILENCE_WINDOW_SECONDS))
+    count = len(samples) // window
+    if count == 0:
+        return samples[:0]
+
+    frames = samples[:count * window].reshape(count, window)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    threshold = max(SILENCE_FLOOR_RMS, float(rms.max()) * SILENCE_RELATIVE_RMS)
+    voiced = np.flatnonzero(rms > threshold)
+    if len(voiced) == 0:
+        return samples[:0]
+
+    start = max(0, int(voiced[0]) - SILENCE_PADDING_WINDOWS) * window
+    end = min(count, int(voiced[-1]) + 1 + SILENCE_PADDING_WINDOWS) * window
+    return samples[start:end]
+
+
+def lowpass(samples, cutoff):
+    # Windowed-sinc FIR; cutoff is a fraction of the sample rate (0.5 = Nyquist).
+    import numpy as np
+
+    half_width = int(np.ceil(4.0 / cutoff))
+    taps = np.arange(-half_width, half_width + 1, dtype=np.float64)
+    kernel = 2.0 * cutoff * np.sinc(2.0 * cutoff * taps) * np.blackman(len(taps))
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel, mode="same").astype(np.float32)
+
+
+def resample(samples, rate, target_rate=TARGET_SAMPLE_RATE):
+    import numpy as np
+
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    if target_rate < rate:
+        # Interpolating alone would fold everything above the new Nyquist back into speech.
+        samples = lowpass(samples, 0.5 * target_rate / rate)
+    duration = len(samples) / float(rate)
+    target_len = max(1, int(round(duration * target_rate)))
+    source_pos = np.arange(len(samples), dtype=np.float64)
+    target_pos = np.linspace(0, len(samples) - 1, target_len)
+    return np.interp(target_pos, source_pos, samples).astype(np.float32)
+
+
+def preprocess_wav(data):
+    # WAV bytes -> trimmed 16 kHz mono 16-bit PCM bytes, all in memory.
+    import numpy as np
+
+    samples, rate = decode_wav(data)
+    samples = trim_silence(samples, rate)
+    if len(samples) == 0:
+        raise UnrecognizedSpeechError("Recording contains only silence")
+    samples = resample(samples, rate)
+    return np.clip(np.round(samples), -32768, 32767).astype("<i2").tobytes()
+
+
+# ---------------------------
+# BACKENDS
+# ---------------------------
+# Each loader runs once per worker process and returns transcribe(pcm, sample_rate) -> str.
+def load_vosk_backend():
+    try:
+        from vosk import KaldiRecognizer, Model, SetLogLevel
+    except Exception:
+        raise TranscriptionUnavailableError(
+            "Offline voice engine missing. Install: pip install vosk (or set VOICE_BACKEND=google)"
+        )
+    if not os.path.isdir(VOSK_MODEL_PATH):
+        raise TranscriptionUnavailableError(
+            f"Vosk model not found at {VOSK_MODEL_PATH}; download one from https://alphacephei.com/vosk/models"
+        )
+
+    SetLogLevel(-1)
+    model = Model(VOSK_MODEL_PATH)
+
+    def transcribe(pcm, sample_rate):
+        recognizer = KaldiRecognizer(model, sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+    return transcribe
+
+
+def load_google_backend():
+    try:
+        import speech_recognition as sr
+    except Exception:
+        raise TranscriptionUnavailableError("Voice transcription dependency missing. Install: pip install SpeechRecognition")
+
+    recognizer = sr.Recognizer()
+
+    def transcribe(pcm, sample_rate):
+        try:
+            return recognizer.recognize_google(sr.AudioData(pcm, sample_rate, 2))
+        except sr.UnknownValueError:
+            return ""
+
+    return transcribe
+
+
+TRANSCRIPTION_BACKENDS = {
+    "vosk": load_vosk_backend,
+    "google": load_google_backend,
+}
+
+
+def register_backend(name, loader):
+    TRANSCRIPTION_BACKENDS[name] = loader
+
+
+# ---------------------------
+# WORKER POOL
+# ---------------------------
+_worker_backend = None
+_worker_backend_error = None
+
+
+def _init_worker(backend_name):
+    global _worker_backend, _worker_backend_error
+    loader = TRANSCRIPTION_BACKENDS.get(backend_name)
+    try:
+        if loader is None:
+            raise TranscriptionUnavailableError(f"Unknown voice backend: {backend_name}")
+        _worker_backend = loader()
+    except TranscriptionError as exc:
+        _worker_backend_error = str(exc)
+    except Exception as exc:
+        _worker_backend_error = f"Voice engine failed to load: {exc}"
+
+
+def _worker_transcribe(data):
+    if _worker_backend is None:
+        raise TranscriptionUnavailableError(_worker_backend_error or "Voice engine not loaded")
+    pcm = preprocess_wav(data)
+    text = (_worker_backend(pcm, TARGET_SAMPLE_RATE) or "").strip()
+    if not text:
+        raise UnrecognizedSpeechError("Could not understand the recorded voice")
+    return text
+
+
+def _worker_ping():
+    return _worker_backend_error if _worker_backend is None else None
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_voice_pool():
+    # Checked by pid: a pool inherited across fork() has no live workers in the child.
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=VOICE_WORKERS,
+                initializer=_init_worker,
+                initargs=(VOICE_BACKEND,),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def warm_voice_pool():
+    # Start every worker now so the model load is not paid by the first request.
+    # Returns why the engine could not load, or None when it is ready.
+    pool = get_voice_pool()
+    errors = [f.result() for f in [pool.submit(_worker_ping) for _ in range(VOICE_WORKERS)]]
+    return next((error for error in errors if error), None)
+
+
+def shutdown_voice_pool(wait=True):
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=wait)
+        _pool = None
+        _pool_pid = None
+
+
+def _discard_pool(pool):
+    # A worker that died (OOM kill, crash) breaks the whole executor; drop it so the next
+    # upload starts a fresh one.
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            _pool_pid = None
+    pool.shutdown(wait=False)
+
+
+def transcribe_audio(data, timeout=VOICE_TIMEOUT_SECONDS):
+    if not data:
+        raise InvalidAudioError("Empty recording")
+    for attempt in range(2):
+        pool = get_voice_pool()
+        try:
+            return pool.submit(_worker_transcribe, data).result(timeout=timeout)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            if attempt:
+                raise TranscriptionUnavailableError("Voice engine stopped unexpectedly")
@@ -0,0 +1,52 @@
+import os
+import re
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CSRF_META = re.compile(r'<meta name="csrf-token" content="([^"]+)"')
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import app as app_module
+
+    app_module.init_db()
+    app_module.app.config["TESTING"] = True
+    with app_module.app.test_client() as test_client:
+        yield test_client
+
+
+def rendered_token(client):
+    return CSRF_META.search(client.get("/login").get_data(as_text=True)).group(1)
+
+
+def test_token_is_masked_differently_on_every_render(client):
+    first, second = rendered_token(client), rendered_token(client)
+    with client.session_transaction() as sess:
+        session_token = sess["csrf_token"]
+
+    assert first != second
+    assert session_token not in first and session_token not in second
+
+
+def test_masked_tokens_validate_and_raw_or_forged_ones_do_not(client):
+    token = rendered_token(client)
+    with client.session_transaction() as sess:
+        session_token = sess["csrf_token"]
+
+    def post(value):
+        client.post("/login", data={"csrf_token": value, "email": "", "password": ""})
+        with client.session_transaction() as sess:
+            return [message for _, message in sess.pop("_flashes", [])]
+
+    assert post(token) == []
+    assert post(rendered_token(client)) == []
+    failed = ["Security check failed. Please retry the action."]
+    assert post(session_token) == failed
+    assert post("not-base64!") == failed
+    assert post(token[:-4] + "AAAA") == failed
@@ -0,0 +1,114 @@
+import os
+import socket
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller  # noqa: E402
+
+import emailsender  # noqa: E402
+
+SENDER = "noreply@example.com"
+
+
+class RecordingHandler:
+    # Keeps every accepted message with the SMTP session it arrived on.
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("reject"):
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((session, envelope.rcpt_tos[0], envelope.content.decode("utf-8", "replace")))
+        return "250 Message accepted"
+
+    def sessions(self):
+        # Session objects stay referenced by messages, so their ids cannot be reused.
+        return {id(session) for session, _, _ in self.messages}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = RecordingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    env = {
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(port),
+        "SMTP_USER": "",
+        "SMTP_PASS": "",
+        "GMAIL_APP_PASSWORD": "",
+        "SMTP_FROM": SENDER,
+        "SMTP_USE_TLS": "0",
+        "SMTP_POOL_SIZE": "2",
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    emailsender.reload_smtp_config()
+    yield handler
+    emailsender.reload_smtp_config()
+    controller.stop()
+
+
+def test_send_many_uses_one_connection(smtp_server):
+    results = emailsender.send_many([(f"user{i}@example.com", f"Subject {i}", "body") for i in range(3)])
+
+    assert results == [(True, "Email sent")] * 3
+    assert [rcpt for _, rcpt, _ in smtp_server.messages] == [f"user{i}@example.com" for i in range(3)]
+    assert len(smtp_server.sessions()) == 1
+
+
+def test_connection_is_pooled_between_calls(smtp_server):
+    assert emailsender.send_email("a@example.com", "One", "body") == (True, "Email sent")
+    assert emailsender.send_email("b@example.com", "Two", "body") == (True, "Email sent")
+
+    assert len(smtp_server.messages) == 2
+    assert len(smtp_server.sessions()) == 1
+
+
+def test_reconnects_when_pooled_connection_was_dropped(smtp_server):
+    assert emailsender.send_email("a@example.com", "One", "body")[0]
+    # Simulate the server closing the idle connection behind the pool's back.
+    pooled, _ = emailsender._SMTP_POOL[-1]
+    pooled.close()
+
+    assert emailsender.send_email("b@example.com", "Two", "body") == (True, "Email sent")
+    assert len(smtp_server.messages) == 2
+    assert len(smtp_server.sessions()) == 2
+
+
+def test_rejected_recipient_does_not_stop_the_batch(smtp_server):
+    results = emailsender.send_many([
+        ("a@example.com", "One", "body"),
+        ("reject@example.com", "Two", "body"),
+        ("c@example.com", "Three", "body"),
+    ])
+
+    assert results[0] == (True, "Email sent")
+    assert results[1][0] is False
+    assert results[2] == (True, "Email sent")
+    assert len(smtp_server.sessions()) == 1
+
+
+def test_invalid_and_unconfigured(smtp_server, monkeypatch):
+    assert emailsender.send_email("not-an-address", "Subject", "body") == (False, "Invalid receiver email")
+
+    monkeypatch.setenv("SMTP_FROM", "")
+    emailsender.reload_smtp_config()
+    assert emailsender.send_email("a@example.com", "Subject", "body") == (False, "SMTP not configured")
+    assert smtp_server.messages == []
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules import metrics  # noqa: E402
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import app as app_module
+
+    app_module.init_db()
+    return app_module
+
+
+def statement_count(label):
+    series = metrics._histograms.get("sqlite_statement_duration_seconds", {"series": {}})["series"]
+    found = series.get((("statement", label),))
+    return found.count if found else 0
+
+
+def test_module_level_user_db_connections_are_timed(app_module):
+    from modules.chart_data import get_chart_data
+    from modules.exports import iter_csv
+
+    before = statement_count("SELECT expenses")
+    get_chart_data(1, "month", None, None)
+    list(iter_csv("expenses", 1))
+
+    assert statement_count("SELECT expenses") >= before + 2
@@ -0,0 +1,63 @@
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules import password_hasher  # noqa: E402
+
+EMAIL = "ravi@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import app as app_module
+
+    app_module.init_db()
+    conn = app_module.get_db()
+    conn.execute("INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
+                 ("Ravi", EMAIL, password_hasher.hash_password(PASSWORD)))
+    conn.commit()
+    conn.close()
+    app_module.app.config["TESTING"] = True
+    with app_module.app.test_client() as test_client:
+        with test_client.session_transaction() as sess:
+            sess["csrf_token"] = "token"
+        yield test_client
+    password_hasher.shutdown_hasher_pool(wait=True)
+
+
+def kill_hasher_workers():
+    pool = password_hasher.get_hasher_pool()
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join(5)
+    # The executor notices the dead workers on its management thread.
+    deadline = time.monotonic() + 5
+    while not pool._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool._broken
+
+
+def login(client):
+    import app as app_module
+
+    csrf = app_module.mask_csrf_token("token")
+    return client.post("/login", data={"email": EMAIL, "password": PASSWORD, "csrf_token": csrf})
+
+
+def test_login_recovers_after_a_hasher_worker_is_killed(client):
+    assert login(client).headers["Location"].endswith("/dashboard")
+
+    kill_hasher_workers()
+
+    resp = login(client)
+    assert resp.status_code == 302
+    assert resp.headers["Location"].endswith("/dashboard")
+    assert password_hasher.verify_password(password_hasher.hash_password("x"), "x")
@@ -0,0 +1,56 @@
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("reportlab")
+
+from modules import pdf_reports  # noqa: E402
+
+MONTH = "2026-03"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pdf_reports, "FONT_PATH", os.path.join(ROOT, "DejaVuSans.ttf"))
+    import app as app_module
+
+    app_module.init_db()
+    conn = app_module.get_db()
+    user_id = conn.execute("INSERT INTO users (name, email, password) VALUES ('Ravi', 'ravi@example.com', 'x')").lastrowid
+    conn.execute("""
+        INSERT INTO expenses (user_id, description, category, amount, status, expense_date)
+        VALUES (?, 'Lunch', 'Food', 120, 'Send', ?)
+    """, (user_id, f"{MONTH}-05"))
+    conn.commit()
+    conn.close()
+    app_module.app.config["TESTING"] = True
+    with app_module.app.test_client() as test_client:
+        with test_client.session_transaction() as sess:
+            sess["user_id"] = user_id
+        yield test_client
+    pdf_reports.shutdown_report_pool(wait=True)
+
+
+def test_monthly_report_recovers_after_a_worker_is_killed(client):
+    pool = pdf_reports.get_report_pool()
+    pool.submit(int).result(5)
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join(5)
+    deadline = time.monotonic() + 5
+    while not pool._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool._broken
+
+    resp = client.get(f"/monthly_report?month={MONTH}")
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/pdf"
+    assert resp.data.startswith(b"%PDF")
+    resp.close()
@@ -0,0 +1,17 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.static_assets import minify_css  # noqa: E402
+
+
+def test_minify_css_collapses_code():
+    css = "/* note */\na :hover , b > c {\n  color: red ;\n  margin: 0;\n}\n"
+    assert minify_css(css) == "a :hover,b>c{color:red;margin:0}"
+
+
+def test_minify_css_keeps_string_literals_verbatim():
+    css = """.a::after { content: ";}" ; }\n.b::before { content: '/* x */  ;}'; }"""
+    assert minify_css(css) == """.a::after{content:";}"}.b::before{content:'/* x */  ;}'}"""
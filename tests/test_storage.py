@@ -0,0 +1,110 @@
+import io
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+Image = pytest.importorskip("PIL.Image")
+
+from modules import storage  # noqa: E402
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import app as app_module
+
+    app_module.init_db()
+    conn = app_module.get_db()
+    conn.execute("INSERT INTO users (id, name, email, password) VALUES (1, 'Ravi', 'ravi@example.com', 'x')")
+    conn.commit()
+    conn.close()
+    app_module.app.config["TESTING"] = True
+    return app_module
+
+
+def tiny_png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), (200, 40, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def upload_photo(app_module, data):
+    with app_module.app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["csrf_token"] = "token"
+        return client.post("/upload_profile_photo", data={
+            "csrf_token": app_module.mask_csrf_token("token"),
+            "profile_photo": (io.BytesIO(data), "me.png", "image/png"),
+        })
+
+
+def test_profile_photo_quota_counts_the_written_variants(app_module, monkeypatch):
+    data = tiny_png()
+    monkeypatch.setattr(storage, "STORAGE_QUOTA_BYTES", len(data) * 4)
+
+    upload_photo(app_module, data)
+
+    conn = storage.get_storage_db()
+    assert storage.storage_usage(conn, 1) == (0, 0)
+    assert not conn.execute("SELECT profile_photo FROM users WHERE id = 1").fetchone()[0]
+    conn.close()
+
+    monkeypatch.setattr(storage, "STORAGE_QUOTA_BYTES", 10 * 1024 * 1024)
+    upload_photo(app_module, data)
+    upload_photo(app_module, data)  # same image again: same files, no extra usage
+
+    conn = storage.get_storage_db()
+    rows = conn.execute("SELECT path, size_bytes FROM stored_files").fetchall()
+    assert rows and all(os.path.getsize(path) == size for path, size in rows)
+    assert storage.storage_usage(conn, 1) == (sum(size for _, size in rows), len(rows))
+    conn.close()
+
+
+def test_sweeper_does_not_unlink_a_file_re_registered_meanwhile(app_module, monkeypatch):
+    path = os.path.join("uploads", "profile", "user_1_same_sm.jpg")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as handle:
+        handle.write(b"old")
+    conn = storage.get_storage_db()
+    with conn:
+        conn.execute("""
+            INSERT INTO stored_files (user_id, path, kind, size_bytes, orphaned_at)
+            VALUES (1, ?, 'profile_photo', 3, 0)
+        """, (path,))
+    conn.close()
+
+    def reupload():
+        # What upload_profile_photo does for an image whose variant name is being swept.
+        other = sqlite3.connect(storage.DATABASE, timeout=10)
+        with other:
+            other.execute("BEGIN IMMEDIATE")
+            with open(path, "wb") as handle:
+                handle.write(b"new")
+            storage.register_files(other, 1, "profile_photo", [path], "users", 1, "user_1_same")
+        other.close()
+
+    real_remove = os.remove
+    uploader = threading.Thread(target=reupload)
+
+    def remove_while_reuploading(target):
+        # Give the re-upload every chance to land between the row delete and the unlink.
+        uploader.start()
+        uploader.join(0.5)
+        real_remove(target)
+
+    monkeypatch.setattr(storage.os, "remove", remove_while_reuploading)
+    assert storage.sweep_orphaned_files() == (1, 3)
+    uploader.join(10)
+
+    conn = storage.get_storage_db()
+    assert conn.execute("SELECT orphaned_at FROM stored_files WHERE path = ?", (path,)).fetchone()[0] is None
+    conn.close()
+    with open(path, "rb") as handle:
+        assert handle.read() == b"new"
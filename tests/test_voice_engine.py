@@ -0,0 +1,71 @@
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+np = pytest.importorskip("numpy")
+
+from modules import voice_engine  # noqa: E402
+
+SAMPLE = os.path.join(ROOT, "uploads", "voice_command.wav")
+
+
+def read_sample():
+    with open(SAMPLE, "rb") as handle:
+        return handle.read()
+
+
+def test_preprocess_bundled_recording():
+    samples, rate = voice_engine.decode_wav(read_sample())
+    assert rate == 48000
+
+    trimmed = voice_engine.trim_silence(samples, rate)
+    assert 0 < len(trimmed) <= len(samples)
+
+    resampled = voice_engine.resample(trimmed, rate)
+    assert abs(len(resampled) - len(trimmed) / 3) <= 1
+    assert np.abs(resampled).max() > voice_engine.SILENCE_FLOOR_RMS
+
+    pcm = voice_engine.preprocess_wav(read_sample())
+    assert len(pcm) == 2 * len(resampled)
+
+
+def test_resample_does_not_alias_above_nyquist():
+    rate = 48000
+    t = np.arange(rate) / rate
+    speech = 8000 * np.sin(2 * np.pi * 1000 * t)
+    hiss = 8000 * np.sin(2 * np.pi * 12000 * t)  # folds onto 4 kHz at 16 kHz without filtering
+
+    def level(samples, freq):
+        spectrum = np.abs(np.fft.rfft(samples[1000:-1000]))
+        bins = np.fft.rfftfreq(len(samples) - 2000, 1 / voice_engine.TARGET_SAMPLE_RATE)
+        return spectrum[np.argmin(np.abs(bins - freq))]
+
+    kept = level(voice_engine.resample(speech.astype(np.float32), rate), 1000)
+    folded = level(voice_engine.resample(hiss.astype(np.float32), rate), 4000)
+    assert folded < kept * 0.01
+
+
+def test_transcribe_recovers_after_a_worker_is_killed(monkeypatch):
+    # No vosk here, so a healthy pool answers with the backend's own error.
+    monkeypatch.setattr(voice_engine, "VOICE_BACKEND", "missing-backend")
+    try:
+        pool = voice_engine.get_voice_pool()
+        assert voice_engine.warm_voice_pool() == "Unknown voice backend: missing-backend"
+        for process in list(pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join(5)
+        deadline = time.monotonic() + 5
+        while not pool._broken and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        with pytest.raises(voice_engine.TranscriptionUnavailableError, match="Unknown voice backend"):
+            voice_engine.transcribe_audio(read_sample())
+        assert voice_engine.get_voice_pool() is not pool
+    finally:
+        voice_engine.shutdown_voice_pool(wait=True)